@@ -21,6 +21,9 @@ if config.config_file_name is not None:
 from src.database import engine, metadata  # noqa
 from src.models.transaction import transactions  # noqa
 from src.models.account import accounts  # noqa
+from src.models.account_summary import account_daily_summary  # noqa
+from src.models.idempotency import idempotency_keys  # noqa
+from src.models.reconciliation import reconciliation_runs  # noqa
 
 target_metadata = metadata
 
@@ -0,0 +1,74 @@
+"""valores em centavos
+
+Revision ID: 9d3f5a7b1c20
+Revises: e4a9b1c7f203
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3f5a7b1c20'
+down_revision: Union[str, Sequence[str], None] = 'e4a9b1c7f203'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Colunas monetárias e o tipo decimal anterior de cada uma
+COLUMNS = {
+    'accounts': [('balance', sa.Numeric(precision=10, scale=2))],
+    'transactions': [('amount', sa.Numeric(precision=10, scale=2))],
+    'transactions_archive': [('amount', sa.Numeric(precision=10, scale=2))],
+    'account_daily_summary': [
+        ('deposit_total', sa.Numeric(precision=14, scale=2)),
+        ('withdrawal_total', sa.Numeric(precision=14, scale=2)),
+        ('closing_balance', sa.Numeric(precision=10, scale=2)),
+    ],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    for table, columns in COLUMNS.items():
+        if sqlite:
+            # O SQLite não converte na troca de tipo: converte os valores e
+            # recria a tabela com as colunas inteiras
+            assignments = ', '.join(f'{name} = CAST(ROUND({name} * 100) AS INTEGER)' for name, _ in columns)
+            op.execute(f'UPDATE {table} SET {assignments}')
+            with op.batch_alter_table(table) as batch:
+                for name, numeric in columns:
+                    batch.alter_column(name, existing_type=numeric, type_=sa.BigInteger(), existing_nullable=False)
+        else:
+            for name, numeric in columns:
+                op.alter_column(
+                    table, name,
+                    existing_type=numeric,
+                    type_=sa.BigInteger(),
+                    existing_nullable=False,
+                    postgresql_using=f'ROUND({name} * 100)::bigint',
+                )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    for table, columns in COLUMNS.items():
+        if sqlite:
+            with op.batch_alter_table(table) as batch:
+                for name, numeric in columns:
+                    batch.alter_column(name, existing_type=sa.BigInteger(), type_=numeric, existing_nullable=False)
+            assignments = ', '.join(f'{name} = {name} / 100.0' for name, _ in columns)
+            op.execute(f'UPDATE {table} SET {assignments}')
+        else:
+            for name, numeric in columns:
+                op.alter_column(
+                    table, name,
+                    existing_type=sa.BigInteger(),
+                    type_=numeric,
+                    existing_nullable=False,
+                    postgresql_using=f'{name} / 100.0',
+                )
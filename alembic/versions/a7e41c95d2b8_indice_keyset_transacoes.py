@@ -0,0 +1,28 @@
+"""indice keyset de transacoes por conta
+
+Revision ID: a7e41c95d2b8
+Revises: 3f9c2a1b7d4e
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e41c95d2b8'
+down_revision: Union[str, Sequence[str], None] = '3f9c2a1b7d4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_transactions_account_id_id', 'transactions', ['account_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transactions_account_id_id', table_name='transactions')
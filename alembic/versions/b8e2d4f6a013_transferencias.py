@@ -0,0 +1,32 @@
+"""transferencias
+
+Revision ID: b8e2d4f6a013
+Revises: 9d3f5a7b1c20
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e2d4f6a013'
+down_revision: Union[str, Sequence[str], None] = '9d3f5a7b1c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('transactions', sa.Column('transfer_id', sa.Uuid(), nullable=True))
+    op.add_column('transactions_archive', sa.Column('transfer_id', sa.Uuid(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('transactions_archive') as batch:
+        batch.drop_column('transfer_id')
+    with op.batch_alter_table('transactions') as batch:
+        batch.drop_column('transfer_id')
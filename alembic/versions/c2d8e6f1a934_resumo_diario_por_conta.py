@@ -0,0 +1,69 @@
+"""resumo diario por conta
+
+Revision ID: c2d8e6f1a934
+Revises: a7e41c95d2b8
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d8e6f1a934'
+down_revision: Union[str, Sequence[str], None] = 'a7e41c95d2b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'account_daily_summary',
+        sa.Column('account_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('deposit_count', sa.Integer(), nullable=False),
+        sa.Column('deposit_total', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('withdrawal_count', sa.Integer(), nullable=False),
+        sa.Column('withdrawal_total', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('closing_balance', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.id']),
+        sa.PrimaryKeyConstraint('account_id', 'day'),
+    )
+
+    # Preenche o histórico: o saldo de fechamento de cada dia é o saldo atual
+    # menos o efeito líquido de todos os dias posteriores
+    day = "date(timestamp)" if op.get_bind().dialect.name == "sqlite" else "CAST(timestamp AS DATE)"
+    op.execute(f"""
+        INSERT INTO account_daily_summary (
+            account_id, day, deposit_count, deposit_total,
+            withdrawal_count, withdrawal_total, closing_balance
+        )
+        SELECT
+            d.account_id, d.day, d.deposit_count, d.deposit_total,
+            d.withdrawal_count, d.withdrawal_total,
+            a.balance - COALESCE(SUM(d.net) OVER (
+                PARTITION BY d.account_id ORDER BY d.day
+                ROWS BETWEEN 1 FOLLOWING AND UNBOUNDED FOLLOWING
+            ), 0)
+        FROM (
+            SELECT
+                account_id,
+                {day} AS day,
+                SUM(CASE WHEN type = 'DEPOSIT' THEN 1 ELSE 0 END) AS deposit_count,
+                SUM(CASE WHEN type = 'DEPOSIT' THEN amount ELSE 0 END) AS deposit_total,
+                SUM(CASE WHEN type = 'WITHDRAWAL' THEN 1 ELSE 0 END) AS withdrawal_count,
+                SUM(CASE WHEN type = 'WITHDRAWAL' THEN amount ELSE 0 END) AS withdrawal_total,
+                SUM(CASE WHEN type = 'DEPOSIT' THEN amount ELSE -amount END) AS net
+            FROM transactions
+            GROUP BY account_id, {day}
+        ) d
+        JOIN accounts a ON a.id = d.account_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('account_daily_summary')
@@ -0,0 +1,61 @@
+"""conciliacao de saldos
+
+Revision ID: d6f0a3c8e512
+Revises: b8e2d4f6a013
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6f0a3c8e512'
+down_revision: Union[str, Sequence[str], None] = 'b8e2d4f6a013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Soma com sinal das transações da conta; na tabela quente só acima da marca
+# d'água do arquivo (linhas copiadas e ainda não removidas contam uma vez)
+NET = '''COALESCE((
+    SELECT SUM(CASE WHEN type = 'DEPOSIT' THEN amount ELSE -amount END)
+    FROM {table}
+    WHERE {table}.account_id = accounts.id{extra}
+), 0)'''
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'accounts', sa.Column('opening_balance', sa.BigInteger(), nullable=False, server_default='0')
+    )
+    # O saldo inicial das contas existentes é deduzido do saldo atual:
+    # divergências anteriores a esta migration passam a fazer parte dele
+    hot = NET.format(
+        table='transactions',
+        extra=' AND transactions.id > (SELECT COALESCE(MAX(id), 0) FROM transactions_archive)',
+    )
+    archived = NET.format(table='transactions_archive', extra='')
+    op.execute(f'UPDATE accounts SET opening_balance = balance - {hot} - {archived}')
+    op.create_table(
+        'reconciliation_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('mode', sa.String(length=16), nullable=False),
+        sa.Column('started_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('finished_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('transaction_checkpoint', sa.BigInteger(), nullable=False),
+        sa.Column('account_checkpoint', sa.BigInteger(), nullable=False),
+        sa.Column('accounts_checked', sa.BigInteger(), nullable=False),
+        sa.Column('mismatches', sa.Integer(), nullable=False),
+        sa.Column('fixed', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('reconciliation_runs')
+    with op.batch_alter_table('accounts') as batch:
+        batch.drop_column('opening_balance')
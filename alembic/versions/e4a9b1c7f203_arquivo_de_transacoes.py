@@ -0,0 +1,49 @@
+"""arquivo de transacoes
+
+Revision ID: e4a9b1c7f203
+Revises: 5b0f7d3e9c61
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a9b1c7f203'
+down_revision: Union[str, Sequence[str], None] = '5b0f7d3e9c61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'transactions_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('account_id', sa.Integer(), nullable=False),
+        # O tipo enum já existe no Postgres (tabela transactions)
+        sa.Column(
+            'type',
+            postgresql.ENUM('DEPOSIT', 'WITHDRAWAL', name='transaction_types', create_type=False),
+            nullable=False,
+        ),
+        sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('timestamp', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_transactions_archive_account_id_id', 'transactions_archive', ['account_id', 'id'], unique=False
+    )
+    op.create_index('ix_transactions_archive_timestamp', 'transactions_archive', ['timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transactions_archive_timestamp', table_name='transactions_archive')
+    op.drop_index('ix_transactions_archive_account_id_id', table_name='transactions_archive')
+    op.drop_table('transactions_archive')
@@ -0,0 +1,28 @@
+"""indice de timestamp das transacoes
+
+Revision ID: f1b7c3d9e425
+Revises: d6f0a3c8e512
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b7c3d9e425'
+down_revision: Union[str, Sequence[str], None] = 'd6f0a3c8e512'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_transactions_timestamp', 'transactions', ['timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transactions_timestamp', table_name='transactions')
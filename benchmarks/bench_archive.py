@@ -0,0 +1,166 @@
+"""Arquivamento de transações sobre uma base sintética grande.
+
+Gera `--rows` transações (padrão 10 milhões) em um SQLite temporário,
+espalhadas pelos últimos `--days` dias, e mede as consultas do
+`TransactionService` antes e depois de arquivar o que passa de
+`--horizon-days`. Também mede a vazão do arquivamento e confere que todas as
+consultas devolvem as mesmas transações nos dois momentos.
+
+Uso: python -m benchmarks.bench_archive [--rows N] [--days D] [--horizon-days H]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+ACCOUNTS = 1000
+CHUNK = 200_000
+
+
+def populate(path: str, rows: int, days: int) -> None:
+    from src.database import engine, metadata
+    import src.models.account  # noqa
+    import src.models.account_summary  # noqa
+    import src.models.idempotency  # noqa
+    import src.models.transaction  # noqa
+
+    metadata.create_all(engine)
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=OFF")
+    now = datetime.now(timezone.utc)
+    connection.executemany(
+        "INSERT INTO accounts (id, user_id, balance, created_at) VALUES (?, ?, ?, ?)",
+        ((i, i, 100_000, now.isoformat(" ")) for i in range(1, ACCOUNTS + 1)),
+    )
+    start = now - timedelta(days=days)
+    step = days * 86400 / rows
+    random.seed(42)
+
+    def generate(first: int, last: int):
+        for i in range(first, last):
+            timestamp = start + timedelta(seconds=i * step)
+            yield (
+                i + 1,
+                random.randint(1, ACCOUNTS),
+                "DEPOSIT" if i % 3 else "WITHDRAWAL",
+                random.randint(100, 50_000),
+                timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            )
+
+    for first in range(0, rows, CHUNK):
+        connection.executemany(
+            "INSERT INTO transactions (id, account_id, type, amount, timestamp) VALUES (?, ?, ?, ?, ?)",
+            generate(first, min(first + CHUNK, rows)),
+        )
+        connection.commit()
+    connection.close()
+
+
+async def timed(call, repeat: int) -> tuple[float, list[int]]:
+    """Mediana em ms de `repeat` execuções e os ids devolvidos"""
+    durations, ids = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ids = await call()
+        durations.append(time.perf_counter() - start)
+    return round(statistics.median(durations) * 1000, 3), ids
+
+
+async def measure(service, rows: int, now: datetime, repeat: int) -> dict[str, tuple[float, list[int]]]:
+    from src.pagination import encode_cursor
+
+    service.archive.expire()
+    recent = rows - 500
+    oldest = 1000
+
+    async def page(**kwargs) -> list[int]:
+        return [row.id for row in await service.read_all_transactions(100, **kwargs)]
+
+    async def account_page(**kwargs) -> list[int]:
+        return [row.id for row in await service.read_all(7, 100, **kwargs)]
+
+    async def by_id(transaction_id: int) -> list[int]:
+        return [(await service.read_by_id(transaction_id)).id]
+
+    async def export_last_day() -> list[int]:
+        return [row.id async for row in service.iterate(start=now - timedelta(days=1))]
+
+    scenarios = {
+        "recent_page_cursor": lambda: page(cursor=encode_cursor({"id": recent})),
+        "account_recent_page_cursor": lambda: account_page(cursor=encode_cursor({"id": recent - 20_000})),
+        "recent_by_id": lambda: by_id(recent),
+        "archived_by_id": lambda: by_id(oldest),
+        "first_page": lambda: page(),
+        "deep_skip_page": lambda: page(skip=rows // 2),
+        "export_last_day": export_last_day,
+    }
+    # As consultas lentas rodam menos vezes; a primeira paga a contagem do arquivo
+    return {name: await timed(call, min(repeat, 3) if name in ("deep_skip_page", "export_last_day") else repeat)
+            for name, call in scenarios.items()}
+
+
+async def main(args: argparse.Namespace, path: str) -> int:
+    from src.database import database
+    from src.services.transaction import TransactionService
+
+    start = time.perf_counter()
+    populate(path, args.rows, args.days)
+    populate_seconds = time.perf_counter() - start
+
+    await database.connect()
+    service = TransactionService()
+    now = datetime.now(timezone.utc)
+    before = await measure(service, args.rows, now, args.repeat)
+
+    start = time.perf_counter()
+    result = await service.archive.archive(
+        horizon=timedelta(days=args.horizon_days), batch_size=args.batch_size, grace=0
+    )
+    archive_seconds = time.perf_counter() - start
+
+    after = await measure(service, args.rows, now, args.repeat)
+    await database.disconnect()
+
+    mismatched = [name for name in before if before[name][1] != after[name][1]]
+    print(json.dumps({
+        "rows": args.rows,
+        "populate_s": round(populate_seconds, 1),
+        "archive": {
+            "moved": result.copied,
+            "deleted": result.deleted,
+            "seconds": round(archive_seconds, 1),
+            "rows_per_s": round(result.copied / archive_seconds) if archive_seconds else None,
+        },
+        "before_ms": {name: value[0] for name, value in before.items()},
+        "after_ms": {name: value[0] for name, value in after.items()},
+        "same_results": not mismatched,
+    }, indent=2))
+    if mismatched:
+        print("Resultados diferentes após arquivar:", ", ".join(mismatched), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--days", type=int, default=1095, help="período coberto pelas transações geradas")
+    parser.add_argument("--horizon-days", type=float, default=365)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20, help="execuções por consulta rápida")
+    args = parser.parse_args()
+    path = os.path.join(tempfile.mkdtemp(prefix="bankapi-archive-"), "bench.db")
+    # Precisa ser definido antes de importar src.config
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("ENVIRONMENT", "local")
+    logging.disable(logging.WARNING)
+    raise SystemExit(asyncio.run(main(args, path)))
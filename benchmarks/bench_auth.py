@@ -0,0 +1,65 @@
+"""Micro-benchmark do custo de autenticação por requisição.
+
+Mede `JWTBearer.__call__` + `get_current_user` com o cache de tokens
+desligado e ligado.
+
+Uso: python -m benchmarks.bench_auth [--iterations N]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from starlette.requests import Request
+
+from src.security import JWTBearer, get_current_user, sign_jwt, token_cache
+
+
+def build_request(token: str) -> Request:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/accounts/",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    }
+    return Request(scope)
+
+
+async def measure(iterations: int, cache_size: int) -> float:
+    """Retorna o custo médio, em microssegundos, de autenticar uma requisição"""
+    token = sign_jwt(user_id=1)["access_token"]
+    request = build_request(token)
+    bearer = JWTBearer()
+    token_cache.clear()
+    token_cache.maxsize = cache_size
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await get_current_user(await bearer(request))
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+async def main(iterations: int) -> None:
+    original_size = token_cache.maxsize
+    try:
+        uncached = await measure(iterations, cache_size=0)
+        cached = await measure(iterations, cache_size=max(original_size, 1))
+        stats = token_cache.stats()
+    finally:
+        token_cache.clear()
+        token_cache.maxsize = original_size
+
+    print(json.dumps({
+        "iterations": iterations,
+        "uncached_us_per_request": round(uncached, 2),
+        "cached_us_per_request": round(cached, 2),
+        "speedup": round(uncached / cached, 1),
+        "cache": stats,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
@@ -0,0 +1,118 @@
+"""Saques paralelos contra uma única conta: nenhum pode deixar o saldo negativo.
+
+Cria uma conta com saldo para exatamente `--accepted` saques de `--amount`
+e dispara `--attempts` saques em `POST /transactions/`, `--concurrency` de
+cada vez (no SQLite, acima de algumas dezenas de escritores simultâneos o
+banco responde "database is locked"; no Postgres pode ir a centenas).
+Confere que:
+
+* exatamente `--accepted` respostas foram `201` e as demais `409` (saldo insuficiente);
+* o saldo final da conta é 0;
+* a conta tem exatamente `--accepted` saques gravados.
+
+Retorna 1 se alguma verificação falhar (ex.: a corrida de leitura e escrita
+do saldo voltou e mais saques passaram do que o saldo permitia).
+
+Uso: python -m benchmarks.bench_contention [--attempts N] [--accepted N] [--concurrency N] [--database-url URL]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+
+async def main(args: argparse.Namespace) -> int:
+    import sqlalchemy as sa
+
+    from src.database import database, engine, metadata
+    from src.main import app
+    from src.models.account import accounts
+    from src.models.transaction import TransactionType, transactions
+    import src.models.account_summary  # noqa
+    import src.models.idempotency  # noqa
+
+    metadata.create_all(engine)
+    app.state.limiter.enabled = False
+    failures = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            token = (await client.post("/auth/login", json={"user_id": 1})).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            user_id = int(time.time() * 1000) % 1_000_000_000
+            amount = args.amount_cents / 100
+            response = await client.post(
+                "/accounts/", json={"user_id": user_id, "balance": amount * args.accepted}, headers=headers
+            )
+            account_id = response.json()["id"]
+
+            statuses: list[int] = []
+            attempts = iter(range(args.attempts))
+
+            async def worker() -> None:
+                for _ in attempts:
+                    response = await client.post(
+                        "/transactions/",
+                        json={"account_id": account_id, "type": "withdrawal", "amount": amount},
+                        headers=headers,
+                    )
+                    statuses.append(response.status_code)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - start
+
+            balance = await database.fetch_val(sa.select(accounts.c.balance).where(accounts.c.id == account_id))
+            stored = await database.fetch_val(
+                sa.select(sa.func.count()).where(
+                    transactions.c.account_id == account_id, transactions.c.type == TransactionType.WITHDRAWAL
+                )
+            )
+
+    accepted = statuses.count(201)
+    rejected = statuses.count(409)
+    if accepted != args.accepted:
+        failures.append(f"{accepted} saques aceitos, esperado {args.accepted}")
+    if rejected != args.attempts - args.accepted:
+        failures.append(f"{rejected} saques recusados com 409, esperado {args.attempts - args.accepted}")
+    if balance != 0:
+        failures.append(f"saldo final {balance} centavos, esperado 0")
+    if stored != args.accepted:
+        failures.append(f"{stored} saques gravados, esperado {args.accepted}")
+
+    print(json.dumps({
+        "attempts": args.attempts,
+        "concurrency": args.concurrency,
+        "accepted": accepted,
+        "rejected": rejected,
+        "final_balance_cents": balance,
+        "withdrawals_stored": stored,
+        "seconds": round(elapsed, 3),
+    }, indent=2))
+    if failures:
+        print("Verificações com falha:", *failures, sep="\n  ", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attempts", type=int, default=300, help="saques disparados em paralelo")
+    parser.add_argument("--accepted", type=int, default=100, help="saques que cabem no saldo inicial")
+    parser.add_argument("--concurrency", type=int, default=20, help="saques em andamento ao mesmo tempo")
+    parser.add_argument("--amount-cents", type=int, default=1000, help="valor de cada saque, em centavos")
+    parser.add_argument("--database-url", help="banco usado pelo app (padrão: SQLite temporário)")
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+    # Precisa ser definido antes de importar src.config
+    os.environ["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(
+        tempfile.mkdtemp(prefix="bankapi-contention-"), "bench.db"
+    )
+    os.environ.setdefault("ENVIRONMENT", "local")
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,156 @@
+"""GET condicional das listagens: página completa contra `304 Not Modified`.
+
+Cria `--accounts` contas com `--transactions` transações cada e mede, no app
+em processo, `GET /accounts/{id}/transactions?limit=100` e
+`GET /accounts/?limit=100`:
+
+* `full`: sem `If-None-Match` (consulta da listagem e serialização);
+* `not_modified`: com o ETag da resposta anterior, respondido pelo mapa de
+  versões sem tocar no banco;
+* `mixed`: um depósito a cada `--write-every` leituras condicionais, como
+  clientes que repetem a mesma página enquanto a conta muda de vez em quando.
+
+Para cada cenário reporta vazão, p50/p95 e consultas ao banco por requisição
+(de `/metrics`), além da taxa de 304. Retorna 1 se uma leitura depois de um
+depósito da própria conta receber 304.
+
+Uso: python -m benchmarks.bench_etag [--requests N] [--accounts N] [--transactions N]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.run import Bench
+
+
+async def database_calls(client: httpx.AsyncClient) -> int:
+    text = (await client.get("/metrics")).text
+    return sum(
+        int(float(line.rsplit(" ", 1)[1]))
+        for line in text.splitlines()
+        if line.startswith("db_query_duration_seconds_count")
+    )
+
+
+async def main(args: argparse.Namespace) -> int:
+    from src.database import engine, metadata
+    from src.main import app
+    import src.models.account  # noqa
+    import src.models.account_summary  # noqa
+    import src.models.idempotency  # noqa
+    import src.models.transaction  # noqa
+
+    metadata.create_all(engine)
+    app.state.limiter.enabled = False
+    failures = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            bench = Bench(client, args.requests, args.concurrency)
+            token = (await client.post("/auth/login", json={"user_id": 1})).json()["access_token"]
+            bench.headers["Authorization"] = f"Bearer {token}"
+            headers = bench.headers
+
+            base_user = int(time.time() * 1000) % 1_000_000_000 * 1000
+            accounts = []
+            for i in range(args.accounts):
+                response = await client.post("/accounts/", json={"user_id": base_user + i, "balance": 1}, headers=headers)
+                accounts.append(response.json()["id"])
+            items = [
+                {"account_id": account_id, "type": "deposit", "amount": 1}
+                for account_id in accounts
+                for _ in range(args.transactions)
+            ]
+            for start in range(0, len(items), 1000):
+                await client.post(
+                    "/transactions/batch", json={"items": items[start:start + 1000], "mode": "best_effort"}, headers=headers
+                )
+
+            def page(i: int) -> str:
+                return f"/accounts/{accounts[i % len(accounts)]}/transactions"
+
+            etags: dict[str, str] = {}
+
+            async def fetch(url: str, conditional: bool) -> httpx.Response:
+                request_headers = headers
+                if conditional and url in etags:
+                    request_headers = {**headers, "If-None-Match": etags[url]}
+                response = await client.get(url, params={"limit": 100}, headers=request_headers)
+                etags[url] = response.headers["etag"]
+                return response
+
+            writes = 0
+
+            async def mixed(i: int) -> httpx.Response:
+                nonlocal writes
+                url = page(i)
+                if i % args.write_every == 0:
+                    writes += 1
+                    await client.post(
+                        "/transactions/",
+                        json={"account_id": accounts[i % len(accounts)], "type": "deposit", "amount": 1},
+                        headers=headers,
+                    )
+                    response = await fetch(url, True)
+                    if response.status_code == 304:
+                        failures.append(f"mixed: 304 em {url} logo depois de um depósito")
+                    return response
+                return await fetch(url, True)
+
+            scenarios = (
+                ("account_transactions_full", lambda i: fetch(page(i), False), (200,)),
+                ("account_transactions_not_modified", lambda i: fetch(page(i), True), (304,)),
+                ("accounts_full", lambda i: fetch("/accounts/", False), (200,)),
+                ("accounts_not_modified", lambda i: fetch("/accounts/", True), (304,)),
+                ("account_transactions_mixed", mixed, (200, 304)),
+            )
+            for name, call, ok_status in scenarios:
+                if name.endswith("not_modified"):
+                    # ETags de todas as páginas antes de medir
+                    for i in range(len(accounts)):
+                        await call(i)
+                calls = await database_calls(client)
+                await bench.scenario(name, call, ok_status=ok_status)
+                # A própria leitura de /metrics não consulta o banco
+                bench.results[name]["db_calls_per_request"] = round(
+                    (await database_calls(client) - calls) / args.requests, 2
+                )
+            bench.results["account_transactions_mixed"]["deposits"] = writes
+
+            metrics = (await client.get("/metrics")).text
+            conditional: dict[str, dict[str, int]] = {}
+            for line in metrics.splitlines():
+                if match := re.match(r'http_conditional_requests_total\{route="([^"]*)",result="([^"]*)"\} (\S+)', line):
+                    route, result, value = match.groups()
+                    conditional.setdefault(route, {})[result] = int(float(value))
+            for counts in conditional.values():
+                counts["hit_rate"] = round(counts.get("not_modified", 0) / sum(counts.values()), 3)
+
+    print(json.dumps({**bench.results, "conditional_requests": conditional}, indent=2))
+    if failures:
+        print("Verificações com falha:", *failures[:10], sep="\n  ", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="requisições por cenário")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--accounts", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=200, help="transações por conta")
+    parser.add_argument("--write-every", type=int, default=20, help="um depósito a cada N leituras no cenário mixed")
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+    # Precisa ser definido antes de importar src.config
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bankapi-etag-"), "bench.db")
+    os.environ.setdefault("ENVIRONMENT", "local")
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,145 @@
+"""Vazão da API com logs desligados, síncronos e no pipeline em fila.
+
+Sobe o `app` em processo sobre um SQLite temporário e roda os mesmos
+cenários em três modos:
+
+* `off`: `logging.disable`, nenhum registro é criado;
+* `sync`: `StreamHandler` direto no logger raiz, texto, sem amostragem
+  (a configuração anterior, com `logging.basicConfig`);
+* `queue`: `configure_logging` da aplicação (JSON, fila, amostragem).
+
+Os logs vão para /dev/null (`--sink devnull`, só o custo de CPU) ou para um
+pipe lido por outro processo (`--sink pipe`, como o stdout capturado por um
+supervisor ou pelo driver de logs do container).
+
+Uso: python -m benchmarks.bench_logging [--requests N] [--concurrency C] [--sink pipe]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.run import Bench
+
+MODES = ("off", "sync", "queue")
+
+
+def set_mode(mode: str, stream) -> None:
+    from src.log import configure_logging, stop_logging
+    from src.config import settings
+
+    stop_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    logging.disable(logging.NOTSET)
+
+    if mode == "off":
+        logging.disable(logging.CRITICAL)
+    elif mode == "sync":
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+    else:
+        configure_logging(
+            level="INFO",
+            sample_rate=settings.log_sample_rate,
+            sample_rates=settings.log_sample_rates,
+            stream=stream,
+        )
+
+
+async def run_mode(bench: Bench, account_ids: list[int]) -> dict:
+    client, headers = bench.client, bench.headers
+    bench.results = {}
+    await bench.scenario("health", lambda i: client.get("/health"))
+    await bench.scenario("deposit", lambda i: client.post(
+        "/transactions/",
+        json={"account_id": account_ids[i % len(account_ids)], "type": "deposit", "amount": 1},
+        headers=headers,
+    ))
+    await bench.scenario("list_transactions", lambda i: client.get(
+        "/transactions/", params={"limit": 100}, headers=headers
+    ))
+    await bench.scenario("get_transaction", lambda i: client.get(f"/transactions/{i % 100 + 1}", headers=headers))
+    return {name: result["throughput_rps"] for name, result in bench.results.items()}
+
+
+async def main(args: argparse.Namespace) -> None:
+    from src.database import engine, metadata
+    from src.main import app
+    import src.models.account  # noqa
+    import src.models.account_summary  # noqa
+    import src.models.idempotency  # noqa
+    import src.models.transaction  # noqa
+
+    metadata.create_all(engine)
+    app.state.limiter.enabled = False
+    # Só os logs da aplicação: o cliente HTTP roda no mesmo processo
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.sink == "pipe":
+        reader = subprocess.Popen([sys.executable, "-c", "import sys\nfor _ in sys.stdin: pass"], stdin=subprocess.PIPE)
+        sink = open(reader.stdin.fileno(), "w", closefd=False)
+    else:
+        reader, sink = None, open(os.devnull, "w")
+    results: dict[str, dict] = {}
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30) as client:
+            bench = Bench(client, args.requests, args.concurrency)
+            token = (await client.post("/auth/login", json={"user_id": 1})).json()["access_token"]
+            bench.headers["Authorization"] = f"Bearer {token}"
+            base_user = int(time.time() * 1000) % 1_000_000_000 * 1000
+            account_ids = []
+            for i in range(10):
+                response = await client.post(
+                    "/accounts/", json={"user_id": base_user + i, "balance": 1000}, headers=bench.headers
+                )
+                account_ids.append(response.json()["id"])
+
+            # Aquecimento, depois cada modo em rodízio para diluir o crescimento da tabela
+            set_mode("off", sink)
+            await run_mode(bench, account_ids)
+            for _ in range(args.rounds):
+                for mode in MODES:
+                    set_mode(mode, sink)
+                    for name, rps in (await run_mode(bench, account_ids)).items():
+                        results.setdefault(mode, {}).setdefault(name, []).append(rps)
+
+    set_mode("off", sink)
+    report = {
+        mode: {name: round(sum(values) / len(values), 1) for name, values in scenarios.items()}
+        for mode, scenarios in results.items()
+    }
+    report["queue_vs_sync"] = {
+        name: f"{report['queue'][name] / report['sync'][name] - 1:+.0%}" for name in report["queue"]
+    }
+    report["queue_vs_off"] = {
+        name: f"{report['queue'][name] / report['off'][name] - 1:+.0%}" for name in report["queue"]
+    }
+    if reader is not None:
+        reader.stdin.close()
+        reader.wait()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="requisições por cenário")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3, help="rodadas de cada modo")
+    parser.add_argument("--sink", choices=("devnull", "pipe"), default="devnull", help="destino dos logs")
+    args = parser.parse_args()
+    # Precisa ser definido antes de importar src.config
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bankapi-bench-"), "bench.db")
+    os.environ.setdefault("ENVIRONMENT", "local")
+    asyncio.run(main(args))
@@ -0,0 +1,73 @@
+"""Micro-benchmark do custo de registro das métricas.
+
+Mede, em microssegundos por chamada, as operações que ficam no caminho
+quente: observação em histograma, incremento de contador, `query_shape` e o
+`MetricsMiddleware` completo em volta de um app ASGI vazio.
+
+Uso: python -m benchmarks.bench_metrics [--iterations N]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from src import metrics
+from src.models.account import accounts
+
+
+def per_call(iterations: int, func) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+async def middleware_overhead(iterations: int) -> float:
+    """Diferença entre chamar um app ASGI vazio com e sem o middleware"""
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    wrapped = metrics.MetricsMiddleware(app)
+    scope = {"type": "http", "method": "GET", "path": "/bench"}
+
+    async def timed(target) -> float:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await target(dict(scope), receive, send)
+        return time.perf_counter() - start
+
+    bare = await timed(app)
+    instrumented = await timed(wrapped)
+    return (instrumented - bare) / iterations * 1_000_000
+
+
+def main(iterations: int) -> None:
+    histogram = metrics.Histogram("bench_seconds", "bench", ("route",))
+    counter = metrics.Counter("bench_total", "bench", ("route", "status"))
+    select = accounts.select().where(accounts.c.id == 1)
+    update = accounts.update().where(accounts.c.id == 1).values(balance=0)
+
+    report = {
+        "iterations": iterations,
+        "histogram_observe_us": per_call(iterations, lambda: histogram.observe(0.0042, "/accounts/")),
+        "counter_inc_us": per_call(iterations, lambda: counter.inc("/accounts/", 200)),
+        "query_shape_select_us": per_call(iterations, lambda: metrics.query_shape(select)),
+        "query_shape_update_us": per_call(iterations, lambda: metrics.query_shape(update)),
+        "middleware_overhead_us": asyncio.run(middleware_overhead(iterations)),
+    }
+    print(json.dumps({key: round(value, 3) for key, value in report.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+    main(args.iterations)
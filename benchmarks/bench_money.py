@@ -0,0 +1,150 @@
+"""Valores em `Numeric(10, 2)` contra centavos inteiros.
+
+Cria dois SQLite temporários, um com o schema decimal anterior (declarado
+aqui) e outro com o atual em centavos, e mede em cada um:
+
+* o caminho de escrita de um depósito como o `TransactionService` faz:
+  validação do corpo pelo schema de entrada, `UPDATE` condicional do saldo
+  com `RETURNING` e `INSERT` da transação com `RETURNING` (sem fsync, para
+  comparar só CPU e driver);
+* o espaço ocupado pela tabela de transações e por um índice
+  `(account_id, amount)` depois de `--rows` transações, via `dbstat`.
+
+Uso: python -m benchmarks.bench_money [--operations N] [--rows N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import sqlalchemy as sa
+from databases import Database
+from pydantic import BaseModel, PositiveFloat
+
+from src.money import Cents
+
+ACCOUNTS = 100
+MAX_BALANCE = 1_000_000
+
+
+class LegacyTransactionIn(BaseModel):
+    account_id: int
+    amount: PositiveFloat
+
+
+class TransactionIn(BaseModel):
+    account_id: int
+    amount: Cents
+
+
+def build_schema(money: sa.types.TypeEngine) -> tuple[sa.MetaData, sa.Table, sa.Table]:
+    metadata = sa.MetaData()
+    accounts = sa.Table(
+        "accounts", metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("balance", money, nullable=False),
+    )
+    transactions = sa.Table(
+        "transactions", metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("account_id", sa.Integer, nullable=False),
+        sa.Column("amount", money, nullable=False),
+        sa.Index("ix_transactions_account_id_amount", "account_id", "amount"),
+    )
+    return metadata, accounts, transactions
+
+
+SCHEMAS = {
+    "numeric": (build_schema(sa.Numeric(10, 2)), LegacyTransactionIn, MAX_BALANCE),
+    "cents": (build_schema(sa.BigInteger()), TransactionIn, MAX_BALANCE * 100),
+}
+
+
+async def write_path(path: str, name: str, operations: int) -> float:
+    """µs por depósito (validação + UPDATE do saldo + INSERT da transação)"""
+    (metadata, accounts, transactions), model, max_balance = SCHEMAS[name]
+    metadata.create_all(sa.create_engine(f"sqlite:///{path}"))
+    database = Database(f"sqlite:///{path}")
+    await database.connect()
+    await database.execute_many(accounts.insert(), [{"id": i, "balance": 0} for i in range(1, ACCOUNTS + 1)])
+    bodies = [{"account_id": i % ACCOUNTS + 1, "amount": round(random.uniform(0.01, 50), 2)} for i in range(operations)]
+
+    async def deposit(body: dict) -> None:
+        transaction = model.model_validate(body)
+        new_balance = accounts.c.balance + transaction.amount
+        balance = await database.fetch_val(
+            accounts.update()
+            .where(accounts.c.id == transaction.account_id, new_balance >= 0, new_balance <= max_balance)
+            .values(balance=new_balance)
+            .returning(accounts.c.balance)
+        )
+        row = await database.fetch_one(
+            transactions.insert()
+            .values(account_id=transaction.account_id, amount=transaction.amount)
+            .returning(*transactions.c)
+        )
+        # O resumo diário acumula o valor e o saldo devolvidos
+        row.amount + balance
+
+    # Uma conexão e sem fsync: o custo de disco é igual nos dois schemas e
+    # esconderia a diferença de CPU (conversões, processadores de tipo)
+    async with database.connection():
+        await database.execute("PRAGMA synchronous=OFF")
+        await database.execute("PRAGMA journal_mode=MEMORY")
+        for body in bodies[:200]:
+            await deposit(body)
+        start = time.perf_counter()
+        for body in bodies:
+            await deposit(body)
+        elapsed = time.perf_counter() - start
+    await database.disconnect()
+    return round(elapsed / operations * 1_000_000, 1)
+
+
+def storage(path: str, name: str, rows: int) -> dict[str, int]:
+    """Bytes da tabela de transações e do índice com o valor, com os mesmos dados"""
+    (metadata, _, _), _, _ = SCHEMAS[name]
+    metadata.create_all(sa.create_engine(f"sqlite:///{path}"))
+    random.seed(7)
+    values = (
+        (random.randint(1, ACCOUNTS), random.randint(1, 500_000))
+        for _ in range(rows)
+    )
+    connection = sqlite3.connect(path)
+    if name == "numeric":
+        # O que o tipo Numeric grava no SQLite: o float em reais
+        values = ((account_id, cents / 100) for account_id, cents in values)
+    connection.executemany("INSERT INTO transactions (account_id, amount) VALUES (?, ?)", values)
+    connection.commit()
+    sizes = dict(connection.execute(
+        "SELECT name, SUM(pgsize) FROM dbstat WHERE name IN ('transactions', 'ix_transactions_account_id_amount') "
+        "GROUP BY name"
+    ).fetchall())
+    connection.close()
+    return {"table_bytes": sizes["transactions"], "index_bytes": sizes["ix_transactions_account_id_amount"]}
+
+
+async def main(args: argparse.Namespace) -> None:
+    directory = tempfile.mkdtemp(prefix="bankapi-money-")
+    random.seed(42)
+    report: dict[str, dict] = {}
+    for name in SCHEMAS:
+        report[name] = {
+            "deposit_us": await write_path(os.path.join(directory, f"write-{name}.db"), name, args.operations),
+            **storage(os.path.join(directory, f"size-{name}.db"), name, args.rows),
+        }
+    report["cents_vs_numeric"] = {
+        key: f"{report['cents'][key] / report['numeric'][key] - 1:+.0%}" for key in report["numeric"]
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operations", type=int, default=5000, help="depósitos medidos por schema")
+    parser.add_argument("--rows", type=int, default=500_000, help="transações na comparação de tamanho")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,128 @@
+"""Custo do perfil de requisições e do log de consultas lentas.
+
+Mede, no app em processo, `GET /accounts/{id}/transactions?limit=100` e
+`POST /transactions/`:
+
+* `off`: sem `X-Profile` e sem amostragem (o caminho de toda requisição);
+* `profiled`: com um `X-Profile` válido em todas as requisições (thread de
+  amostragem, lag do event loop e SQL de cada consulta).
+
+Reporta também quantas consultas passaram de `SLOW_QUERY_SECONDS`. Retorna 1
+se alguma requisição com `X-Profile` não gerar um perfil com as suas
+consultas.
+
+Uso: python -m benchmarks.bench_profiling [--requests N] [--concurrency N]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.run import Bench
+
+
+async def main(args: argparse.Namespace) -> int:
+    from src.database import engine, metadata
+    from src.main import app
+    from src.profiling import PROFILE_HEADER, PROFILE_ID_HEADER, profiler, sign_profile_token, slow_queries
+    import src.models.account  # noqa
+    import src.models.account_summary  # noqa
+    import src.models.idempotency  # noqa
+    import src.models.transaction  # noqa
+
+    metadata.create_all(engine)
+    app.state.limiter.enabled = False
+    failures = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            bench = Bench(client, args.requests, args.concurrency)
+            token = (await client.post("/auth/login", json={"user_id": 1})).json()["access_token"]
+            bench.headers["Authorization"] = f"Bearer {token}"
+            headers = bench.headers
+
+            base_user = int(time.time() * 1000) % 1_000_000_000 * 1000
+            accounts = []
+            for i in range(args.accounts):
+                response = await client.post("/accounts/", json={"user_id": base_user + i, "balance": 1}, headers=headers)
+                accounts.append(response.json()["id"])
+            items = [{"account_id": account_id, "type": "deposit", "amount": 1} for account_id in accounts] * 100
+            for start in range(0, len(items), 1000):
+                await client.post(
+                    "/transactions/batch", json={"items": items[start:start + 1000], "mode": "best_effort"}, headers=headers
+                )
+
+            # O X-Profile vale enquanto quem o emitiu for admin (ADMIN_USER_IDS abaixo)
+            profiled = {PROFILE_HEADER: sign_profile_token(1, int(time.time()) + 3600)}
+            profile_ids: list[str] = []
+
+            def listing(extra: dict):
+                async def call(i: int) -> httpx.Response:
+                    response = await client.get(
+                        f"/accounts/{accounts[i % len(accounts)]}/transactions",
+                        params={"limit": 100}, headers={**headers, **extra},
+                    )
+                    if PROFILE_ID_HEADER.lower() in response.headers:
+                        profile_ids.append(response.headers[PROFILE_ID_HEADER])
+                    return response
+                return call
+
+            def deposit(extra: dict):
+                async def call(i: int) -> httpx.Response:
+                    response = await client.post(
+                        "/transactions/",
+                        json={"account_id": accounts[i % len(accounts)], "type": "deposit", "amount": 1},
+                        headers={**headers, **extra},
+                    )
+                    if PROFILE_ID_HEADER.lower() in response.headers:
+                        profile_ids.append(response.headers[PROFILE_ID_HEADER])
+                    return response
+                return call
+
+            scenarios = (
+                ("account_transactions_off", listing({}), (200,)),
+                ("account_transactions_profiled", listing(profiled), (200,)),
+                ("create_transaction_off", deposit({}), (201,)),
+                ("create_transaction_profiled", deposit(profiled), (201,)),
+            )
+            for name, call, ok_status in scenarios:
+                await bench.scenario(name, call, ok_status=ok_status)
+            for name in ("account_transactions", "create_transaction"):
+                off, on = bench.results[f"{name}_off"], bench.results[f"{name}_profiled"]
+                on["throughput_overhead_pct"] = round((off["throughput_rps"] / on["throughput_rps"] - 1) * 100, 1)
+
+            if len(profile_ids) != 2 * args.requests:
+                failures.append(f"{len(profile_ids)} de {2 * args.requests} requisições perfiladas")
+            # O buffer guarda só os últimos PROFILING_BUFFER_SIZE perfis
+            for profile_id in profile_ids[-10:]:
+                profile = profiler.get(profile_id)
+                if profile is None or not profile.queries:
+                    failures.append(f"perfil {profile_id} ausente ou sem consultas")
+            bench.results["slow_queries"] = slow_queries.recorded
+            bench.results["slow_query_seconds"] = slow_queries.threshold
+
+    print(json.dumps(bench.results, indent=2))
+    if failures:
+        print("Verificações com falha:", *failures[:10], sep="\n  ", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="requisições por cenário")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--accounts", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+    # Precisa ser definido antes de importar src.config
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bankapi-profiling-"), "bench.db")
+    os.environ.setdefault("ENVIRONMENT", "local")
+    os.environ["ADMIN_USER_IDS"] = "[1]"
+    sys.exit(asyncio.run(main(args)))
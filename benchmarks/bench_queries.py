@@ -0,0 +1,118 @@
+"""Consultas pré-compiladas (`src/queries.py`) contra compilação a cada chamada.
+
+Cria um SQLite temporário com 100 contas e mede, com
+`PREPARED_QUERIES` ligado e desligado no mesmo processo:
+
+* `TransactionService.create` (UPDATE do saldo, INSERT da transação e
+  upsert do resumo diário, dentro de uma transação);
+* `TransactionService.read_by_id` (marca d'água do arquivo em cache e um
+  SELECT por id).
+
+Usa uma conexão e desliga o fsync: o custo de disco é o mesmo nos dois
+modos e esconderia o de CPU. `--profile` imprime as funções mais caras de
+cada modo (cProfile).
+
+Uso: python -m benchmarks.bench_queries [--operations N] [--profile]
+"""
+import argparse
+import asyncio
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import tempfile
+import time
+
+ACCOUNTS = 100
+
+
+async def measure(service, operations: int, prepared: bool, profile: bool) -> dict[str, float]:
+    from src.database import database
+    from src.models.transaction import TransactionType
+    from src.schemas.transaction import TransactionIn
+
+    database.prepared = prepared
+    random.seed(42)
+    bodies = [
+        TransactionIn(account_id=random.randint(1, ACCOUNTS), type=TransactionType.DEPOSIT, amount=random.randint(1, 5000) / 100)
+        for _ in range(operations)
+    ]
+    created: list[int] = []
+    profiler = cProfile.Profile() if profile else None
+
+    async def create() -> None:
+        for body in bodies:
+            created.append((await service.create(body)).id)
+
+    async def read() -> None:
+        for transaction_id in created[-operations:]:
+            await service.read_by_id(transaction_id)
+
+    result = {}
+    for name, call in (("create_us", create), ("read_by_id_us", read)):
+        if profiler:
+            profiler.enable()
+        start = time.perf_counter()
+        await call()
+        result[name] = round((time.perf_counter() - start) / operations * 1_000_000, 1)
+        if profiler:
+            profiler.disable()
+
+    if profiler:
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("tottime").print_stats(15)
+        print(f"--- prepared={prepared} ---", output.getvalue(), sep="\n")
+    return result
+
+
+async def main(args: argparse.Namespace) -> None:
+    from src import queries
+    from src.database import database, engine, metadata, read_database
+    from src.services.transaction import TransactionService
+    import src.models.account  # noqa
+    import src.models.account_summary  # noqa
+    import src.models.idempotency  # noqa
+    import src.models.transaction  # noqa
+
+    metadata.create_all(engine)
+    await read_database.connect()
+    compiled = queries.registry.prepare(read_database)
+    service = TransactionService()
+    report: dict[str, dict] = {}
+    async with database.connection():
+        await database.execute("PRAGMA synchronous=OFF")
+        await database.execute("PRAGMA journal_mode=MEMORY")
+        await database.execute(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :count) "
+            "INSERT INTO accounts (id, user_id, balance, opening_balance, created_at) SELECT i, i, 0, 0, CURRENT_TIMESTAMP FROM n",
+            {"count": ACCOUNTS},
+        )
+        # Aquecimento dos dois caminhos (caches do sqlite3 e do SQLAlchemy)
+        await measure(service, 200, False, False)
+        await measure(service, 200, True, False)
+        for prepared in (False, True):
+            report["prepared" if prepared else "compiled"] = await measure(
+                service, args.operations, prepared, args.profile
+            )
+    await read_database.disconnect()
+
+    report["prepared_vs_compiled"] = {
+        key: f"{report['prepared'][key] / report['compiled'][key] - 1:+.0%}" for key in report["compiled"]
+    }
+    report["registered_queries"] = compiled
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operations", type=int, default=5000, help="chamadas medidas por modo")
+    parser.add_argument("--profile", action="store_true", help="imprime o cProfile de cada modo")
+    args = parser.parse_args()
+    # Precisa ser definido antes de importar src.config
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bankapi-queries-"), "bench.db")
+    os.environ.setdefault("ENVIRONMENT", "local")
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args))
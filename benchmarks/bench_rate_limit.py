@@ -0,0 +1,87 @@
+"""Micro-benchmark do limite de taxa por requisição.
+
+Mede o custo de `RateLimit.check` (a dependência aplicada nas rotas) com os
+backends `memory://` e `sqlite:///`, e confere que vários processos
+dividindo o mesmo arquivo SQLite respeitam juntos um único limite.
+
+Uso: python -m benchmarks.bench_rate_limit [--iterations N] [--processes P]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+from src import rate_limit
+from src.exceptions import RateLimitExceededError
+
+
+async def measure(backend: rate_limit.RateLimitBackend, iterations: int) -> float:
+    """Retorna o custo médio, em microssegundos, de checar uma requisição"""
+    original = rate_limit.limiter
+    rate_limit.limiter = rate_limit.RateLimiter(backend)
+    # Limite alto e chaves variadas: mede o caminho aceito, como em produção
+    dependency = rate_limit.RateLimit("bench", limit=iterations, period=3600)
+    try:
+        start = time.perf_counter()
+        for i in range(iterations):
+            await dependency.check(f"10.0.{i % 256}.{i % 100}")
+        return (time.perf_counter() - start) / iterations * 1_000_000
+    finally:
+        await backend.close()
+        rate_limit.limiter = original
+
+
+def hammer(path: str, attempts: int, limit: int) -> int:
+    """Executado em outro processo: quantas tentativas passaram pelo limite"""
+
+    async def run() -> int:
+        limiter = rate_limit.RateLimiter(rate_limit.SQLiteRateLimitBackend(path))
+        accepted = 0
+        for _ in range(attempts):
+            accepted += (await limiter.hit("shared", limit, period=3600)).allowed
+        await limiter.close()
+        return accepted
+
+    return asyncio.run(run())
+
+
+def shared_limit_check(path: str, processes: int, attempts: int, limit: int) -> int:
+    with multiprocessing.get_context("spawn").Pool(processes) as pool:
+        return sum(pool.starmap(hammer, [(path, attempts, limit)] * processes))
+
+
+async def main(iterations: int, processes: int) -> int:
+    directory = tempfile.mkdtemp(prefix="bankapi-rate-limit-")
+    memory = await measure(rate_limit.MemoryRateLimitBackend(), iterations)
+    sqlite = await measure(rate_limit.SQLiteRateLimitBackend(os.path.join(directory, "bench.db")), iterations)
+
+    # O limite só vale para a janela corrente: usa uma hora para não virar no meio
+    limit, attempts = 100, 100
+    accepted = shared_limit_check(os.path.join(directory, "shared.db"), processes, attempts, limit)
+
+    print(json.dumps({
+        "iterations": iterations,
+        "memory_us_per_request": round(memory, 2),
+        "sqlite_us_per_request": round(sqlite, 2),
+        "shared_limit": {
+            "processes": processes,
+            "attempts": processes * attempts,
+            "limit": limit,
+            "accepted": accepted,
+        },
+    }, indent=2))
+    if accepted != limit:
+        print(f"shared_limit: {accepted} aceitas entre {processes} processos, esperado {limit}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.iterations, args.processes)))
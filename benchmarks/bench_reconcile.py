@@ -0,0 +1,173 @@
+"""Conciliação de saldos sobre uma base sintética grande.
+
+Gera `--accounts` contas (padrão 1 milhão) com `--transactions` transações
+espalhadas entre elas em um SQLite temporário, arquiva o primeiro quinto
+(e deixa mais um lote copiado no arquivo sem remover da tabela quente, como
+no meio de um arquivamento) e desvia o saldo de `--drift` contas. Mede:
+
+* execução completa com 1 e com `--workers` tarefas (contas por segundo e a
+  projeção para 10 milhões de contas);
+* execução incremental depois de `--changes` novas transações, algumas em
+  contas que também passam a divergir;
+* `--fix` seguido de uma nova execução completa, que não pode achar nada.
+
+Retorna 1 se alguma execução não encontrar exatamente as contas desviadas.
+
+Uso: python -m benchmarks.bench_reconcile [--accounts N] [--transactions N] [--workers N]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+CHUNK = 200_000
+
+
+def populate(path: str, accounts: int, transactions: int) -> None:
+    from src.database import engine, metadata
+    import src.models.account  # noqa
+    import src.models.account_summary  # noqa
+    import src.models.idempotency  # noqa
+    import src.models.reconciliation  # noqa
+    import src.models.transaction  # noqa
+
+    metadata.create_all(engine)
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=OFF")
+    random.seed(42)
+    balances = [0] * (accounts + 1)
+
+    def generate(first: int, last: int):
+        for i in range(first, last):
+            account_id = random.randint(1, accounts)
+            amount = random.randint(100, 50_000)
+            kind = "WITHDRAWAL" if i % 3 == 0 and balances[account_id] >= amount else "DEPOSIT"
+            balances[account_id] += amount if kind == "DEPOSIT" else -amount
+            yield i + 1, account_id, kind, amount
+
+    for first in range(0, transactions, CHUNK):
+        connection.executemany(
+            "INSERT INTO transactions (id, account_id, type, amount) VALUES (?, ?, ?, ?)",
+            generate(first, min(first + CHUNK, transactions)),
+        )
+        connection.commit()
+    connection.executemany(
+        "INSERT INTO accounts (id, user_id, balance, opening_balance) VALUES (?, ?, ?, ?)",
+        ((i, i, 1000 + balances[i], 1000) for i in range(1, accounts + 1)),
+    )
+    archived, copied = transactions // 5, transactions // 5 + transactions // 50
+    columns = "id, account_id, type, amount, timestamp, transfer_id"
+    connection.execute(f"INSERT INTO transactions_archive ({columns}) SELECT {columns} FROM transactions WHERE id <= ?", (copied,))
+    connection.execute("DELETE FROM transactions WHERE id <= ?", (archived,))
+    connection.commit()
+    connection.close()
+
+
+def drift(path: str, account_ids: list[int]) -> None:
+    connection = sqlite3.connect(path)
+    connection.executemany("UPDATE accounts SET balance = balance + ? WHERE id = ?", ((7, i) for i in account_ids))
+    connection.commit()
+    connection.close()
+
+
+def touched_since(path: str, transaction_id: int) -> set[int]:
+    """Contas com transações na tabela quente depois de `transaction_id`"""
+    connection = sqlite3.connect(path)
+    rows = connection.execute("SELECT DISTINCT account_id FROM transactions WHERE id > ?", (transaction_id,))
+    touched = {row[0] for row in rows}
+    connection.close()
+    return touched
+
+
+def add_transactions(path: str, accounts: int, count: int, first_id: int) -> list[int]:
+    """Depósitos consistentes (saldo atualizado junto) em contas aleatórias"""
+    connection = sqlite3.connect(path)
+    rows = [(first_id + i, random.randint(1, accounts), "DEPOSIT", 500) for i in range(count)]
+    connection.executemany("INSERT INTO transactions (id, account_id, type, amount) VALUES (?, ?, ?, ?)", rows)
+    connection.executemany("UPDATE accounts SET balance = balance + ? WHERE id = ?", ((500, row[1]) for row in rows))
+    connection.commit()
+    connection.close()
+    return sorted({row[1] for row in rows})
+
+
+async def main(args: argparse.Namespace, path: str) -> int:
+    from src.database import read_database
+    from src.services.reconciliation import ReconciliationService
+
+    start = time.perf_counter()
+    populate(path, args.accounts, args.transactions)
+    populate_seconds = time.perf_counter() - start
+    drifted = sorted(random.sample(range(1, args.accounts + 1), args.drift))
+    drift(path, drifted)
+
+    await read_database.connect()
+    service = ReconciliationService()
+    failures = []
+    report = {"accounts": args.accounts, "transactions": args.transactions, "populate_s": round(populate_seconds, 1)}
+
+    async def run(name: str, expected: list[int], **kwargs) -> None:
+        start = time.perf_counter()
+        result = await service.reconcile(range_size=args.range_size, overlap=args.overlap, **kwargs)
+        elapsed = time.perf_counter() - start
+        found = [mismatch.account_id for mismatch in result.mismatches]
+        report[name] = {
+            "mode": result.mode,
+            "workers": kwargs["workers"],
+            "accounts_checked": result.accounts_checked,
+            "mismatches": len(found),
+            "fixed": result.fixed,
+            "seconds": round(elapsed, 2),
+            "accounts_per_s": round(result.accounts_checked / elapsed),
+        }
+        if result.mode == "full":
+            report[name]["projected_10m_accounts_s"] = round(elapsed * 10_000_000 / args.accounts)
+        if found != expected:
+            missing, extra = set(expected) - set(found), set(found) - set(expected)
+            failures.append(f"{name}: {len(missing)} desvios não encontrados, {len(extra)} falsos positivos")
+
+    await run("full_1_worker", drifted, workers=1, full=True)
+    await run("full", drifted, workers=args.workers, full=True)
+
+    changed = add_transactions(path, args.accounts, args.changes, args.transactions + 1)
+    new_drift = random.sample(changed, min(args.drift, len(changed)))
+    drift(path, new_drift)
+    # A incremental só confere as contas alteradas desde o checkpoint (menos a margem de
+    # `--overlap` ids): as desviadas antes só aparecem se caírem nesse conjunto
+    checked = touched_since(path, args.transactions - args.overlap)
+    await run("incremental", sorted(set(new_drift) | (set(drifted) & checked)), workers=args.workers)
+
+    await run("full_fix", sorted(set(drifted) | set(new_drift)), workers=args.workers, full=True, fix=True)
+    await run("full_after_fix", [], workers=args.workers, full=True)
+    await read_database.disconnect()
+
+    print(json.dumps(report, indent=2))
+    if failures:
+        print("Verificações com falha:", *failures, sep="\n  ", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=1_000_000)
+    parser.add_argument("--transactions", type=int, default=5_000_000)
+    parser.add_argument("--drift", type=int, default=100, help="contas com saldo desviado")
+    parser.add_argument("--changes", type=int, default=10_000, help="transações novas antes da incremental")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--range-size", type=int, default=10_000)
+    parser.add_argument("--overlap", type=int, default=10_000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    directory = tempfile.mkdtemp(prefix="bankapi-reconcile-")
+    path = os.path.join(directory, "bench.db")
+    # Precisa ser definido antes de importar src.config
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("ENVIRONMENT", "local")
+    sys.exit(asyncio.run(main(args, path)))
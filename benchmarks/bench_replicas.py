@@ -0,0 +1,129 @@
+"""Roteamento de leituras para réplicas com dois SQLite locais.
+
+Sobe o `app` em processo com um SQLite como primário e outro como réplica
+(mais uma réplica inacessível, para exercitar o fallback). A "replicação" é
+uma cópia do arquivo do primário via backup do sqlite3. Confere que:
+
+* escritas vão para o primário e listagens são servidas pela réplica (uma
+  transação criada depois da cópia não aparece na listagem);
+* a réplica inacessível sai do rodízio e a leitura segue para a próxima;
+* `GET /transactions/{id}` recém-criado cai no primário quando a réplica
+  ainda não o tem;
+* com a réplica quebrada, as leituras voltam ao primário.
+
+Também mede o custo do roteador por leitura, sem réplicas configuradas.
+
+Uso: python -m benchmarks.bench_replicas [--iterations N]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import httpx
+
+
+def replicate(primary: str, replica: str) -> None:
+    source, target = sqlite3.connect(primary), sqlite3.connect(replica)
+    with target:
+        source.backup(target)
+    source.close()
+    target.close()
+
+
+async def router_overhead(iterations: int) -> dict:
+    from src.database import ReplicaSet, database
+
+    router = ReplicaSet(database, [], retry_after=30)
+    query = "SELECT 1"
+
+    async def measure(target) -> float:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await target.fetch_one(query)
+        return (time.perf_counter() - start) / iterations * 1_000_000
+
+    await measure(database)
+    direct, routed = await measure(database), await measure(router)
+    return {"direct_us_per_read": round(direct, 2), "routed_us_per_read": round(routed, 2)}
+
+
+async def main(args: argparse.Namespace, primary: str, replica: str) -> int:
+    from src import metrics
+    from src.database import engine, metadata, read_database
+    from src.main import app
+    import src.models.account  # noqa
+    import src.models.account_summary  # noqa
+    import src.models.idempotency  # noqa
+    import src.models.transaction  # noqa
+
+    metadata.create_all(engine)
+    app.state.limiter.enabled = False
+    checks: dict[str, bool] = {}
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            token = (await client.post("/auth/login", json={"user_id": 1})).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            account_id = (await client.post(
+                "/accounts/", json={"user_id": 1, "balance": 1000}, headers=headers
+            )).json()["id"]
+
+            async def deposit() -> int:
+                response = await client.post(
+                    "/transactions/", json={"account_id": account_id, "type": "deposit", "amount": 1}, headers=headers
+                )
+                return response.json()["id"]
+
+            for _ in range(5):
+                await deposit()
+            replicate(primary, replica)
+            latest = await deposit()
+
+            listings = [
+                [row["id"] for row in (await client.get("/transactions/", params={"limit": 100}, headers=headers)).json()]
+                for _ in range(4)
+            ]
+            checks["listing_served_by_replica"] = all(latest not in ids and len(ids) == 5 for ids in listings)
+            checks["unreachable_replica_skipped"] = metrics.db_replica_fallbacks_total.value("1") == 1
+            checks["write_on_primary"] = sqlite3.connect(primary).execute(
+                "SELECT count(*) FROM transactions"
+            ).fetchone()[0] == 6
+            response = await client.get(f"/transactions/{latest}", headers=headers)
+            checks["read_by_id_falls_back_to_primary"] = response.status_code == 200
+
+            # Réplica sem as tabelas: a leitura falha e volta para o primário
+            os.remove(replica)
+            ids = [row["id"] for row in (await client.get("/transactions/", params={"limit": 100}, headers=headers)).json()]
+            checks["broken_replica_falls_back_to_primary"] = latest in ids
+            checks["all_replicas_marked_down"] = metrics.db_replica_fallbacks_total.value("0") == 1
+
+        overhead = await router_overhead(args.iterations)
+
+    print(json.dumps({"replicas": len(read_database.replicas), "checks": checks, **overhead}, indent=2))
+    failed = [name for name, ok in checks.items() if not ok]
+    if failed:
+        print("Falhas:", ", ".join(failed), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000, help="leituras na medição do roteador")
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp(prefix="bankapi-replicas-")
+    primary, replica = os.path.join(directory, "primary.db"), os.path.join(directory, "replica.db")
+    # Precisa ser definido antes de importar src.config
+    os.environ["DATABASE_URL"] = f"sqlite:///{primary}"
+    os.environ["DATABASE_REPLICA_URLS"] = json.dumps(
+        [f"sqlite:///{replica}", f"sqlite:///{os.path.join(directory, 'inexistente', 'replica.db')}"]
+    )
+    os.environ.setdefault("ENVIRONMENT", "local")
+    logging.disable(logging.WARNING)
+    raise SystemExit(asyncio.run(main(args, primary, replica)))
@@ -0,0 +1,77 @@
+"""Micro-benchmark da serialização das listagens.
+
+Compara, para uma página de transações lida do banco, o caminho padrão do
+FastAPI (validação pelo `response_model` + JSONResponse) com o
+`RowSerializer` da view (FAST_SERIALIZATION=true).
+
+Uso: python -m benchmarks.bench_serialization [--rows 100] [--iterations N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+
+async def main(rows: int, iterations: int) -> None:
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import APIRoute, serialize_response
+
+    from src import serializers
+    from src.database import database, engine, metadata
+    from src.main import app
+    from src.models.account import accounts
+    from src.models.transaction import TransactionType, transactions
+
+    metadata.create_all(engine)
+    await database.connect()
+    try:
+        await database.execute(accounts.insert().values(id=1, user_id=1, balance=0))
+        await database.execute(transactions.insert().values([
+            {"account_id": 1, "type": TransactionType.DEPOSIT, "amount": 1050 + i * 100} for i in range(rows)
+        ]))
+        records = await database.fetch_all(transactions.select().limit(rows))
+    finally:
+        await database.disconnect()
+
+    route = next(r for r in app.routes if isinstance(r, APIRoute) and r.path == "/transactions/" and "GET" in r.methods)
+
+    async def default_path() -> bytes:
+        content = await serialize_response(field=route.response_field, response_content=records)
+        return JSONResponse(content).body
+
+    async def fast_path() -> bytes:
+        return serializers.transaction_serializer.dumps(records)
+
+    async def timed(render) -> float:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await render()
+        return (time.perf_counter() - start) / iterations
+
+    assert await default_path() == await fast_path(), "serializações divergentes"
+    default = await timed(default_path)
+    fast = await timed(fast_path)
+
+    print(json.dumps({
+        "rows": rows,
+        "iterations": iterations,
+        "encoder": "orjson" if serializers.orjson else "json",
+        "default_us_per_page": round(default * 1e6, 1),
+        "fast_us_per_page": round(fast * 1e6, 1),
+        "default_us_per_row": round(default * 1e6 / rows, 2),
+        "fast_us_per_row": round(fast * 1e6 / rows, 2),
+        "speedup": round(default / fast, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+    # Precisa ser definido antes de importar src.config
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bankapi-bench-"), "bench.db")
+    os.environ.setdefault("ENVIRONMENT", "local")
+    asyncio.run(main(args.rows, args.iterations))
@@ -0,0 +1,285 @@
+"""Milhares de conexões ociosas em `GET /accounts/{id}/stream` em um worker.
+
+Sobe um uvicorn de um worker sobre um SQLite temporário (ou usa
+`--base-url`, cujo pid é passado em `--pid` para medir memória e CPU), cria
+`--accounts` contas e abre `--subscribers` streams distribuídos entre elas.
+Mede:
+
+* memória do worker por conexão aberta (VmRSS antes e depois);
+* CPU do worker com todas as conexões ociosas por `--idle` segundos;
+* `--deposits` depósitos com as conexões abertas: vazão e latência entre o
+  envio do `POST /transactions/` e a chegada do evento em cada assinante
+  da conta;
+* retomada: um assinante desconecta, perde depósitos e reconecta com
+  `Last-Event-ID`, e precisa receber cada um exatamente uma vez.
+
+Retorna 1 se algum assinante deixar de receber ou receber em dobro alguma
+transação. O cliente roda em um único processo: abrir mais conexões que o
+limite de arquivos (`ulimit -n`) de qualquer um dos dois lados falha.
+
+Uso:
+    python -m benchmarks.bench_stream [--subscribers N] [--accounts N] [--deposits N]
+    python -m benchmarks.bench_stream --base-url http://127.0.0.1:8000 --pid 1234
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import AsyncExitStack
+
+import httpx
+
+# Conexões por cliente httpx: o pool percorre todas as conexões a cada requisição
+CLIENT_CONNECTIONS = 100
+
+
+class Subscriber:
+    """Conexão SSE que registra o horário de chegada de cada transação"""
+
+    def __init__(self, client: httpx.AsyncClient, account_id: int):
+        self.client = client
+        self.account_id = account_id
+        self.received: dict[int, float] = {}
+        self.duplicates = 0
+        self.last_id: int | None = None
+        self.ready = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+    def start(self, headers: dict[str, str]) -> None:
+        self.ready.clear()
+        self.task = asyncio.create_task(self.listen(headers))
+
+    async def listen(self, headers: dict[str, str]) -> None:
+        if self.last_id is not None:
+            headers = {**headers, "Last-Event-ID": str(self.last_id)}
+        async with self.client.stream("GET", f"/accounts/{self.account_id}/stream", headers=headers) as response:
+            response.raise_for_status()
+            event_id = None
+            async for line in response.aiter_lines():
+                if line.startswith("retry:"):
+                    self.ready.set()
+                elif line.startswith("id: "):
+                    event_id = int(line[4:])
+                elif line.startswith("data: ") and event_id is not None:
+                    if event_id in self.received:
+                        self.duplicates += 1
+                    self.received[event_id] = time.perf_counter()
+                    self.last_id = event_id
+
+    async def stop(self) -> None:
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def process_stats(pid: int) -> tuple[int, float]:
+    """(VmRSS em KiB, segundos de CPU) do processo, via /proc"""
+    with open(f"/proc/{pid}/status") as status:
+        rss = next(int(line.split()[1]) for line in status if line.startswith("VmRSS:"))
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return rss, (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def wait_subscribers(client: httpx.AsyncClient, expected: int, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        text = (await client.get("/metrics")).text
+        value = next(line for line in text.splitlines() if line.startswith("transaction_stream_subscribers "))
+        if int(float(value.split()[1])) >= expected:
+            return
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"{expected} conexões não abriram em {timeout} s")
+
+
+async def deposit(client: httpx.AsyncClient, headers: dict, account_id: int, sent: dict[int, tuple[int, float]]) -> None:
+    start = time.perf_counter()
+    response = await client.post(
+        "/transactions/", json={"account_id": account_id, "type": "deposit", "amount": 1}, headers=headers
+    )
+    response.raise_for_status()
+    sent[response.json()["id"]] = (account_id, start)
+
+
+async def settle(subscribers: list[Subscriber], sent: dict[int, tuple[int, float]], timeout: float = 30) -> None:
+    """Aguarda cada assinante receber as transações da sua conta"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if all(
+            transaction_id in subscriber.received
+            for subscriber in subscribers
+            for transaction_id, (account_id, _) in sent.items()
+            if account_id == subscriber.account_id
+        ):
+            return
+        await asyncio.sleep(0.1)
+
+
+async def main(args: argparse.Namespace) -> int:
+    server = None
+    base_url, pid = args.base_url, args.pid
+    if not base_url:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning",
+             "--no-access-log", "--timeout-graceful-shutdown", "1"],
+            env={**os.environ, "RATE_LIMIT_REQUESTS": "100000000", "LOG_LEVEL": "WARNING"},
+        )
+        pid = server.pid
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    timeout = httpx.Timeout(60, read=None)
+    failures = []
+    report: dict[str, dict] = {}
+    try:
+        async with AsyncExitStack() as stack:
+            client = await stack.enter_async_context(httpx.AsyncClient(base_url=base_url, timeout=timeout))
+            for _ in range(100):
+                try:
+                    await client.get("/health")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            token = (await client.post("/auth/login", json={"user_id": 1})).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+
+            base_user = int(time.time() * 1000) % 1_000_000_000 * 1000
+            accounts = []
+            for i in range(args.accounts):
+                response = await client.post("/accounts/", json={"user_id": base_user + i, "balance": 1}, headers=headers)
+                response.raise_for_status()
+                accounts.append(response.json()["id"])
+
+            rss_before, _ = process_stats(pid) if pid else (0, 0.0)
+            stream_clients = [
+                await stack.enter_async_context(httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout))
+                for _ in range(0, args.subscribers, CLIENT_CONNECTIONS)
+            ]
+            subscribers = [
+                Subscriber(stream_clients[i // CLIENT_CONNECTIONS], accounts[i % len(accounts)])
+                for i in range(args.subscribers)
+            ]
+            start = time.perf_counter()
+            for subscriber in subscribers:
+                subscriber.start(headers)
+            await asyncio.gather(*(subscriber.ready.wait() for subscriber in subscribers))
+            await wait_subscribers(client, args.subscribers)
+            report["connect"] = {
+                "subscribers": args.subscribers,
+                "seconds": round(time.perf_counter() - start, 2),
+            }
+
+            if pid:
+                rss_after, cpu_before = process_stats(pid)
+                await asyncio.sleep(args.idle)
+                _, cpu_after = process_stats(pid)
+                report["idle"] = {
+                    "seconds": args.idle,
+                    "worker_rss_mib": round(rss_after / 1024, 1),
+                    "kib_per_subscriber": round((rss_after - rss_before) / args.subscribers, 1),
+                    "worker_cpu_percent": round((cpu_after - cpu_before) / args.idle * 100, 2),
+                }
+
+            # Depósitos com todas as conexões abertas
+            random.seed(42)
+            sent: dict[int, tuple[int, float]] = {}
+            plan = iter([random.choice(accounts) for _ in range(args.deposits)])
+
+            async def worker() -> None:
+                for account_id in plan:
+                    await deposit(client, headers, account_id, sent)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - start
+            await settle(subscribers, sent)
+            latencies = []
+            missing = 0
+            for subscriber in subscribers:
+                for transaction_id, (account_id, sent_at) in sent.items():
+                    if account_id != subscriber.account_id:
+                        continue
+                    if transaction_id in subscriber.received:
+                        latencies.append(subscriber.received[transaction_id] - sent_at)
+                    else:
+                        missing += 1
+            cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else [0] * 99
+            report["deposits"] = {
+                "deposits": args.deposits,
+                "throughput_rps": round(args.deposits / elapsed, 1),
+                "deliveries": len(latencies),
+                "missing": missing,
+                "delivery_p50_ms": round(cuts[49] * 1000, 2),
+                "delivery_p99_ms": round(cuts[98] * 1000, 2),
+            }
+            if missing:
+                failures.append(f"deposits: {missing} entregas não chegaram")
+
+            # Retomada pelo Last-Event-ID
+            subscriber = subscribers[0]
+            await subscriber.stop()
+            missed: dict[int, tuple[int, float]] = {}
+            for _ in range(args.resume):
+                await deposit(client, headers, subscriber.account_id, missed)
+            subscriber.start(headers)
+            await subscriber.ready.wait()
+            await settle([subscriber], missed)
+            received = sum(transaction_id in subscriber.received for transaction_id in missed)
+            report["resume"] = {"missed_while_disconnected": len(missed), "replayed": received}
+            if received != len(missed):
+                failures.append(f"resume: {received} de {len(missed)} transações reenviadas")
+
+            duplicates = sum(subscriber.duplicates for subscriber in subscribers)
+            if duplicates:
+                failures.append(f"{duplicates} transações entregues em dobro")
+            await asyncio.gather(*(subscriber.stop() for subscriber in subscribers))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(json.dumps(report, indent=2))
+    if failures:
+        print("Verificações com falha:", *failures, sep="\n  ", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=5000, help="conexões abertas no worker")
+    parser.add_argument("--accounts", type=int, default=500, help="contas entre as quais as conexões se dividem")
+    parser.add_argument("--deposits", type=int, default=1000, help="depósitos com as conexões abertas")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--idle", type=float, default=10, help="segundos medindo a CPU ociosa")
+    parser.add_argument("--resume", type=int, default=20, help="depósitos perdidos pelo assinante que reconecta")
+    parser.add_argument("--base-url", help="mede um servidor em execução em vez de subir um uvicorn")
+    parser.add_argument("--pid", type=int, help="pid do worker de --base-url, para memória e CPU")
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+    if not args.base_url:
+        # O uvicorn herda o ambiente; o schema é criado aqui antes de ele subir
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bankapi-stream-"), "bench.db")
+        os.environ.setdefault("ENVIRONMENT", "local")
+        from src.database import engine, metadata
+        import src.models.account  # noqa
+        import src.models.account_summary  # noqa
+        import src.models.idempotency  # noqa
+        import src.models.transaction  # noqa
+
+        metadata.create_all(engine)
+    sys.exit(asyncio.run(main(args)))
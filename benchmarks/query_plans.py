@@ -0,0 +1,359 @@
+"""Planos de execução das consultas de `AccountService` e `TransactionService`.
+
+Cria o schema com as migrations do Alembic (não com `metadata.create_all`:
+um índice que só existe no modelo também é uma regressão), popula contas e
+transações, arquiva as mais antigas e roda `ANALYZE`. Depois chama os
+métodos dos dois serviços (listagens com offset e cursor, exportações por
+conta e por período, leitura por id, depósito, saque recusado,
+transferência, lotes e importação de contas), registra cada consulta que
+cada chamada manda ao banco e pede o plano dela:
+
+* SQLite: `EXPLAIN QUERY PLAN`;
+* Postgres: `EXPLAIN (FORMAT JSON)` com `enable_seqscan = off`, para que o
+  tamanho pequeno das tabelas não esconda a falta de um índice.
+
+Conta como varredura completa ler a tabela inteira (`SCAN`, `Seq Scan`,
+índice sem condição) ou só uma faixa da chave primária: com o cursor ou a
+marca d'água do arquivo no início, `WHERE account_id = ? AND id > ?` sem o
+índice composto percorre a tabela quente toda e o SQLite reporta isso como
+`SEARCH ... (rowid>?)`.
+
+Retorna 1 se alguma consulta varrer uma tabela inteira sem estar em
+`EXPECTED_SCANS` (as leituras que por natureza percorrem tudo, com o motivo).
+
+Uso: python -m benchmarks.query_plans [--database-url URL] [--accounts N] [--transactions N] [--verbose]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+# Varreduras aceitas, por chamada e tabela
+EXPECTED_SCANS = {
+    ("AccountService.read_all", "accounts"): "primeira página de todas as contas, limitada por limit",
+    ("AccountService.read_all(skip)", "accounts"): "offset sobre todas as contas, limitado por offset + limit",
+    ("AccountService.read_all(cursor)", "accounts"): "todas as contas a partir do cursor, limitado por limit",
+    ("TransactionService.read_all_transactions", "transactions"): "todas as transações, limitado por limit",
+    ("TransactionService.read_all_transactions", "transactions_archive"): "todas as transações, limitado por limit",
+    ("TransactionService.read_all_transactions(skip)", "transactions"): "todas as transações, limitado por limit",
+    ("TransactionService.read_all_transactions(skip)", "transactions_archive"): (
+        "o offset conta as linhas arquivadas até a marca d'água (em cache enquanto ela não muda)"
+    ),
+    ("TransactionService.read_all_transactions(cursor)", "transactions"): "todas as transações, limitado por limit",
+    ("TransactionService.read_all_transactions(cursor)", "transactions_archive"): (
+        "todas as transações, limitado por limit"
+    ),
+    # No SQLite as duas faixas abertas (id acima da marca d'água e timestamp >= start) têm o
+    # mesmo custo estimado e a do rowid entrega em ordem de id sem ordenar: o export continua
+    # em streaming. Com `end` o período fechado usa ix_transactions_timestamp
+    ("TransactionService.iterate(start)", "transactions"): "exportação de um período aberto, em ordem de id",
+}
+
+# Acesso a uma tabela sem índice (`SCAN`) ou só por uma faixa do rowid
+SQLITE_FULL_SCAN = re.compile(
+    r"^(?:SCAN (?:TABLE )?(\w+)(?! USING (?:COVERING )?INDEX \w+ \()"
+    r"|SEARCH (?:TABLE )?(\w+) USING INTEGER PRIMARY KEY \(rowid[<>]\?(?: AND rowid[<>]\?)?\))"
+)
+CHUNK = 10_000
+
+
+def migrate(url: str) -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini"))
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "head")
+
+
+def seed(url: str, accounts: int, transactions: int) -> None:
+    """Contas e transações espalhadas nos últimos dois anos, em ordem de id"""
+    import sqlalchemy as sa
+
+    from src.models.account import accounts as accounts_table
+    from src.models.transaction import TransactionType, transactions as transactions_table
+
+    random.seed(7)
+    engine = sa.create_engine(url)
+    now = datetime.now(timezone.utc)
+    with engine.begin() as connection:
+        connection.execute(accounts_table.insert(), [
+            {"user_id": i, "balance": 10_000_000, "opening_balance": 10_000_000, "created_at": now}
+            for i in range(1, accounts + 1)
+        ])
+        step = timedelta(days=730) / transactions
+        for start in range(0, transactions, CHUNK):
+            connection.execute(transactions_table.insert(), [
+                {
+                    "account_id": random.randint(1, accounts),
+                    "type": TransactionType.DEPOSIT,
+                    "amount": 100,
+                    "timestamp": now - timedelta(days=730) + step * i,
+                }
+                for i in range(start, min(start + CHUNK, transactions))
+            ])
+    engine.dispose()
+
+
+class QueryRecorder:
+    """Registra as consultas executadas em um `InstrumentedDatabase`, uma por chamada e SQL"""
+
+    OPERATIONS = ("fetch_all", "fetch_one", "fetch_val", "execute", "execute_many", "iterate")
+
+    def __init__(self, target):
+        self.target = target
+        self.call = ""
+        self.queries: dict[tuple[str, str], tuple[str, str, object, dict]] = {}
+
+    def __enter__(self) -> "QueryRecorder":
+        for operation in self.OPERATIONS:
+            setattr(self.target, operation, self.__wrap(operation, getattr(self.target, operation)))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        for operation in self.OPERATIONS:
+            delattr(self.target, operation)
+
+    def __wrap(self, operation, method):
+        def recorded(query, *args, **kwargs):
+            values = args[0] if args else kwargs.get("values")
+            if operation == "execute_many":
+                values = values[0] if values else None
+            if self.call:
+                self.queries.setdefault((self.call, self.key(query)), (self.call, operation, query, values or {}))
+            return method(query, *args, **kwargs)
+        return recorded
+
+    def key(self, query) -> str:
+        """SQL sem os valores: listas de IN de tamanhos diferentes contam uma vez só"""
+        from src.database import PreparedQuery
+
+        dialect = self.target._backend._dialect
+        if isinstance(query, PreparedQuery):
+            return query.compile(dialect).sql
+        return str(query.compile(dialect=dialect))
+
+    @staticmethod
+    def compile(connection, query, values: dict) -> tuple[str, list]:
+        """SQL e argumentos como o banco os recebe na execução"""
+        from src.database import PreparedQuery
+
+        if isinstance(query, PreparedQuery):
+            compiled = query.compile(connection._connection._dialect)
+            return compiled.sql, compiled.args(values)
+        sql, args = connection._connection._compile(query)[:2]
+        return sql, list(args)
+
+
+async def exercise(recorder: QueryRecorder) -> None:
+    """Chama os métodos públicos dos dois serviços, cada um com o seu rótulo"""
+    import sqlalchemy as sa
+
+    from src.database import database
+    from src.exceptions import BusinessError
+    from src.models.account import accounts
+    from src.models.transaction import transactions, transactions_archive
+    from src.pagination import encode_cursor
+    from src.schemas.account import AccountIn
+    from src.schemas.transaction import TransactionBatchIn, TransactionIn
+    from src.schemas.transfer import TransferIn
+    from src.services.account import AccountService
+    from src.services.transaction import TransactionService
+
+    account_service = AccountService()
+    transaction_service = TransactionService()
+    first, second = (row.id for row in await database.fetch_all(accounts.select().order_by(accounts.c.id).limit(2)))
+    archived = await database.fetch_val(sa.select(sa.func.max(transactions_archive.c.id)))
+    newest = await database.fetch_val(sa.select(sa.func.max(transactions.c.id)))
+    now = datetime.now(timezone.utc)
+
+    async def import_accounts():
+        for i in range(3):
+            yield {"user_id": 10_000_100 + i, "balance": "1.00"}
+        yield {"user_id": 1, "balance": "1.00"}
+
+    async def drain(iterator):
+        async for _ in iterator:
+            pass
+
+    async def rejected_withdrawal():
+        try:
+            await transaction_service.create(TransactionIn(account_id=first, type="withdrawal", amount="999999.00"))
+        except BusinessError:
+            pass
+
+    def batch(mode: str) -> TransactionBatchIn:
+        return TransactionBatchIn(mode=mode, items=[
+            TransactionIn(account_id=first, type="deposit", amount="1.00"),
+            TransactionIn(account_id=second, type="withdrawal", amount="1.00"),
+        ])
+
+    calls = (
+        ("AccountService.read_all", lambda: account_service.read_all(limit=50)),
+        ("AccountService.read_all(skip)", lambda: account_service.read_all(limit=50, skip=100)),
+        ("AccountService.read_all(cursor)", lambda: account_service.read_all(limit=50, cursor=encode_cursor({"id": first}))),
+        ("AccountService.create", lambda: account_service.create(AccountIn(user_id=10_000_001, balance="100.00"))),
+        ("AccountService.create_bulk", lambda: account_service.create_bulk(import_accounts())),
+        ("TransactionService.read_all", lambda: transaction_service.read_all(first, limit=50)),
+        ("TransactionService.read_all(skip)", lambda: transaction_service.read_all(first, limit=50, skip=20)),
+        (
+            "TransactionService.read_all(cursor)",
+            lambda: transaction_service.read_all(first, limit=50, cursor=encode_cursor({"id": 1})),
+        ),
+        ("TransactionService.read_all_transactions", lambda: transaction_service.read_all_transactions(limit=50)),
+        (
+            "TransactionService.read_all_transactions(skip)",
+            lambda: transaction_service.read_all_transactions(limit=50, skip=100),
+        ),
+        (
+            "TransactionService.read_all_transactions(cursor)",
+            lambda: transaction_service.read_all_transactions(limit=50, cursor=encode_cursor({"id": 1})),
+        ),
+        ("TransactionService.read_by_id(archived)", lambda: transaction_service.read_by_id(archived)),
+        ("TransactionService.read_by_id", lambda: transaction_service.read_by_id(newest)),
+        ("TransactionService.iterate(account)", lambda: drain(transaction_service.iterate(account_id=first))),
+        (
+            "TransactionService.iterate(account, start)",
+            lambda: drain(transaction_service.iterate(account_id=first, start=now - timedelta(days=30))),
+        ),
+        ("TransactionService.iterate(start)", lambda: drain(transaction_service.iterate(start=now - timedelta(days=30)))),
+        (
+            "TransactionService.iterate(start, end)",
+            lambda: drain(transaction_service.iterate(start=now - timedelta(days=700), end=now - timedelta(days=690))),
+        ),
+        (
+            "TransactionService.create",
+            lambda: transaction_service.create(TransactionIn(account_id=first, type="deposit", amount="5.00")),
+        ),
+        ("TransactionService.create(rejected)", rejected_withdrawal),
+        (
+            "TransactionService.transfer",
+            lambda: transaction_service.transfer(
+                TransferIn(source_account_id=first, destination_account_id=second, amount="1.00")
+            ),
+        ),
+        ("TransactionService.create_batch", lambda: transaction_service.create_batch(batch("all_or_nothing"))),
+        ("TransactionService.create_batch(best_effort)", lambda: transaction_service.create_batch(batch("best_effort"))),
+    )
+    for name, call in calls:
+        recorder.call = name
+        await call()
+
+
+def full_scans_sqlite(plan: list) -> list[str]:
+    from src.database import metadata
+
+    tables = []
+    for row in plan:
+        match = SQLITE_FULL_SCAN.match(row[3])
+        table = match and (match.group(1) or match.group(2))
+        if table in metadata.tables:
+            tables.append(table)
+    return tables
+
+
+def full_scans_postgres(plan: list) -> list[str]:
+    tables = []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        nodes.extend(node.get("Plans", ()))
+        if node["Node Type"] == "Seq Scan":
+            tables.append(node["Relation Name"])
+        elif node["Node Type"] in ("Index Scan", "Index Only Scan", "Bitmap Index Scan"):
+            condition = node.get("Index Cond")
+            index = node["Index Name"]
+            # Sem condição, ou só uma faixa da chave primária (sem igualdade)
+            if condition is None or (index.endswith("_pkey") and " = " not in condition):
+                tables.append(node.get("Relation Name") or index.removesuffix("_pkey"))
+    return tables
+
+
+async def explain(recorder: QueryRecorder, verbose: bool) -> list[dict]:
+    from src.database import PreparedQuery, database
+    from src.metrics import query_shape
+
+    dialect = database.url.dialect
+    report = []
+    async with database.connection() as connection:
+        raw = connection.raw_connection
+        for call, operation, query, values in recorder.queries.values():
+            sql, args = recorder.compile(connection, query, values)
+            if dialect == "postgresql":
+                async with raw.transaction():
+                    await raw.execute("SET LOCAL enable_seqscan = off")
+                    plan = json.loads(await raw.fetchval("EXPLAIN (FORMAT JSON) " + sql, *args))
+                scans = full_scans_postgres(plan)
+                detail = plan[0]["Plan"]
+            else:
+                async with raw.execute("EXPLAIN QUERY PLAN " + sql, args) as cursor:
+                    plan = await cursor.fetchall()
+                scans = full_scans_sqlite(plan)
+                detail = [row[3] for row in plan]
+            unexpected = [table for table in scans if (call, table) not in EXPECTED_SCANS]
+            entry = {
+                "call": call,
+                "operation": operation,
+                "query": query.shape if isinstance(query, PreparedQuery) else query_shape(query),
+                "full_scans": scans,
+                "unexpected": unexpected,
+                "sql": sql,
+            }
+            if verbose or unexpected:
+                entry["plan"] = detail
+            report.append(entry)
+    return report
+
+
+async def main(args: argparse.Namespace) -> int:
+    from src.database import database, read_database
+    from src.services.archive import ArchiveService
+
+    migrate(args.database_url)
+    seed(args.database_url, args.accounts, args.transactions)
+    await read_database.connect()
+    # Primeiro terço arquivado: as leituras passam pelas duas tabelas
+    await ArchiveService().archive(timedelta(days=490), batch_size=CHUNK, grace=0)
+    await database.execute("ANALYZE")
+
+    with QueryRecorder(database) as recorder:
+        await exercise(recorder)
+    report = await explain(recorder, args.verbose)
+    await read_database.disconnect()
+
+    failures = [entry for entry in report if entry["unexpected"]]
+    print(json.dumps({
+        "dialect": database.url.dialect,
+        "calls": len({entry["call"] for entry in report}),
+        "queries": len(report),
+        "full_scans_expected": sum(1 for entry in report if entry["full_scans"] and not entry["unexpected"]),
+        "full_scans_unexpected": len(failures),
+        "plans": report if args.verbose else failures,
+    }, indent=2, default=str))
+    if failures:
+        print(f"{len(failures)} consultas com varredura completa inesperada", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="banco vazio, criado pelas migrations (padrão: SQLite temporário)")
+    parser.add_argument("--accounts", type=int, default=2000)
+    parser.add_argument("--transactions", type=int, default=50_000)
+    parser.add_argument("--verbose", action="store_true", help="mostra o plano de todas as consultas")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    args.database_url = args.database_url or "sqlite:///" + os.path.join(
+        tempfile.mkdtemp(prefix="bankapi-plans-"), "plans.db"
+    )
+    # Precisa ser definido antes de importar src.config
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("ENVIRONMENT", "local")
+    sys.exit(asyncio.run(main(args)))
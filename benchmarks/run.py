@@ -0,0 +1,254 @@
+"""Suíte de carga da API: vazão e latência p50/p95/p99 por cenário.
+
+Por padrão sobe o `app` de `src.main` em processo (transporte ASGI) sobre um
+SQLite temporário. Com `--database-url` usa outro banco (ex.: um Postgres
+local) e com `--base-url` mede um servidor já em execução (uvicorn).
+
+Uso:
+    python -m benchmarks.run                                 # relatório JSON
+    python -m benchmarks.run --check benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+
+import httpx
+
+# Métricas comparadas com a baseline e o sentido em que pioram (p99 é
+# ruidoso demais no SQLite para servir de critério)
+REGRESSION_METRICS = {"throughput_rps": -1, "p95_ms": 1}
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int
+    concurrency: int
+    elapsed: float
+    latencies: list[float] = field(repr=False)
+    errors: int
+
+    def report(self) -> dict:
+        latencies = sorted(self.latencies)
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+        return {
+            "requests": self.requests,
+            "concurrency": self.concurrency,
+            "errors": self.errors,
+            "throughput_rps": round(self.requests / self.elapsed, 1),
+            "p50_ms": round(cuts[49] * 1000, 3),
+            "p95_ms": round(cuts[94] * 1000, 3),
+            "p99_ms": round(cuts[98] * 1000, 3),
+        }
+
+
+class Bench:
+    """Executa os cenários contra um cliente HTTP já autenticado"""
+
+    def __init__(self, client: httpx.AsyncClient, requests: int, concurrency: int):
+        self.client = client
+        self.requests = requests
+        self.concurrency = concurrency
+        self.headers: dict[str, str] = {}
+        self.results: dict[str, dict] = {}
+
+    async def scenario(
+        self,
+        name: str,
+        make_request: Callable[[int], Awaitable[httpx.Response]],
+        requests: int | None = None,
+        ok_status: tuple[int, ...] = (200, 201),
+    ) -> ScenarioResult:
+        total = requests or self.requests
+        latencies: list[float] = []
+        errors = 0
+        counter = iter(range(total))
+
+        async def worker() -> None:
+            nonlocal errors
+            for i in counter:
+                start = time.perf_counter()
+                response = await make_request(i)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code not in ok_status:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, total))))
+        result = ScenarioResult(name, total, self.concurrency, time.perf_counter() - start, latencies, errors)
+        self.results[name] = result.report()
+        return result
+
+    async def run(self) -> dict:
+        client, headers = self.client, self.headers
+
+        await self.scenario("health", lambda i: client.get("/health"))
+        await self.scenario("login", lambda i: client.post("/auth/login", json={"user_id": i + 1}))
+
+        token = (await client.post("/auth/login", json={"user_id": 1})).json()["access_token"]
+        headers["Authorization"] = f"Bearer {token}"
+
+        # Cada execução usa uma faixa nova de user_id para não colidir com dados antigos
+        base_user = int(time.time() * 1000) % 1_000_000_000 * 1000
+        accounts: list[int] = []
+
+        async def create_account(i: int) -> httpx.Response:
+            response = await client.post(
+                "/accounts/", json={"user_id": base_user + i, "balance": 1000}, headers=headers
+            )
+            if response.status_code == 201:
+                accounts.append(response.json()["id"])
+            return response
+
+        await self.scenario("create_account", create_account)
+        hot = accounts[:10]
+
+        await self.scenario("deposit", lambda i: client.post(
+            "/transactions/",
+            json={"account_id": hot[i % len(hot)], "type": "deposit", "amount": 1},
+            headers=headers,
+        ))
+        await self.scenario("withdrawal", lambda i: client.post(
+            "/transactions/",
+            json={"account_id": hot[i % len(hot)], "type": "withdrawal", "amount": 1},
+            headers=headers,
+        ))
+        await self.overdraft_check(accounts[-1])
+
+        for depth in (0, 100, 1000):
+            await self.scenario(f"list_transactions_skip_{depth}", lambda i, depth=depth: client.get(
+                "/transactions/", params={"limit": 100, "skip": depth}, headers=headers
+            ))
+        await self.scenario("list_transactions_cursor", self.cursor_walker("/transactions/"))
+        await self.scenario("list_account_transactions", lambda i: client.get(
+            f"/accounts/{hot[i % len(hot)]}/transactions", params={"limit": 100}, headers=headers
+        ))
+        await self.scenario("list_accounts", lambda i: client.get(
+            "/accounts/", params={"limit": 100}, headers=headers
+        ))
+        return self.results
+
+    def cursor_walker(self, path: str) -> Callable[[int], Awaitable[httpx.Response]]:
+        """Percorre a listagem página a página, recomeçando ao chegar no fim"""
+        cursor: str | None = None
+
+        async def next_page(i: int) -> httpx.Response:
+            nonlocal cursor
+            params = {"limit": 100, **({"cursor": cursor} if cursor else {})}
+            response = await self.client.get(path, params=params, headers=self.headers)
+            cursor = response.headers.get("X-Next-Cursor")
+            return response
+
+        return next_page
+
+    async def overdraft_check(self, account_id: int) -> None:
+        """Saques paralelos acima do saldo: só os que cabem no saldo podem passar"""
+        attempts, amount = 300, 10
+        result = await self.scenario(
+            "withdrawal_contention",
+            lambda i: self.client.post(
+                "/transactions/",
+                json={"account_id": account_id, "type": "withdrawal", "amount": amount},
+                headers=self.headers,
+            ),
+            requests=attempts,
+            ok_status=(201,),
+        )
+        accepted = attempts - result.errors
+        expected = int(1000 // amount)
+        if accepted != expected:
+            raise SystemExit(
+                f"withdrawal_contention: {accepted} saques aceitos, esperado {expected} (saldo inconsistente)"
+            )
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Lista os cenários que pioraram além da tolerância em relação à baseline"""
+    failures = []
+    for name, expected in baseline.items():
+        current = results.get(name)
+        if current is None:
+            continue
+        for metric, direction in REGRESSION_METRICS.items():
+            before, after = expected.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * direction
+            if change > tolerance:
+                failures.append(f"{name}.{metric}: {before} -> {after} ({change:+.0%})")
+    return failures
+
+
+async def main(args: argparse.Namespace) -> int:
+    async with AsyncExitStack() as stack:
+        if args.base_url:
+            client = httpx.AsyncClient(base_url=args.base_url, timeout=30)
+        else:
+            from src.database import engine, metadata
+            from src.main import app
+            import src.models.account  # noqa
+            import src.models.account_summary  # noqa
+            import src.models.transaction  # noqa
+
+            metadata.create_all(engine)
+            app.state.limiter.enabled = False
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=30
+            )
+        await stack.enter_async_context(client)
+        results = await Bench(client, args.requests, args.concurrency).run()
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(report + "\n")
+    print(report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            file.write(report + "\n")
+
+    if args.check:
+        with open(args.check) as file:
+            failures = compare(results, json.load(file), args.tolerance)
+        if failures:
+            print("Regressões acima de {:.0%}:".format(args.tolerance), *failures, sep="\n  ", file=sys.stderr)
+            return 1
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="requisições por cenário")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--base-url", help="mede um servidor em execução em vez do app em processo")
+    parser.add_argument("--database-url", help="banco usado pelo app em processo (padrão: SQLite temporário)")
+    parser.add_argument("--output", help="arquivo para gravar o relatório JSON")
+    parser.add_argument("--check", metavar="BASELINE", help="falha se algum cenário regredir em relação à baseline")
+    parser.add_argument("--save-baseline", metavar="BASELINE")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="regressão máxima aceita (0.25 = 25%%)")
+    parser.add_argument("--log-level", default="ERROR", help="nível mínimo dos logs da aplicação durante a medição")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.disable(getattr(logging, args.log_level.upper()) - 1)
+    if not args.base_url:
+        # Precisa ser definido antes de importar src.config
+        os.environ["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(
+            tempfile.mkdtemp(prefix="bankapi-bench-"), "bench.db"
+        )
+        os.environ.setdefault("ENVIRONMENT", "local")
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,66 @@
+"""Backends de cache chave/valor com TTL.
+
+`memory://` (padrão) guarda as entradas no próprio processo, com expiração e
+despejo LRU. `redis://...` compartilha o cache entre workers e requer o
+pacote `redis` instalado.
+"""
+import time
+from collections import OrderedDict
+from typing import Protocol
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> str | None: ...
+
+    async def set(self, key: str, value: str, ttl: float) -> None: ...
+
+
+class MemoryBackend:
+    """Cache em processo com TTL por entrada e despejo LRU"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    async def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class RedisBackend:
+    """Cache compartilhado entre workers via Redis"""
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("CACHE_URL redis:// requer o pacote 'redis' instalado") from exc
+        self._client = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> str | None:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await self._client.set(key, value, px=int(ttl * 1000))
+
+
+def build_backend(url: str, maxsize: int) -> CacheBackend:
+    """Cria o backend indicado pelo esquema da URL"""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    if url.startswith("memory://"):
+        return MemoryBackend(maxsize)
+    raise ValueError(f"Backend de cache não suportado: {url}")
@@ -0,0 +1,59 @@
+"""Arquiva transações antigas em `transactions_archive`.
+
+Move, em lotes curtos, as transações anteriores ao horizonte para o arquivo;
+as listagens continuam enxergando tudo (ver `ArchiveService`). Pode rodar
+com a API no ar e ser agendado (ex.: cron diário).
+
+Uso:
+    python -m src.commands.archive                      # horizonte ARCHIVE_HORIZON_DAYS
+    python -m src.commands.archive --horizon-days 90 --batch-size 10000
+    python -m src.commands.archive --dry-run            # só conta
+"""
+import argparse
+import asyncio
+import json
+from datetime import timedelta
+
+from src.config import settings
+from src.database import database
+from src.log import configure_logging, stop_logging
+from src.services.archive import ArchiveService
+
+
+async def main(args: argparse.Namespace) -> None:
+    await database.connect()
+    try:
+        result = await ArchiveService().archive(
+            horizon=timedelta(days=args.horizon_days),
+            batch_size=args.batch_size,
+            grace=args.grace,
+            dry_run=args.dry_run,
+        )
+    finally:
+        await database.disconnect()
+    stop_logging()
+    print(json.dumps({
+        "dry_run": args.dry_run,
+        "copied": result.copied,
+        "deleted": result.deleted,
+        "watermark": result.watermark,
+    }))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--horizon-days", type=float, default=settings.archive_horizon_days)
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size, help="ids por transação")
+    parser.add_argument(
+        "--grace",
+        type=float,
+        default=settings.archive_watermark_ttl * 2 + 1,
+        help="segundos entre copiar e remover da tabela quente (maior que ARCHIVE_WATERMARK_TTL)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="só conta o que seria arquivado")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    configure_logging(level=settings.log_level, log_format=settings.log_format)
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,88 @@
+"""Concilia `accounts.balance` com as transações de cada conta.
+
+Divide os ids das contas em faixas conferidas em paralelo e reporta as
+contas cujo saldo difere de `opening_balance` + depósitos - saques (tabela
+quente e arquivo). Depois da primeira execução completa, as seguintes só
+conferem as contas com transações desde a última conclusão. Pode rodar com a
+API no ar e ser agendado (ex.: cron a cada hora).
+
+Saída: uma linha JSON por conta divergente (em `--report`, ou na saída
+padrão) e, no fim, uma linha JSON com o resumo. Retorna 1 se houver
+divergência não corrigida.
+
+Uso:
+    python -m src.commands.reconcile                    # incremental (completa na primeira vez)
+    python -m src.commands.reconcile --full --workers 8
+    python -m src.commands.reconcile --fix --report divergencias.jsonl
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from src.config import settings
+from src.database import read_database
+from src.log import configure_logging, stop_logging
+from src.services.reconciliation import ReconciliationService
+
+
+async def main(args: argparse.Namespace) -> int:
+    start = time.perf_counter()
+    await read_database.connect()
+    try:
+        result = await ReconciliationService().reconcile(
+            workers=args.workers,
+            range_size=args.range_size,
+            full=args.full,
+            fix=args.fix,
+            overlap=args.overlap,
+        )
+    finally:
+        await read_database.disconnect()
+    stop_logging()
+
+    report = open(args.report, "w") if args.report else sys.stdout
+    try:
+        for mismatch in result.mismatches:
+            report.write(json.dumps({
+                "account_id": mismatch.account_id,
+                "balance": mismatch.balance,
+                "expected": mismatch.expected,
+                "difference": mismatch.balance - mismatch.expected,
+                "fixed": mismatch.fixed,
+            }) + "\n")
+    finally:
+        if report is not sys.stdout:
+            report.close()
+    print(json.dumps({
+        "mode": result.mode,
+        "since": result.since,
+        "accounts_checked": result.accounts_checked,
+        "mismatches": len(result.mismatches),
+        "fixed": result.fixed,
+        "transaction_checkpoint": result.transaction_checkpoint,
+        "seconds": round(time.perf_counter() - start, 2),
+    }))
+    return 1 if len(result.mismatches) > result.fixed else 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="confere todas as contas, ignorando o checkpoint")
+    parser.add_argument("--fix", action="store_true", help="corrige os saldos divergentes")
+    parser.add_argument("--workers", type=int, default=settings.reconcile_workers, help="consultas em paralelo")
+    parser.add_argument("--range-size", type=int, default=settings.reconcile_range_size, help="ids de conta por consulta")
+    parser.add_argument(
+        "--overlap",
+        type=int,
+        default=settings.reconcile_overlap_ids,
+        help="ids de transação antes do checkpoint conferidos de novo (commits fora de ordem)",
+    )
+    parser.add_argument("--report", help="arquivo JSON lines das contas divergentes (padrão: saída padrão)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    configure_logging(level=settings.log_level, log_format=settings.log_format)
+    sys.exit(asyncio.run(main(parse_args())))
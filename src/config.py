@@ -1,20 +1,81 @@
+from decimal import ROUND_CEILING, ROUND_FLOOR
+from functools import cached_property
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from src.money import limit_to_cents
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore", env_file_encoding="utf-8")
 
     database_url: str
+    database_replica_urls: list[str] = []
+    database_replica_retry_seconds: float = 30
+    database_pool_min_size: int = 1
+    database_pool_max_size: int = 10
+    prepared_queries: bool = True
     environment: str = "production"
     jwt_secret: str
     jwt_algorithm: str = "HS256"
     jwt_expiration_hours: float = 0.25
     jwt_refresh_expiration_days: int = 7
+    jwt_cache_size: int = 10000
     max_login_attempts: int = 5
     login_attempt_window: int = 3600
+    max_login_requests: int = 60
+    login_request_window: int = 3600
+    max_refresh_requests: int = 60
+    refresh_request_window: int = 3600
     rate_limit_requests: int = 100
     rate_limit_period: int = 60
+    rate_limit_url: str = "memory://"
     min_transaction_amount: float = 0.01
     max_account_balance: float = 1000000.0
+    max_batch_size: int = 1000
+    max_bulk_accounts: int = 100000
+    bulk_chunk_size: int = 5000
+    write_queue_size: int = 10000
+    write_batch_size: int = 500
+    write_ticket_cache_size: int = 100000
+    write_ticket_ttl: float = 3600
+    write_queue_drain_seconds: float = 30
+    idempotency_cache_size: int = 10000
+    cache_url: str = "memory://"
+    account_cache_size: int = 100000
+    account_cache_ttl: float = 300
+    fast_serialization: bool = False
+    etag_version_ttl: float = 1
+    etag_version_window: int = 1000
+    stream_queue_size: int = 100
+    stream_max_subscribers: int = 10000
+    stream_heartbeat_seconds: float = 15
+    stream_resync_seconds: float = 0
+    archive_horizon_days: int = 365
+    archive_batch_size: int = 5000
+    archive_watermark_ttl: float = 5
+    reconcile_workers: int = 4
+    reconcile_range_size: int = 10000
+    reconcile_overlap_ids: int = 10000
+    admin_user_ids: list[int] = []
+    profiling_secret: str | None = None
+    profiling_sample_rate: float = 0
+    profiling_sample_interval: float = 0.005
+    profiling_buffer_size: int = 100
+    slow_query_seconds: float = 0.2
+    slow_query_log_size: int = 500
+    log_level: str = "INFO"
+    log_format: str = "json"
+    log_sample_rate: float = 0.01
+    log_sample_rates: dict[str, float] = {}
+
+    # Limites em reais nas variáveis de ambiente; os serviços comparam centavos
+    @cached_property
+    def min_transaction_cents(self) -> int:
+        return limit_to_cents(self.min_transaction_amount, ROUND_CEILING)
+
+    @cached_property
+    def max_account_balance_cents(self) -> int:
+        return limit_to_cents(self.max_account_balance, ROUND_FLOOR)
 
 settings = Settings()
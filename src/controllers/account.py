@@ -1,12 +1,24 @@
 import logging
-from fastapi import APIRouter, Depends, status, Query
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, Header, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
 from typing import Annotated
 
+from src.etag import ETAG_HEADER, make_etag, not_modified
+from src.pagination import NEXT_CURSOR_HEADER, next_cursor
+from src.parsers import csv_items, json_items
 from src.schemas.account import AccountIn
+from src.schemas.transaction import ExportFormat
 from src.security import login_required, get_current_user
+from src.serializers import (
+    account_serializer, event_stream_response, export_response, list_response, transaction_serializer
+)
 from src.services.account import AccountService
+from src.services.account_versions import account_versions
+from src.services.summary import SummaryService
 from src.services.transaction import TransactionService
-from src.views.account import AccountOut, TransactionOut
+from src.views.account import AccountBulkOut, AccountDailySummaryOut, AccountOut, TransactionOut
+from src.log import SAMPLED
 
 logger = logging.getLogger(__name__)
 
@@ -14,16 +26,32 @@ router = APIRouter(prefix="/accounts", dependencies=[Depends(login_required)])
 
 account_service = AccountService()
 tx_service = TransactionService() 
+summary_service = SummaryService()
 
 @router.get("/", response_model=list[AccountOut])
 async def read_account(
+    request: Request,
+    response: Response,
     limit: int = Query(10, ge=1, le=100),
     skip: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="Cursor retornado em X-Next-Cursor; tem precedência sobre skip"),
     current_user: Annotated[dict, Depends(get_current_user)] = None
 ):
-    """Lista todas as contas com paginação"""
-    logger.info(f"Listando contas - user_id={current_user['user_id']}, limit={limit}, skip={skip}")
-    return await account_service.read_all(limit=limit, skip=skip)
+    """Lista todas as contas com paginação.
+
+    Devolve um ETag fraco e responde `304` a `If-None-Match` igual. Escritas
+    feitas em outro worker podem levar até `ETAG_VERSION_TTL` segundos
+    (padrão 1) para mudar o ETag; as deste worker mudam na hora.
+    """
+    logger.info("Listando contas - user_id=%s, limit=%s, skip=%s", current_user['user_id'], limit, skip, extra=SAMPLED)
+    etag = make_etag("accounts", await account_versions.listing(), limit, skip, cursor)
+    if cached := not_modified(request, etag):
+        return cached
+    response.headers[ETAG_HEADER] = etag
+    result = await account_service.read_all(limit=limit, skip=skip, cursor=cursor)
+    if cursor_value := next_cursor(result, limit):
+        response.headers[NEXT_CURSOR_HEADER] = cursor_value
+    return list_response(result, account_serializer, response)
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=AccountOut)
 async def create_account(
@@ -31,16 +59,94 @@ async def create_account(
     current_user: Annotated[dict, Depends(get_current_user)] = None
 ):
     """Cria uma nova conta"""
-    logger.info(f"Criando conta para user_id={account.user_id}")
+    logger.info("Criando conta para user_id=%s", account.user_id)
     return await account_service.create(account)
 
+@router.post(
+    "/bulk",
+    status_code=status.HTTP_200_OK,
+    response_model=AccountBulkOut,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": AccountIn.model_json_schema()}},
+                "text/csv": {"schema": {"type": "string", "example": "user_id,balance\n1,100.50\n2,0.01\n"}},
+            },
+        }
+    },
+)
+async def create_accounts_bulk(
+    request: Request,
+    current_user: Annotated[dict, Depends(get_current_user)] = None
+):
+    """Importa contas em massa de um array JSON ou de um CSV (user_id,balance), com resultado por linha"""
+    content_type = request.headers.get("content-type", "")
+    logger.info("Importando contas - user_id=%s, content_type=%s", current_user['user_id'], content_type)
+    if content_type.startswith("text/csv"):
+        items = csv_items(request.stream(), columns=AccountIn.model_fields)
+    else:
+        items = json_items(await request.body())
+    return await account_service.create_bulk(items)
+
 @router.get("/{id}/transactions", response_model=list[TransactionOut])
 async def read_account_transactions(
     id: int,
+    request: Request,
+    response: Response,
     limit: int = Query(10, ge=1, le=100),
     skip: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="Cursor retornado em X-Next-Cursor; tem precedência sobre skip"),
+    current_user: Annotated[dict, Depends(get_current_user)] = None
+):
+    """Lista transações de uma conta específica.
+
+    Devolve um ETag fraco e responde `304` a `If-None-Match` igual. Escritas
+    feitas em outro worker podem levar até `ETAG_VERSION_TTL` segundos
+    (padrão 1) para mudar o ETag; as deste worker mudam na hora.
+    """
+    logger.info("Listando transações da conta %s - user_id=%s", id, current_user['user_id'], extra=SAMPLED)
+    etag = make_etag("account_transactions", id, await account_versions.account(id), limit, skip, cursor)
+    if cached := not_modified(request, etag):
+        return cached
+    response.headers[ETAG_HEADER] = etag
+    result = await tx_service.read_all(account_id=id, limit=limit, skip=skip, cursor=cursor)
+    if cursor_value := next_cursor(result, limit):
+        response.headers[NEXT_CURSOR_HEADER] = cursor_value
+    return list_response(result, transaction_serializer, response)
+
+@router.get("/{id}/transactions/export", response_class=StreamingResponse)
+async def export_account_transactions(
+    id: int,
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    start: datetime | None = Query(None, description="Início do período (inclusivo)"),
+    end: datetime | None = Query(None, description="Fim do período (exclusivo)"),
+    current_user: Annotated[dict, Depends(get_current_user)] = None
+):
+    """Exporta as transações de uma conta em NDJSON ou CSV, via streaming"""
+    logger.info("Exportando transações da conta %s - user_id=%s, format=%s", id, current_user['user_id'], format.value)
+    rows = await tx_service.open_export(account_id=id, start=start, end=end)
+    return export_response(rows, format, filename=f"account_{id}_transactions")
+
+@router.get("/{id}/stream", response_class=StreamingResponse)
+async def stream_account_transactions(
+    id: int,
+    last_event_id: int | None = Header(None, alias="Last-Event-ID", description="Último id recebido; enviado pelo EventSource ao reconectar"),
+    after: int | None = Query(None, description="Retoma depois deste id de transação quando não há Last-Event-ID"),
+    current_user: Annotated[dict, Depends(get_current_user)] = None
+):
+    """Transmite as transações novas da conta via Server-Sent Events, com retomada pelo último id"""
+    logger.info("Abrindo stream da conta %s - user_id=%s", id, current_user['user_id'])
+    rows = await tx_service.open_stream(account_id=id, after=last_event_id if last_event_id is not None else after)
+    return event_stream_response(rows)
+
+@router.get("/{id}/summary", response_model=list[AccountDailySummaryOut])
+async def read_account_summary(
+    id: int,
+    start: date | None = Query(None, alias="from", description="Primeiro dia (inclusivo)"),
+    end: date | None = Query(None, alias="to", description="Último dia (inclusivo)"),
     current_user: Annotated[dict, Depends(get_current_user)] = None
 ):
-    """Lista transações de uma conta específica"""
-    logger.info(f"Listando transações da conta {id} - user_id={current_user['user_id']}")
-    return await tx_service.read_all(account_id=id, limit=limit, skip=skip)
+    """Retorna os totais diários de depósitos, saques e saldo de fechamento da conta"""
+    logger.info("Obtendo resumo diário da conta %s - user_id=%s, from=%s, to=%s", id, current_user['user_id'], start, end, extra=SAMPLED)
+    return await summary_service.read_range(account_id=id, start=start, end=end)
@@ -0,0 +1,63 @@
+import logging
+import time
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+from typing import Annotated
+
+from src.config import settings
+from src.exceptions import ProfileNotFoundError
+from src.profiling import PROFILE_HEADER, profiler, sign_profile_token, slow_queries
+from src.rate_limit import UserRateLimit
+from src.security import admin_required
+from src.views.admin import ProfileOut, ProfileSummaryOut, ProfileTokenOut, SlowQueryOut
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/admin",
+    dependencies=[
+        Depends(admin_required),
+        Depends(UserRateLimit("admin", settings.rate_limit_requests, settings.rate_limit_period)),
+    ],
+)
+
+@router.post("/profiles/token", response_model=ProfileTokenOut)
+async def create_profile_token(
+    ttl: int = Query(300, ge=1, le=3600, description="Validade do header, em segundos"),
+    current_user: Annotated[dict, Depends(admin_required)] = None
+):
+    """Emitir um valor de X-Profile para perfilar requisições até expirar"""
+    expires_at = int(time.time()) + ttl
+    logger.info("Token de perfil emitido para user_id=%s, válido por %s s", current_user["user_id"], ttl)
+    return {
+        "header": PROFILE_HEADER,
+        "value": sign_profile_token(current_user["user_id"], expires_at),
+        "expires_at": datetime.fromtimestamp(expires_at, timezone.utc),
+    }
+
+@router.get("/profiles", response_model=list[ProfileSummaryOut])
+async def list_profiles(limit: int = Query(20, ge=1, le=1000)):
+    """Listar os perfis capturados, do mais recente ao mais antigo"""
+    return [profile.summary() for profile in profiler.recent(limit)]
+
+@router.get("/profiles/{profile_id}", response_model=ProfileOut)
+async def read_profile(profile_id: str):
+    """Perfil de uma requisição: pilhas amostradas, lag do event loop e consultas ao banco"""
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise ProfileNotFoundError
+    return profile.to_dict()
+
+@router.get("/profiles/{profile_id}/folded", response_class=PlainTextResponse)
+async def read_profile_folded(profile_id: str):
+    """Pilhas do perfil no formato folded, para flamegraph.pl ou speedscope"""
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise ProfileNotFoundError
+    return profile.folded()
+
+@router.get("/slow-queries", response_model=list[SlowQueryOut])
+async def list_slow_queries(limit: int = Query(100, ge=1, le=1000)):
+    """Consultas acima de SLOW_QUERY_SECONDS, da mais recente à mais antiga"""
+    return slow_queries.recent(limit)
@@ -1,6 +1,8 @@
 import logging
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Depends, status
 
+from src.config import settings
+from src.rate_limit import FailedAttemptsRateLimit, RateLimit
 from src.schemas.auth import LoginIn
 from src.security import sign_jwt, sign_refresh_jwt
 from src.views.auth import LoginOut
@@ -9,10 +11,18 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth")
 
-@router.post("/login", response_model=LoginOut, status_code=status.HTTP_200_OK)
+# Login: toda tentativa conta para o limite de emissão de tokens, por IP
+login_request_rate_limit = RateLimit("login_requests", settings.max_login_requests, settings.login_request_window)
+# ...e as com falha têm um limite menor, também por IP
+login_rate_limit = FailedAttemptsRateLimit("login", settings.max_login_attempts, settings.login_attempt_window)
+# Refresh tem limite próprio: um cliente legítimo renova o token a cada expiração
+refresh_rate_limit = RateLimit("refresh", settings.max_refresh_requests, settings.refresh_request_window)
+
+@router.post("/login", response_model=LoginOut, status_code=status.HTTP_200_OK,
+             dependencies=[Depends(login_request_rate_limit), Depends(login_rate_limit)])
 async def login(data: LoginIn):
     """Realizar login e obter tokens de acesso e refresh"""
-    logger.info(f"Login realizado para user_id={data.user_id}")
+    logger.info("Login realizado para user_id=%s", data.user_id)
     access_token = sign_jwt(user_id=data.user_id, token_type="access")
     refresh_token = sign_refresh_jwt(user_id=data.user_id)
     
@@ -23,10 +33,10 @@ async def login(data: LoginIn):
         "expires_in": int(0.25 * 3600)
     }
 
-@router.post("/refresh", response_model=LoginOut, status_code=status.HTTP_200_OK)
+@router.post("/refresh", response_model=LoginOut, status_code=status.HTTP_200_OK, dependencies=[Depends(refresh_rate_limit)])
 async def refresh_token(data: LoginIn):
     """Renovar token de acesso"""
-    logger.info(f"Token renovado para user_id={data.user_id}")
+    logger.info("Token renovado para user_id=%s", data.user_id)
     access_token = sign_jwt(user_id=data.user_id, token_type="access")
     
     return {
@@ -1,36 +1,118 @@
 import logging
-from fastapi import APIRouter, Depends, status, Query
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, Response, status, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Annotated
 
-from src.schemas.transaction import TransactionIn
+from src.config import settings
+from src.pagination import NEXT_CURSOR_HEADER, next_cursor
+from src.rate_limit import UserRateLimit
+from src.schemas.transaction import ExportFormat, TransactionBatchIn, TransactionIn
 from src.security import login_required, get_current_user
+from src.serializers import export_response, list_response, ticket_to_dict, transaction_serializer
+from src.services.idempotency import IdempotencyService, IdempotentRequest, StoredResponse
 from src.services.transaction import TransactionService
-from src.views.transaction import TransactionOut
+from src.services.write_queue import write_queue
+from src.views.transaction import TicketOut, TransactionBatchOut, TransactionOut
+from src.log import SAMPLED
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/transactions", dependencies=[Depends(login_required)])
+router = APIRouter(
+    prefix="/transactions",
+    dependencies=[
+        Depends(login_required),
+        Depends(UserRateLimit("transactions", settings.rate_limit_requests, settings.rate_limit_period)),
+    ],
+)
 
 service = TransactionService()
+idempotency_service = IdempotencyService()
 
-@router.post("/", status_code=status.HTTP_201_CREATED, response_model=TransactionOut)
+@router.post(
+    "/",
+    status_code=status.HTTP_201_CREATED,
+    response_model=TransactionOut,
+    responses={status.HTTP_202_ACCEPTED: {"model": TicketOut, "description": "Enfileirada (Prefer: respond-async)"}},
+)
 async def create_transaction(
     transaction: TransactionIn,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
+    prefer: str | None = Header(None, description="`respond-async` enfileira a transação e responde 202 com um ticket"),
     current_user: Annotated[dict, Depends(get_current_user)] = None
 ):
     """Criar uma nova transação de depósito ou saque"""
-    logger.info(f"Criando transação - account_id={transaction.account_id}, type={transaction.type}, amount={transaction.amount}")
-    return await service.create(transaction)
+    logger.info("Criando transação - account_id=%s, type=%s, amount_cents=%s", transaction.account_id, transaction.type, transaction.amount)
+    # Requisições com Idempotency-Key continuam síncronas: a chave é gravada no commit da transação
+    if prefer and "respond-async" in prefer and not idempotency_key and write_queue.accepting:
+        ticket = await write_queue.submit(current_user["user_id"], transaction)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=ticket_to_dict(ticket),
+            headers={"Location": f"{router.prefix}/tickets/{ticket.id}", "Preference-Applied": "respond-async"},
+        )
+    if not idempotency_key:
+        return await service.create(transaction)
+
+    request = IdempotentRequest.build(current_user["user_id"], idempotency_key, f"POST {router.prefix}", transaction)
+
+    async def create_once() -> StoredResponse:
+        result = await service.create(
+            transaction,
+            before_commit=lambda row: idempotency_service.save(
+                request, status.HTTP_201_CREATED, transaction_serializer.to_dict(row)
+            ),
+        )
+        return StoredResponse(request.fingerprint, status.HTTP_201_CREATED, transaction_serializer.to_dict(result))
+
+    stored = await idempotency_service.run(request, create_once)
+    headers = {"Idempotent-Replayed": "true"} if stored.replayed else None
+    return JSONResponse(status_code=stored.status_code, content=stored.body, headers=headers)
+
+@router.post("/batch", status_code=status.HTTP_200_OK, response_model=TransactionBatchOut)
+async def create_transaction_batch(
+    batch: TransactionBatchIn,
+    current_user: Annotated[dict, Depends(get_current_user)] = None
+):
+    """Criar um lote de transações, com resultado individual por item"""
+    logger.info("Criando lote de transações - itens=%s, mode=%s", len(batch.items), batch.mode)
+    return await service.create_batch(batch)
 
 @router.get("/", response_model=list[TransactionOut])
 async def list_all_transactions(
+    response: Response,
     limit: int = Query(10, ge=1, le=100),
     skip: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="Cursor retornado em X-Next-Cursor; tem precedência sobre skip"),
     current_user: Annotated[dict, Depends(get_current_user)] = None
 ):
     """Retorna o histórico de todas as transações do sistema com paginação"""
-    logger.info(f"Listando todas as transações - user_id={current_user['user_id']}")
-    return await service.read_all_transactions(limit=limit, skip=skip)
+    logger.info("Listando todas as transações - user_id=%s", current_user['user_id'], extra=SAMPLED)
+    result = await service.read_all_transactions(limit=limit, skip=skip, cursor=cursor)
+    if cursor_value := next_cursor(result, limit):
+        response.headers[NEXT_CURSOR_HEADER] = cursor_value
+    return list_response(result, transaction_serializer, response)
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_transactions(
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    start: datetime | None = Query(None, description="Início do período (inclusivo)"),
+    end: datetime | None = Query(None, description="Fim do período (exclusivo)"),
+    current_user: Annotated[dict, Depends(get_current_user)] = None
+):
+    """Exporta todas as transações do período em NDJSON ou CSV, via streaming"""
+    logger.info("Exportando transações - user_id=%s, format=%s, start=%s, end=%s", current_user['user_id'], format.value, start, end)
+    rows = service.iterate(start=start, end=end)
+    return export_response(rows, format, filename="transactions")
+
+@router.get("/tickets/{ticket_id}", response_model=TicketOut)
+async def get_ticket(
+    ticket_id: str,
+    current_user: Annotated[dict, Depends(get_current_user)] = None
+):
+    """Situação de uma transação enfileirada: queued, committed (com a transação) ou rejected (com o erro)"""
+    logger.info("Obtendo ticket %s - user_id=%s", ticket_id, current_user['user_id'], extra=SAMPLED)
+    return JSONResponse(content=await write_queue.get(ticket_id, current_user["user_id"]))
 
 @router.get("/{transaction_id}", response_model=TransactionOut)
 async def get_transaction(
@@ -38,7 +120,7 @@ async def get_transaction(
     current_user: Annotated[dict, Depends(get_current_user)] = None
 ):
     """Retorna os detalhes de uma transação específica pelo ID"""
-    logger.info(f"Obtendo transação {transaction_id} - user_id={current_user['user_id']}")
+    logger.info("Obtendo transação %s - user_id=%s", transaction_id, current_user['user_id'], extra=SAMPLED)
     return await service.read_by_id(transaction_id)
 
 
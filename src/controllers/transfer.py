@@ -0,0 +1,57 @@
+import logging
+from fastapi import APIRouter, Depends, Header, status
+from fastapi.responses import JSONResponse
+from typing import Annotated
+
+from src.config import settings
+from src.rate_limit import UserRateLimit
+from src.schemas.transfer import TransferIn
+from src.security import login_required, get_current_user
+from src.serializers import transfer_to_dict
+from src.services.idempotency import IdempotencyService, IdempotentRequest, StoredResponse
+from src.services.transaction import TransactionService
+from src.views.transaction import TransferOut
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/transfers",
+    dependencies=[
+        Depends(login_required),
+        Depends(UserRateLimit("transfers", settings.rate_limit_requests, settings.rate_limit_period)),
+    ],
+)
+
+service = TransactionService()
+idempotency_service = IdempotencyService()
+
+# `POST /transfers` sem redirecionamento; `/transfers/` continua aceito
+@router.post("", status_code=status.HTTP_201_CREATED, response_model=TransferOut)
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=TransferOut, include_in_schema=False)
+async def create_transfer(
+    transfer: TransferIn,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
+    current_user: Annotated[dict, Depends(get_current_user)] = None
+):
+    """Transferir um valor entre duas contas de forma atômica"""
+    logger.info(
+        "Criando transferência - source_account_id=%s, destination_account_id=%s, amount_cents=%s",
+        transfer.source_account_id, transfer.destination_account_id, transfer.amount,
+    )
+    if not idempotency_key:
+        return await service.transfer(transfer)
+
+    request = IdempotentRequest.build(current_user["user_id"], idempotency_key, f"POST {router.prefix}", transfer)
+
+    async def transfer_once() -> StoredResponse:
+        result = await service.transfer(
+            transfer,
+            before_commit=lambda created: idempotency_service.save(
+                request, status.HTTP_201_CREATED, transfer_to_dict(created)
+            ),
+        )
+        return StoredResponse(request.fingerprint, status.HTTP_201_CREATED, transfer_to_dict(result))
+
+    stored = await idempotency_service.run(request, transfer_once)
+    headers = {"Idempotent-Replayed": "true"} if stored.replayed else None
+    return JSONResponse(status_code=stored.status_code, content=stored.body, headers=headers)
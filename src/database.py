@@ -1,14 +1,415 @@
+import logging
+import time
+import typing
+
 import databases
 import sqlalchemy as sa 
-
+from databases.backends.common.records import Record, Row, create_column_maps
+from sqlalchemy.engine.cursor import CursorResultMetaData
+from sqlalchemy.engine.interfaces import Dialect
+from sqlalchemy.sql import ClauseElement, visitors
+from sqlalchemy.sql.elements import BindParameter
 
 from src.config import settings
+from src.metrics import (
+    db_query_duration_seconds,
+    db_query_errors_total,
+    db_replica_fallbacks_total,
+    db_transactions_total,
+    query_shape,
+)
+from src.profiling import current_profile, slow_queries
+
+logger = logging.getLogger(__name__)
+
+
+
+class _CompiledQuery:
+    """SQL pronta para o driver de um dialeto e o necessário para montar argumentos e registros"""
+
+    def __init__(self, statement: ClauseElement, dialect: Dialect):
+        compiled = statement.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+        if dialect.name == "postgresql":
+            # asyncpg usa $1, $2...: mesma numeração que o backend do databases
+            names = sorted(compiled.params)
+            self.sql = compiled.string % {name: f"${i}" for i, name in enumerate(names, start=1)}
+        else:
+            names = compiled.positiontup
+            self.sql = compiled.string
+        processors = compiled._bind_processors
+        self.params = tuple(
+            (name, processors.get(name), compiled.binds[name].required, compiled.params[name]) for name in names
+        )
+        self.dialect = dialect
+        self.result_columns = compiled._result_columns
+        self.column_maps = create_column_maps(self.result_columns)
+        # No SQLite os valores passam pelos processadores do SQLAlchemy (`Row`);
+        # os metadados do cursor são criados na primeira execução e reaproveitados
+        self.context = None
+        self.metadata: CursorResultMetaData | None = None
+        if dialect.name == "sqlite":
+            from databases.backends.sqlite import CompilationContext
+
+            execution_context = dialect.execution_ctx_cls()
+            execution_context.dialect = dialect
+            execution_context.result_column_struct = (
+                compiled._result_columns,
+                compiled._ordered_columns,
+                compiled._textual_ordered_columns,
+                compiled._ad_hoc_textual,
+                compiled._loose_column_name_matching,
+            )
+            self.context = CompilationContext(execution_context)
+
+    def args(self, values: dict) -> list:
+        args = []
+        for name, processor, required, default in self.params:
+            value = values[name] if required else values.get(name, default)
+            args.append(processor(value) if processor is not None else value)
+        return args
+
+    def record(self, row: typing.Any, description: typing.Any = None) -> Record:
+        if self.context is not None:
+            if self.metadata is None:
+                self.metadata = CursorResultMetaData(self.context, description)
+            row = Row(self.metadata, self.metadata._processors, self.metadata._keymap, row)
+        return Record(row, self.result_columns, self.dialect, self.column_maps)
+
+
+class PreparedQuery:
+    """Consulta de formato fixo, compilada uma única vez por dialeto.
+
+    Os valores variáveis são `sa.bindparam` com nome, passados a cada
+    execução como em uma query textual:
+    `await database.fetch_one(queries.transaction_by_id, {"id": 1})`.
+    A execução não passa pelo compilador do SQLAlchemy: no SQLite a string
+    SQL vai direto ao aiosqlite (que mantém o cache de statements do
+    sqlite3); no asyncpg a mesma string reaproveita o prepared statement do
+    cache de cada conexão. Ver `src/queries.py`.
+
+    A execução direta depende de internos do `databases` e do SQLAlchemy
+    (processadores de bind, colunas do resultado compilado, dialeto e lock da
+    conexão), por isso as duas versões ficam fixadas em `pyproject.toml` e
+    `InstrumentedDatabase.check_prepared` confere tudo no startup.
+    """
+
+    def __init__(self, statement: ClauseElement, dialect: str | None = None):
+        self.statement = statement
+        # Construções específicas de um dialeto (ex.: ON CONFLICT) só compilam nele
+        self.dialect = dialect
+        self.shape = query_shape(statement)
+        self._compiled: dict[str, _CompiledQuery] = {}
+
+    def compile(self, dialect: Dialect) -> _CompiledQuery:
+        compiled = self._compiled.get(dialect.name)
+        if compiled is None:
+            compiled = self._compiled[dialect.name] = _CompiledQuery(self.statement, dialect)
+        return compiled
+
+    def bind(self, values: dict) -> ClauseElement:
+        """O statement com os valores nos bindparams, para a API pública do `databases`"""
+
+        def replace(element: typing.Any) -> BindParameter | None:
+            if isinstance(element, BindParameter) and element.key in values:
+                return sa.bindparam(element.key, values[element.key], type_=element.type)
+            return None
+
+        return visitors.replacement_traverse(self.statement, {}, replace)
+
+    async def run(self, operation: str, connection: databases.core.Connection, values: typing.Any) -> typing.Any:
+        compiled = self.compile(connection._connection._dialect)
+        raw = connection.raw_connection
+        if operation == "execute_many":
+            # Um único executemany do driver em vez de um execute por linha
+            await raw.executemany(compiled.sql, [compiled.args(row) for row in values])
+            return None
+
+        args = compiled.args(values)
+        if compiled.context is not None:
+            if operation == "execute":
+                async with raw.cursor() as cursor:
+                    await cursor.execute(compiled.sql, args)
+                    return cursor.rowcount if cursor.lastrowid == 0 else cursor.lastrowid
+            async with raw.execute(compiled.sql, args) as cursor:
+                if operation == "fetch_all":
+                    return [compiled.record(row, cursor.description) for row in await cursor.fetchall()]
+                row = await cursor.fetchone()
+                return None if row is None else compiled.record(row, cursor.description)
+
+        if operation == "execute":
+            return await raw.fetchval(compiled.sql, *args)
+        if operation == "fetch_all":
+            return [compiled.record(row) for row in await raw.fetch(compiled.sql, *args)]
+        row = await raw.fetchrow(compiled.sql, *args)
+        return None if row is None else compiled.record(row)
+
+
+Query = typing.Union[ClauseElement, str, PreparedQuery]
+
+
+class InstrumentedTransaction(databases.core.Transaction):
+    """Transação que contabiliza commits e rollbacks"""
+
+    async def commit(self) -> None:
+        await super().commit()
+        db_transactions_total.inc("commit")
+
+    async def rollback(self) -> None:
+        await super().rollback()
+        db_transactions_total.inc("rollback")
+
+
+class InstrumentedDatabase(databases.Database):
+    """`databases.Database` que mede a duração de cada chamada por formato de query.
+
+    Também executa `PreparedQuery` (fetch_all, fetch_one, fetch_val,
+    execute e execute_many) direto na conexão do driver, na mesma conexão e transação da
+    tarefa corrente. Com `PREPARED_QUERIES=false` (ou se `check_prepared`
+    falhar no startup) elas passam pela API pública do `databases` e são
+    compiladas de novo a cada chamada, como as demais.
+    """
+
+    prepared = settings.prepared_queries
 
-database = databases.Database(settings.database_url)
+    async def _timed(self, operation: str, query: Query, call: typing.Awaitable) -> typing.Any:
+        shape = query.shape if isinstance(query, PreparedQuery) else query_shape(query)
+        start = time.perf_counter()
+        error = False
+        try:
+            return await call
+        except Exception:
+            error = True
+            db_query_errors_total.inc(operation, shape)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            db_query_duration_seconds.observe(elapsed, operation, shape)
+            self._trace(operation, shape, query, elapsed, error)
+
+    def _trace(
+        self, operation: str, shape: str, query: Query, elapsed: float, error: bool, slow_log: bool = True
+    ) -> None:
+        """Registra a chamada no perfil da requisição e/ou no log de consultas lentas.
+
+        A SQL só é gerada nesses casos: para as consultas não pré-compiladas
+        isso é uma nova compilação.
+        """
+        profile = current_profile.get()
+        slow = slow_log and elapsed >= slow_queries.threshold
+        if profile is None and not slow:
+            return
+        dialect = getattr(self._backend, "_dialect", None)
+        if isinstance(query, PreparedQuery) and self.prepared:
+            sql = query.compile(dialect).sql
+        elif isinstance(query, PreparedQuery):
+            sql = str(query.statement.compile(dialect=dialect))
+        elif isinstance(query, str):
+            sql = query
+        else:
+            sql = str(query.compile(dialect=dialect))
+        if profile is not None:
+            profile.add_query(operation, shape, sql, elapsed, error)
+        if slow:
+            slow_queries.record(operation, shape, sql, elapsed, error)
+
+    async def _run(self, operation: str, query: PreparedQuery, values: typing.Any) -> typing.Any:
+        if not self.prepared:
+            # API pública: os valores entram nos bindparams e o statement é compilado na hora
+            if operation == "execute_many":
+                for row in values:
+                    await super().execute(query.bind(row))
+                return None
+            return await getattr(super(), operation)(query.bind(values or {}))
+        async with self.connection() as connection:
+            # Mesmo lock que o `databases` usa entre as queries de uma conexão
+            async with connection._query_lock:
+                return await query.run(operation, connection, values or {})
+
+    async def check_prepared(self) -> bool:
+        """Confere se a execução direta de `PreparedQuery` funciona com as bibliotecas instaladas.
+
+        Chamado no startup: executa uma consulta de teste pelo caminho direto.
+        Se faltar algum dos internos usados (outra versão do `databases` ou do
+        SQLAlchemy), desliga a execução direta em todas as instâncias, como
+        `PREPARED_QUERIES=false`, e retorna False.
+        """
+        probe = PreparedQuery(sa.select(sa.bindparam("probe", type_=sa.Integer).label("probe")))
+        try:
+            self._backend._dialect
+            async with self.connection() as connection:
+                async with connection._query_lock:
+                    row = await probe.run("fetch_one", connection, {"probe": 1})
+            if row is None or row["probe"] != 1:
+                raise ValueError(f"resultado inesperado: {row!r}")
+        except (AttributeError, ImportError, KeyError, TypeError, ValueError) as exc:
+            logger.warning("Consultas pré-compiladas desligadas, internos do databases/SQLAlchemy ausentes: %r", exc)
+            InstrumentedDatabase.prepared = False
+            return False
+        return True
+
+    async def fetch_all(self, query: Query, values: dict | None = None) -> list[databases.interfaces.Record]:
+        if isinstance(query, PreparedQuery):
+            return await self._timed("fetch_all", query, self._run("fetch_all", query, values))
+        return await self._timed("fetch_all", query, super().fetch_all(query, values))
+
+    async def fetch_one(self, query: Query, values: dict | None = None) -> databases.interfaces.Record | None:
+        if isinstance(query, PreparedQuery):
+            return await self._timed("fetch_one", query, self._run("fetch_one", query, values))
+        return await self._timed("fetch_one", query, super().fetch_one(query, values))
+
+    async def fetch_val(self, query: Query, values: dict | None = None, column: typing.Any = 0) -> typing.Any:
+        if isinstance(query, PreparedQuery):
+            row = await self._timed("fetch_val", query, self._run("fetch_one", query, values))
+            return None if row is None else row[column]
+        return await self._timed("fetch_val", query, super().fetch_val(query, values, column=column))
+
+    async def execute(self, query: Query, values: dict | None = None) -> typing.Any:
+        if isinstance(query, PreparedQuery):
+            return await self._timed("execute", query, self._run("execute", query, values))
+        return await self._timed("execute", query, super().execute(query, values))
+
+    def prepare(self, queries: typing.Iterable[PreparedQuery]) -> int:
+        """Compila as consultas para o dialeto deste banco (chamado no startup)"""
+        dialect = self._backend._dialect
+        count = 0
+        for query in queries:
+            if query.dialect in (None, dialect.name):
+                query.compile(dialect)
+                count += 1
+        return count
+
+    async def execute_many(self, query: Query, values: list) -> None:
+        if isinstance(query, PreparedQuery):
+            return await self._timed("execute_many", query, self._run("execute_many", query, values))
+        return await self._timed("execute_many", query, super().execute_many(query, values))
+
+    async def iterate(self, query: Query, values: dict | None = None) -> typing.AsyncGenerator[typing.Mapping, None]:
+        # Mede o tempo total da iteração, incluindo o consumo pelo chamador
+        start = time.perf_counter()
+        error = False
+        try:
+            async for record in super().iterate(query, values):
+                yield record
+        except Exception:
+            error = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            shape = query_shape(query)
+            db_query_duration_seconds.observe(elapsed, "iterate", shape)
+            # A duração inclui o consumo pelo chamador (ex.: um export lento): fora do log de lentas
+            self._trace("iterate", shape, query, elapsed, error, slow_log=False)
+
+    def transaction(self, *, force_rollback: bool = False, **kwargs: typing.Any) -> InstrumentedTransaction:
+        return InstrumentedTransaction(self.connection, force_rollback=force_rollback, **kwargs)
+
+
+class ReplicaSet:
+    """Leituras distribuídas entre réplicas, com fallback para o primário.
+
+    Cada chamada vai para a próxima réplica disponível (round-robin). Uma
+    réplica que falha fica fora do rodízio por `retry_after` segundos e a
+    leitura é repetida na seguinte, ou no primário. Sem réplicas configuradas,
+    tudo vai direto ao primário.
+
+    Só para consultas que toleram o atraso de replicação: escritas, leituras
+    dentro de transações e validações que precisam ler o que acabou de ser
+    gravado continuam usando `database`.
+    """
+
+    def __init__(self, primary: InstrumentedDatabase, replicas: list[InstrumentedDatabase], retry_after: float):
+        self.primary = primary
+        self.replicas = replicas
+        self.retry_after = retry_after
+        self._next = 0
+        self._down_until = [0.0] * len(replicas)
+
+    def _available(self) -> typing.Iterator[int]:
+        count = len(self.replicas)
+        if not count:
+            return
+        start, self._next = self._next, (self._next + 1) % count
+        now = time.monotonic()
+        for offset in range(count):
+            index = (start + offset) % count
+            if self._down_until[index] <= now:
+                yield index
+
+    def _mark_down(self, index: int, exc: Exception) -> None:
+        logger.warning("Réplica %s indisponível, usando a próxima ou o primário: %s", index, exc)
+        db_replica_fallbacks_total.inc(str(index))
+        self._down_until[index] = time.monotonic() + self.retry_after
+
+    async def connect(self) -> None:
+        await self.primary.connect()
+        for index, replica in enumerate(self.replicas):
+            try:
+                await replica.connect()
+            except Exception as exc:
+                self._mark_down(index, exc)
+
+    async def disconnect(self) -> None:
+        for replica in self.replicas:
+            if replica.is_connected:
+                await replica.disconnect()
+        await self.primary.disconnect()
+
+    async def _read(self, operation: str, *args: typing.Any) -> typing.Any:
+        for index in self._available():
+            replica = self.replicas[index]
+            try:
+                if not replica.is_connected:
+                    await replica.connect()
+                return await getattr(replica, operation)(*args)
+            except Exception as exc:
+                self._mark_down(index, exc)
+        return await getattr(self.primary, operation)(*args)
+
+    async def fetch_all(self, query: Query, values: dict | None = None) -> list[databases.interfaces.Record]:
+        return await self._read("fetch_all", query, values)
+
+    async def fetch_one(self, query: Query, values: dict | None = None) -> databases.interfaces.Record | None:
+        return await self._read("fetch_one", query, values)
+
+    async def fetch_val(self, query: Query, values: dict | None = None, column: typing.Any = 0) -> typing.Any:
+        return await self._read("fetch_val", query, values, column)
+
+    async def iterate(self, query: Query, values: dict | None = None) -> typing.AsyncGenerator[typing.Mapping, None]:
+        # O fallback só é possível antes da primeira linha entregue ao chamador
+        for index in self._available():
+            replica = self.replicas[index]
+            yielded = False
+            try:
+                if not replica.is_connected:
+                    await replica.connect()
+                async for record in replica.iterate(query, values):
+                    yielded = True
+                    yield record
+                return
+            except Exception as exc:
+                if yielded:
+                    raise
+                self._mark_down(index, exc)
+        async for record in self.primary.iterate(query, values):
+            yield record
+
+
+def pool_options(url: str) -> dict[str, int]:
+    """Tamanho do pool; o backend SQLite abre uma conexão por uso e não aceita essas opções"""
+    if databases.DatabaseURL(url).dialect == "sqlite":
+        return {}
+    return {"min_size": settings.database_pool_min_size, "max_size": settings.database_pool_max_size}
+
+
+database = InstrumentedDatabase(settings.database_url, **pool_options(settings.database_url))
+read_database = ReplicaSet(
+    database,
+    [InstrumentedDatabase(url, **pool_options(url)) for url in settings.database_replica_urls],
+    retry_after=settings.database_replica_retry_seconds,
+)
 metadata = sa.MetaData()
 
 if settings.environment == "production":
     engine = sa.create_engine(settings.database_url)
 else:
     engine = sa.create_engine(settings.database_url, connect_args={"check_same_thread": False})
-
@@ -0,0 +1,35 @@
+"""ETags fracos e GET condicional (`If-None-Match` -> 304) para as listagens.
+
+Os ETags são fracos (`W/"..."`) porque a versão de onde saem pode estar até
+`ETAG_VERSION_TTL` segundos atrasada em relação às escritas de outros workers
+(ver `AccountVersions`): a mesma tag pode acompanhar duas respostas que
+diferem só nessa janela.
+"""
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response, status
+
+from src.metrics import http_conditional_requests_total
+
+ETAG_HEADER = "ETag"
+
+
+def make_etag(*parts: Any) -> str:
+    """ETag fraco a partir da versão dos dados e dos parâmetros da página"""
+    return 'W/"' + hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest() + '"'
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+    """Resposta 304 se o cliente já tem esta versão, senão None"""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return None
+    route = request.scope["route"].path
+    # If-None-Match usa comparação fraca: W/"x" casa com "x"
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    if etag.removeprefix("W/") in tags or "*" in tags:
+        http_conditional_requests_total.inc(route, "not_modified")
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={ETAG_HEADER: etag})
+    http_conditional_requests_total.inc(route, "modified")
+    return None
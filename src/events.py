@@ -0,0 +1,101 @@
+"""Pub/sub em processo das transações criadas, para `GET /accounts/{id}/stream`.
+
+O `TransactionService` publica as transações depois do commit e cada
+conexão aberta recebe as da sua conta em uma fila própria e limitada.
+Publicar nunca bloqueia: se a fila de um assinante lento enche, ela é
+descartada e o assinante fica marcado como atrasado (`lagged`); a conexão
+então relê do banco tudo depois do último id enviado e segue na fila.
+
+O broker só vê as escritas do próprio processo. Com vários workers,
+`STREAM_RESYNC_SECONDS` faz cada conexão ociosa reler o banco nesse
+intervalo para receber as transações criadas pelos outros.
+"""
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Iterable
+
+from databases.interfaces import Record
+
+from src.config import settings
+from src.exceptions import StreamUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Fila limitada das transações de uma conta para uma conexão"""
+
+    def __init__(self, account_id: int, maxsize: int):
+        self.account_id = account_id
+        self.maxsize = maxsize
+        self.pending: deque[Record] = deque()
+        self.lagged = False
+        self._ready = asyncio.Event()
+
+    def push(self, row: Record) -> bool:
+        """Enfileira sem bloquear; retorna False se a fila transbordou"""
+        self._ready.set()
+        if self.lagged:
+            # Será relida do banco junto com as que foram descartadas
+            return True
+        if len(self.pending) >= self.maxsize:
+            # O que estava na fila será relido do banco
+            self.pending.clear()
+            self.lagged = True
+            return False
+        self.pending.append(row)
+        return True
+
+    async def wait(self, timeout: float) -> bool:
+        """Aguarda novas transações; False se o tempo acabou sem nenhuma"""
+        if not self._ready.is_set():
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except TimeoutError:
+                return False
+        self._ready.clear()
+        return True
+
+
+class TransactionBroker:
+    def __init__(self, queue_size: int, max_subscribers: int):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.subscribers = 0
+        self.published = 0
+        self.overflows = 0
+        self._by_account: dict[int, set[Subscription]] = {}
+
+    def check_capacity(self) -> None:
+        """Recusa novas conexões acima de STREAM_MAX_SUBSCRIBERS, antes de abrir a resposta"""
+        if self.subscribers >= self.max_subscribers:
+            logger.warning("Limite de conexões de stream atingido: %s", self.max_subscribers)
+            raise StreamUnavailableError(retry_after=5)
+
+    def subscribe(self, account_id: int) -> Subscription:
+        subscription = Subscription(account_id, self.queue_size)
+        self._by_account.setdefault(account_id, set()).add(subscription)
+        self.subscribers += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._by_account.get(subscription.account_id)
+        if subscriptions is None or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._by_account[subscription.account_id]
+        self.subscribers -= 1
+
+    def publish(self, rows: Iterable[Record]) -> None:
+        """Entrega as transações aos assinantes das contas; chamar só depois do commit"""
+        for row in rows:
+            for subscription in self._by_account.get(row.account_id, ()):
+                self.published += 1
+                if not subscription.push(row):
+                    self.overflows += 1
+                    logger.warning("Fila de stream cheia, assinante será ressincronizado: account_id=%s", row.account_id)
+
+
+transaction_events = TransactionBroker(settings.stream_queue_size, settings.stream_max_subscribers)
@@ -8,6 +8,16 @@ class TransactionNotFoundError(Exception):
     pass
 
 
+class TicketNotFoundError(Exception):
+    """Levantada quando um ticket da fila de escrita não é encontrado"""
+    pass
+
+
+class ProfileNotFoundError(Exception):
+    """Levantada quando um perfil de requisição não está mais no buffer"""
+    pass
+
+
 class BusinessError(Exception):
     """Levantada para erros de negócio"""
     pass
@@ -20,4 +30,42 @@ class UnauthorizedError(Exception):
 
 class DuplicateAccountError(Exception):
     """Levantada quando tenta criar conta duplicada"""
-    pass
\ No newline at end of file
+    pass
+
+class InvalidCursorError(Exception):
+    """Levantada quando o cursor de paginação é inválido"""
+    pass
+
+
+class InvalidImportError(Exception):
+    """Levantada quando o corpo de uma importação em massa não pode ser lido"""
+    pass
+
+
+class IdempotencyConflictError(Exception):
+    """Levantada quando uma Idempotency-Key é reutilizada com outro payload"""
+    pass
+
+
+class RateLimitExceededError(Exception):
+    """Levantada quando o cliente excede o limite de requisições"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Muitas requisições. Tente novamente mais tarde.")
+        self.retry_after = retry_after
+
+
+class StreamUnavailableError(Exception):
+    """Levantada quando o worker já atingiu o limite de conexões de stream"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Limite de conexões de stream atingido. Tente novamente mais tarde.")
+        self.retry_after = retry_after
+
+
+class WriteQueueClosedError(Exception):
+    """Levantada quando a fila de escrita é encerrada enquanto um pedido entrava nela"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Fila de escrita encerrada. Tente novamente mais tarde.")
+        self.retry_after = retry_after
@@ -0,0 +1,207 @@
+"""Pipeline de logs fora do event loop, em JSON, com id de requisição.
+
+Os handlers da aplicação só enfileiram o `LogRecord`: formatação da mensagem
+(`%`-style, adiada até aqui), serialização em JSON e escrita no stream
+acontecem na thread do `QueueListener`. Antes de enfileirar, no próprio
+event loop, cada registro recebe o id da requisição corrente e passa pela
+amostragem.
+
+Mensagens de caminho quente são marcadas com `extra=SAMPLED` e, em nível
+INFO ou abaixo, só uma a cada `1 / taxa` é mantida. A taxa vem de
+`LOG_SAMPLE_RATES` (pelo nome do logger ou do ancestral mais próximo) ou de
+`LOG_SAMPLE_RATE`. Avisos e erros nunca são descartados.
+"""
+import atexit
+import json
+import logging
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from uuid import uuid4
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Marca mensagens de caminho quente sujeitas à amostragem
+SAMPLED = {"sampled": True}
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+_listener: QueueListener | None = None
+
+# Nenhum dos formatos usa arquivo/linha, thread ou processo de origem:
+# desligá-los evita a busca do chamador na pilha a cada log. São globais do
+# módulo `logging` (ver "Optimization" na documentação): os valores
+# anteriores voltam em `stop_logging`
+_LOGGING_FLAGS = {"_srcfile": None, "logThreads": False, "logProcesses": False, "logMultiprocessing": False}
+_saved_flags: dict[str, object] | None = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Copia o id da requisição corrente para o registro"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Mantém uma a cada `1 / taxa` mensagens marcadas com `SAMPLED`, por logger"""
+
+    def __init__(self, default_rate: float, rates: dict[str, float] | None = None):
+        super().__init__()
+        self.default_rate = default_rate
+        self.rates = rates or {}
+        # Por logger: intervalo entre mensagens mantidas e contador
+        self._intervals: dict[str, int] = {}
+        self._counters: dict[str, int] = {}
+
+    def _interval(self, name: str) -> int:
+        interval = self._intervals.get(name)
+        if interval is None:
+            rate, prefix = self.default_rate, name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            interval = self._intervals[name] = 0 if rate <= 0 else max(1, round(1 / rate))
+        return interval
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not getattr(record, "sampled", False):
+            return True
+        interval = self._interval(record.name)
+        if interval == 0:
+            return False
+        count = self._counters.get(record.name, 0)
+        self._counters[record.name] = count + 1
+        return count % interval == 0
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Enfileira o registro sem formatá-lo.
+
+    O `prepare` padrão formata a mensagem na thread de quem chamou o log;
+    aqui isso fica para o listener. Os argumentos da mensagem não devem ser
+    alterados depois do log (o código da aplicação só passa valores imutáveis).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+
+
+def configure_logging(
+    level: str = "INFO",
+    log_format: str = "json",
+    sample_rate: float = 1.0,
+    sample_rates: dict[str, float] | None = None,
+    stream=None,
+) -> None:
+    """Substitui os handlers do logger raiz pelo pipeline em fila.
+
+    Pode ser chamada de novo (ex.: benchmarks); o listener anterior é parado
+    depois de esvaziar a fila.
+    """
+    global _listener, _saved_flags
+    stop_logging()
+
+    _saved_flags = {name: getattr(logging, name) for name in _LOGGING_FLAGS}
+    for name, value in _LOGGING_FLAGS.items():
+        setattr(logging, name, value)
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rate, sample_rates))
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    # O uvicorn instala handlers síncronos próprios antes de importar o app;
+    # o access log, um por requisição, também passa a ir pela fila
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Esvazia a fila, para a thread de escrita e restaura as globais do `logging`"""
+    global _listener, _saved_flags
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _saved_flags is not None:
+        for name, value in _saved_flags.items():
+            setattr(logging, name, value)
+        _saved_flags = None
+
+
+atexit.register(stop_logging)
+
+
+class RequestIdMiddleware:
+    """Middleware ASGI que define o id da requisição para os logs.
+
+    Usa o header `X-Request-ID` recebido (até 128 caracteres) ou gera um novo,
+    e o devolve no mesmo header da resposta.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid4().hex
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
@@ -1,41 +1,63 @@
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request, status
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+from fastapi.responses import JSONResponse, Response
 
-from src.controllers import account, auth, transaction
-from src.database import database
+from src.controllers import account, admin, auth, transaction, transfer
+from src import metrics, queries
+from src.database import database, read_database
+from src.etag import ETAG_HEADER
+from src.pagination import NEXT_CURSOR_HEADER
+from src.profiling import PROFILE_ID_HEADER, ProfilingMiddleware, profiler
+from src.config import settings
+from src.log import SAMPLED, REQUEST_ID_HEADER, RequestIdMiddleware, configure_logging
+from src.rate_limit import RateLimit, limiter
 from src.exceptions import (
     AccountNotFoundError, 
     BusinessError, 
     TransactionNotFoundError,
+    TicketNotFoundError,
+    ProfileNotFoundError,
     UnauthorizedError,
-    DuplicateAccountError
+    DuplicateAccountError,
+    InvalidCursorError,
+    InvalidImportError,
+    IdempotencyConflictError,
+    RateLimitExceededError,
+    StreamUnavailableError,
+    WriteQueueClosedError
 )
+from src.events import transaction_events
+from src.security import token_cache
+from src.services.account_cache import account_cache
+from src.services.account_versions import account_versions
+from src.services.write_queue import write_queue
 
 logger = logging.getLogger(__name__)
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# Configurar logging: JSON, fora do event loop, com amostragem do caminho quente
+configure_logging(
+    level=settings.log_level,
+    log_format=settings.log_format,
+    sample_rate=settings.log_sample_rate,
+    sample_rates=settings.log_sample_rates,
 )
 
-limiter = Limiter(key_func=get_remote_address)
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Iniciando aplicação...")
-    await database.connect()
-    logger.info("Conectado ao banco de dados")
+    await read_database.connect()
+    logger.info("Conectado ao banco de dados (%s réplicas de leitura)", len(read_database.replicas))
+    if settings.prepared_queries and await database.check_prepared():
+        logger.info("%s consultas pré-compiladas", queries.registry.prepare(read_database))
+    write_queue.start()
     yield
+    await write_queue.close(settings.write_queue_drain_seconds)
     logger.info("Fechando conexão com banco de dados...")
-    await database.disconnect()
+    await read_database.disconnect()
+    await limiter.close()
     logger.info("Aplicação finalizada")
 
 tags_metadata = [
@@ -51,6 +73,14 @@ tags_metadata = [
         "name": "transactions",
         "description": "Operations to maintain transactions."
     },
+    {
+        "name": "transfers",
+        "description": "Atomic transfers between accounts."
+    },
+    {
+        "name": "admin",
+        "description": "Request profiles and slow-query log (admin users only)."
+    },
 ]
 
 app = FastAPI(
@@ -65,6 +95,7 @@ Transactions API is the microservice for recording current account transactions.
 * **Create accounts**.
 * **List accounts**.
 * **List account transactions by ID**.
+* **Stream new account transactions (SSE)**.
 
 ## Transaction
 
@@ -72,6 +103,11 @@ Transactions API is the microservice for recording current account transactions.
 * **List all transactions**.
 * **Get transaction by ID**.
 
+## Admin
+
+* **Profile single requests (signed X-Profile header) or sampled traffic**.
+* **Read captured profiles and the slow-query log**.
+
 ## Health
 
 * **Check API health**.
@@ -82,10 +118,6 @@ Transactions API is the microservice for recording current account transactions.
 )
 
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, lambda request, exc: JSONResponse(
-    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-    content={"detail": "Muitas requisições. Tente novamente mais tarde."}
-))
 
 app.add_middleware(
     CORSMiddleware,
@@ -93,56 +125,166 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REQUEST_ID_HEADER, ETAG_HEADER, PROFILE_ID_HEADER],
 )
 
+# Mais interno que as métricas e o id da requisição: o perfil cobre só a aplicação
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
+
+metrics.registry.register(metrics.CallbackMetric(
+    "jwt_cache_hits_total", "Tokens validados pelo cache.", lambda: token_cache.hits, type_="counter"
+))
+metrics.registry.register(metrics.CallbackMetric(
+    "jwt_cache_misses_total", "Tokens que precisaram de jwt.decode.", lambda: token_cache.misses, type_="counter"
+))
+metrics.registry.register(metrics.CallbackMetric(
+    "account_cache_hits_total", "Consultas de conta respondidas pelo cache.", lambda: account_cache.hits, type_="counter"
+))
+metrics.registry.register(metrics.CallbackMetric(
+    "account_cache_misses_total", "Consultas de conta que foram ao banco.", lambda: account_cache.misses, type_="counter"
+))
+metrics.registry.register(metrics.CallbackMetric(
+    "account_version_hits_total", "Versões de conta (ETag) respondidas pelo mapa em memória.", lambda: account_versions.hits, type_="counter"
+))
+metrics.registry.register(metrics.CallbackMetric(
+    "account_version_misses_total", "Versões de conta (ETag) relidas do banco.", lambda: account_versions.misses, type_="counter"
+))
+metrics.registry.register(metrics.CallbackMetric(
+    "write_queue_depth", "Transações aguardando na fila de escrita.", write_queue.depth
+))
+metrics.registry.register(metrics.CallbackMetric(
+    "write_queue_batches_total", "Lotes gravados pela fila de escrita (um commit cada).", lambda: write_queue.batches, type_="counter"
+))
+metrics.registry.register(metrics.CallbackMetric(
+    "write_queue_committed_total", "Transações da fila de escrita gravadas.", lambda: write_queue.committed, type_="counter"
+))
+metrics.registry.register(metrics.CallbackMetric(
+    "write_queue_rejected_total", "Transações da fila de escrita rejeitadas.", lambda: write_queue.rejected, type_="counter"
+))
+metrics.registry.register(metrics.CallbackMetric(
+    "request_profiles_total", "Requisições perfiladas (header X-Profile ou amostragem).", lambda: profiler.captured, type_="counter"
+))
+metrics.registry.register(metrics.CallbackMetric(
+    "transaction_stream_subscribers", "Conexões abertas em /accounts/{id}/stream.", lambda: transaction_events.subscribers
+))
+metrics.registry.register(metrics.CallbackMetric(
+    "transaction_stream_events_total", "Transações entregues às filas dos streams.", lambda: transaction_events.published, type_="counter"
+))
+metrics.registry.register(metrics.CallbackMetric(
+    "transaction_stream_overflows_total", "Filas de stream que transbordaram e foram relidas do banco.", lambda: transaction_events.overflows, type_="counter"
+))
+
 app.include_router(auth.router, tags=["auth"])
 app.include_router(account.router, tags=["account"])
 app.include_router(transaction.router, tags=["transactions"])
+app.include_router(transfer.router, tags=["transfers"])
+app.include_router(admin.router, tags=["admin"])
 
 # --- EXCEPTION HANDLERS ---
 
 @app.exception_handler(AccountNotFoundError)
 async def account_not_found_error_handler(request: Request, exc: AccountNotFoundError):
-    logger.warning(f"Conta não encontrada - Path: {request.url.path}")
+    logger.warning("Conta não encontrada - Path: %s", request.url.path)
     return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Account not found."})
 
 @app.exception_handler(TransactionNotFoundError)
 async def transaction_not_found_error_handler(request: Request, exc: TransactionNotFoundError):
-    logger.warning(f"Transação não encontrada - Path: {request.url.path}")
+    logger.warning("Transação não encontrada - Path: %s", request.url.path)
     return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Transaction not found."})
 
+@app.exception_handler(TicketNotFoundError)
+async def ticket_not_found_error_handler(request: Request, exc: TicketNotFoundError):
+    logger.warning("Ticket não encontrado - Path: %s", request.url.path)
+    return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Ticket not found."})
+
+@app.exception_handler(ProfileNotFoundError)
+async def profile_not_found_error_handler(request: Request, exc: ProfileNotFoundError):
+    logger.warning("Perfil não encontrado - Path: %s", request.url.path)
+    return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Profile not found."})
+
 @app.exception_handler(BusinessError)
 async def business_error_handler(request: Request, exc: BusinessError):
-    logger.warning(f"Erro de negócio - {str(exc)}")
+    logger.warning("Erro de negócio - %s", exc)
     return JSONResponse(status_code=status.HTTP_409_CONFLICT, content={"detail": str(exc)})
 
 @app.exception_handler(UnauthorizedError)
 async def unauthorized_error_handler(request: Request, exc: UnauthorizedError):
-    logger.warning(f"Acesso não autorizado - User: {request.headers.get('Authorization', 'Unknown')}")
+    logger.warning("Acesso não autorizado - User: %s", request.headers.get('Authorization', 'Unknown'))
     return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "Access denied."})
 
 @app.exception_handler(DuplicateAccountError)
 async def duplicate_account_error_handler(request: Request, exc: DuplicateAccountError):
-    logger.warning(f"Tentativa de criar conta duplicada")
+    logger.warning("Tentativa de criar conta duplicada")
     return JSONResponse(status_code=status.HTTP_409_CONFLICT, content={"detail": str(exc)})
 
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_error_handler(request: Request, exc: InvalidCursorError):
+    logger.warning("Cursor de paginação inválido - Path: %s", request.url.path)
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
+
+@app.exception_handler(InvalidImportError)
+async def invalid_import_error_handler(request: Request, exc: InvalidImportError):
+    logger.warning("Importação em massa inválida - %s", exc)
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
+
+@app.exception_handler(IdempotencyConflictError)
+async def idempotency_conflict_error_handler(request: Request, exc: IdempotencyConflictError):
+    logger.warning("Idempotency-Key reutilizada - Path: %s", request.url.path)
+    return JSONResponse(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, content={"detail": str(exc)})
+
+@app.exception_handler(RateLimitExceededError)
+async def rate_limit_exceeded_error_handler(request: Request, exc: RateLimitExceededError):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(StreamUnavailableError)
+async def stream_unavailable_error_handler(request: Request, exc: StreamUnavailableError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(WriteQueueClosedError)
+async def write_queue_closed_error_handler(request: Request, exc: WriteQueueClosedError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 # --- HEALTH CHECK ---
 
-@app.get("/health", tags=["health"])
-@limiter.limit("100/minute")
-async def health_check(request: Request):
+@app.get(
+    "/health",
+    tags=["health"],
+    dependencies=[Depends(RateLimit("health", settings.rate_limit_requests, settings.rate_limit_period))],
+)
+async def health_check():
     """Verificar saúde da API"""
     try:
         await database.fetch_one("SELECT 1")
-        logger.info("Health check: OK")
+        logger.info("Health check: OK", extra=SAMPLED)
         return {
             "status": "healthy",
             "database": "connected",
             "version": "2.0.0"
         }
     except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
+        logger.error("Health check failed: %s", e)
         return JSONResponse(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             content={"status": "unhealthy", "detail": str(e)}
-        )
\ No newline at end of file
+        )
+
+# --- METRICS ---
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Métricas no formato de texto do Prometheus"""
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
@@ -7,6 +7,10 @@ accounts = sa.Table(
     metadata,
     sa.Column("id", sa.Integer, primary_key=True),
     sa.Column("user_id", sa.Integer, nullable=False, index=True),
-    sa.Column("balance", sa.Numeric(10, 2), nullable=False, default=0),
+    # Valores monetários em centavos (src/money.py)
+    sa.Column("balance", sa.BigInteger, nullable=False, default=0),
+    # Saldo na criação da conta, que não gera transação: o saldo deve ser
+    # sempre `opening_balance` + depósitos - saques (ver src/services/reconciliation.py)
+    sa.Column("opening_balance", sa.BigInteger, nullable=False, default=0),
     sa.Column("created_at", sa.TIMESTAMP(timezone=True), default=sa.func.now()),
 )
\ No newline at end of file
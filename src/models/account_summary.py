@@ -0,0 +1,16 @@
+import sqlalchemy as sa
+
+from src.database import metadata
+
+account_daily_summary = sa.Table(
+    "account_daily_summary",
+    metadata,
+    sa.Column("account_id", sa.Integer, sa.ForeignKey("accounts.id"), primary_key=True),
+    sa.Column("day", sa.Date, primary_key=True),
+    # Totais e saldo em centavos
+    sa.Column("deposit_count", sa.Integer, nullable=False, default=0),
+    sa.Column("deposit_total", sa.BigInteger, nullable=False, default=0),
+    sa.Column("withdrawal_count", sa.Integer, nullable=False, default=0),
+    sa.Column("withdrawal_total", sa.BigInteger, nullable=False, default=0),
+    sa.Column("closing_balance", sa.BigInteger, nullable=False),
+)
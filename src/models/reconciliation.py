@@ -0,0 +1,20 @@
+import sqlalchemy as sa
+
+from src.database import metadata
+
+# Uma linha por execução concluída de `python -m src.commands.reconcile`; a
+# mais recente é o ponto de partida da próxima execução incremental
+reconciliation_runs = sa.Table(
+    "reconciliation_runs",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("mode", sa.String(16), nullable=False),
+    sa.Column("started_at", sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column("finished_at", sa.TIMESTAMP(timezone=True), nullable=False),
+    # Maiores ids de transação e de conta quando a execução começou
+    sa.Column("transaction_checkpoint", sa.BigInteger, nullable=False),
+    sa.Column("account_checkpoint", sa.BigInteger, nullable=False),
+    sa.Column("accounts_checked", sa.BigInteger, nullable=False),
+    sa.Column("mismatches", sa.Integer, nullable=False),
+    sa.Column("fixed", sa.Integer, nullable=False),
+)
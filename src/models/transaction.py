@@ -15,6 +15,28 @@ transactions = sa.Table(
     sa.Column("id", sa.Integer, primary_key=True),
     sa.Column("account_id", sa.Integer, sa.ForeignKey("accounts.id"), nullable=False),
     sa.Column("type", sa.Enum(TransactionType, name="transaction_types"), nullable=False),
-    sa.Column("amount", sa.Numeric(10, 2), nullable=False),
+    # Centavos (src/money.py)
+    sa.Column("amount", sa.BigInteger, nullable=False),
     sa.Column("timestamp", sa.TIMESTAMP(timezone=True), default=sa.func.now()),
-)
\ No newline at end of file
+    # Par saque/depósito criado por `POST /transfers`; nulo nas demais
+    sa.Column("transfer_id", sa.Uuid, nullable=True),
+    # Paginação por cursor das transações de uma conta
+    sa.Index("ix_transactions_account_id_id", "account_id", "id"),
+    # Exportação por período (`start`/`end`) e corte do arquivamento
+    sa.Index("ix_transactions_timestamp", "timestamp"),
+)
+
+# Transações mais antigas que o horizonte de arquivamento, movidas por
+# `python -m src.commands.archive`. Mesmas colunas, com o id original
+transactions_archive = sa.Table(
+    "transactions_archive",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True, autoincrement=False),
+    sa.Column("account_id", sa.Integer, sa.ForeignKey("accounts.id"), nullable=False),
+    sa.Column("type", sa.Enum(TransactionType, name="transaction_types"), nullable=False),
+    sa.Column("amount", sa.BigInteger, nullable=False),
+    sa.Column("timestamp", sa.TIMESTAMP(timezone=True)),
+    sa.Column("transfer_id", sa.Uuid, nullable=True),
+    sa.Index("ix_transactions_archive_account_id_id", "account_id", "id"),
+    sa.Index("ix_transactions_archive_timestamp", "timestamp"),
+)
@@ -0,0 +1,76 @@
+"""Valores monetários em centavos inteiros.
+
+Saldos e valores são gravados e calculados como `int` de centavos; a API
+continua recebendo e devolvendo reais em JSON (`12.34`). A conversão acontece
+só nas bordas: `Cents` nos schemas de entrada e `Money` nas views.
+"""
+import math
+from decimal import Decimal, DecimalException
+from typing import Annotated, Any
+
+from pydantic import BeforeValidator, Field, PlainSerializer, WithJsonSchema
+
+# Maior valor em centavos representável sem perda em um float (JSON)
+MAX_CENTS = 2**53
+
+
+def to_cents(value: Any) -> Any:
+    """Converte reais (int, float, str ou Decimal) em centavos, sem arredondar.
+
+    Valores com frações de centavo (mais de duas casas decimais) levantam
+    ValueError (422 na API): nunca são arredondados para passar no mínimo.
+    """
+    if isinstance(value, bool):
+        raise ValueError("valor monetário inválido")
+    if isinstance(value, int):
+        return value * 100
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError("valor monetário inválido")
+        cents = value * 100
+        rounded = round(cents)
+        # Caso comum: até duas casas decimais, só o erro de representação do float
+        if abs(cents - rounded) < 1e-6:
+            return rounded
+        value = repr(value)
+    if isinstance(value, (str, Decimal)):
+        try:
+            cents = Decimal(value).scaleb(2)
+        except (DecimalException, ValueError):
+            raise ValueError("valor monetário inválido") from None
+        if not cents.is_finite():
+            raise ValueError("valor monetário inválido")
+        if cents != cents.to_integral_value():
+            raise ValueError("valor monetário com mais de duas casas decimais")
+        return int(cents)
+    return value
+
+
+def limit_to_cents(value: float, rounding: str) -> int:
+    """Limite configurado em reais em centavos inteiros.
+
+    `ROUND_CEILING` para mínimos e `ROUND_FLOOR` para máximos: comparar
+    centavos com o resultado equivale a comparar o valor enviado com o
+    limite configurado, mesmo que ele tenha frações de centavo.
+    """
+    return int(Decimal(repr(value)).scaleb(2).to_integral_value(rounding))
+
+
+def from_cents(cents: int | None) -> float | None:
+    """Centavos em reais; `int / 100` dá o mesmo float que `float("12.34")`"""
+    return None if cents is None else cents / 100
+
+
+# Centavos no modelo, reais no JSON de saída
+Money = Annotated[int, PlainSerializer(from_cents, return_type=float)]
+
+# Valor de transação na saída: sempre positivo, como no schema de entrada
+PositiveMoney = Annotated[Money, Field(gt=0), WithJsonSchema({"type": "number", "exclusiveMinimum": 0})]
+
+# Entrada em reais convertida para centavos positivos
+Cents = Annotated[
+    Money,
+    BeforeValidator(to_cents),
+    Field(gt=0, le=MAX_CENTS),
+    WithJsonSchema({"type": "number", "exclusiveMinimum": 0}),
+]
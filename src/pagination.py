@@ -0,0 +1,36 @@
+"""Paginação por cursor (keyset) para as listagens"""
+import base64
+import json
+from typing import Any
+
+from databases.interfaces import Record
+
+from src.exceptions import InvalidCursorError
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: dict[str, Any]) -> str:
+    """Gera um cursor opaco a partir da chave da última linha retornada"""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, *keys: str) -> dict[str, Any]:
+    """Lê um cursor gerado por encode_cursor, validando as chaves esperadas"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise InvalidCursorError("Cursor inválido")
+
+    if not isinstance(values, dict) or any(not isinstance(values.get(key), int) for key in keys):
+        raise InvalidCursorError("Cursor inválido")
+    return values
+
+
+def next_cursor(rows: list[Record], limit: int) -> str | None:
+    """Cursor da próxima página, ou None quando a página atual é a última"""
+    if len(rows) < limit:
+        return None
+    return encode_cursor({"id": rows[-1].id})
@@ -0,0 +1,122 @@
+"""Leitura dos corpos de importação em massa (array JSON ou CSV).
+
+Os itens saem como dicionários ainda não validados; a validação é feita
+linha a linha pelo serviço, que devolve o erro de cada uma. O CSV é lido
+à medida que chega, sem carregar o upload inteiro em memória.
+"""
+import codecs
+import csv
+import json
+from collections import deque
+from collections.abc import AsyncIterator, Iterable
+from typing import Any
+
+from src.exceptions import InvalidImportError
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+
+class CsvRow(dict[str, str]):
+    """Linha do CSV como dicionário, com o número da linha no arquivo (cabeçalho = 1)"""
+
+    def __init__(self, values: Iterable[tuple[str, str]], line: int):
+        super().__init__(values)
+        self.line = line
+
+
+async def json_items(body: bytes) -> AsyncIterator[Any]:
+    """Itens de um array JSON"""
+    try:
+        items = orjson.loads(body) if orjson is not None else json.loads(body)
+    except ValueError:
+        raise InvalidImportError("JSON inválido") from None
+    if not isinstance(items, list):
+        raise InvalidImportError("O corpo deve ser um array JSON")
+    for item in items:
+        yield item
+
+
+class _Lines:
+    """Iterador de linhas alimentado aos poucos, consumido por um único `csv.reader`
+
+    O leitor só recebe registros completos, então nunca esgota as linhas no
+    meio de um campo entre aspas; esgotado, volta a ler quando houver mais.
+    """
+
+    def __init__(self):
+        self.__lines: deque[str] = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.__lines:
+            raise StopIteration
+        return self.__lines.popleft()
+
+    def extend(self, lines: Iterable[str]):
+        self.__lines.extend(lines)
+
+
+async def csv_items(chunks: AsyncIterator[bytes], columns: Iterable[str]) -> AsyncIterator[CsvRow]:
+    """Linhas de um CSV com cabeçalho, como dicionários, lidas em streaming
+
+    Campos entre aspas podem conter quebras de linha: as linhas físicas só
+    seguem para o leitor quando fecham um registro (aspas em número par).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    lines = _Lines()
+    reader = csv.reader(lines)
+    header: list[str] | None = None
+    pending = ""
+    record: list[str] = []
+    quoted = False
+    start = 1
+
+    def rows(physical: list[str]) -> list[CsvRow]:
+        nonlocal header, quoted, start
+        for line in physical:
+            record.append(line)
+            if line.count('"') % 2:
+                quoted = not quoted
+            if not quoted:
+                lines.extend(record)
+                record.clear()
+        parsed = []
+        try:
+            for values in reader:
+                # Registro com quebras de linha: vale a linha onde começa
+                line, start = start, reader.line_num + 1
+                if not values:
+                    continue
+                if header is None:
+                    header = [name.strip() for name in values]
+                    missing = [name for name in columns if name not in header]
+                    if missing:
+                        raise InvalidImportError(f"Colunas ausentes no cabeçalho do CSV: {', '.join(missing)}")
+                    continue
+                parsed.append(CsvRow(zip(header, values), line=line))
+        except csv.Error as exc:
+            raise InvalidImportError(f"CSV inválido na linha {reader.line_num}: {exc}") from None
+        return parsed
+
+    try:
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            physical = [line + "\n" for line in pending.split("\n")]
+            # A última linha pode estar incompleta: espera o próximo pedaço
+            pending = physical.pop()[:-1]
+            for row in rows(physical):
+                yield row
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise InvalidImportError("O CSV deve estar em UTF-8") from None
+    for row in rows([pending] if pending else []):
+        yield row
+    if quoted:
+        raise InvalidImportError("CSV com aspas não fechadas")
+    if header is None:
+        raise InvalidImportError("CSV vazio")
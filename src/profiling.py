@@ -0,0 +1,344 @@
+"""Perfis de requisições sob demanda e log de consultas lentas.
+
+Um perfil é capturado quando a requisição traz um `X-Profile` assinado
+(`<user_id>.<expira_em>.<hmac>`, emitido por `POST /admin/profiles/token` e
+válido enquanto o `user_id` for admin) ou cai na amostragem de
+`PROFILING_SAMPLE_RATE`. A chave do HMAC é `PROFILING_SECRET` ou, sem ele,
+uma derivada de `JWT_SECRET` (nunca o próprio segredo dos JWTs). Durante a
+requisição:
+
+* uma thread amostra a pilha do event loop a cada
+  `PROFILING_SAMPLE_INTERVAL` segundos; as amostras em que o handler está
+  executando viram pilhas no formato folded (a partir deste middleware) e as
+  demais contam como espera (I/O, locks, outras tarefas na frente);
+* um timer no próprio loop mede o atraso com que ele é atendido (lag do
+  event loop);
+* cada chamada ao banco feita pela requisição é registrada com a SQL
+  compilada e a duração.
+
+O perfil vai para um buffer circular em memória (`PROFILING_BUFFER_SIZE`),
+lido em `/admin/profiles`, e a resposta leva o id em `X-Profile-ID`. Sem
+perfis ativos a thread fica parada e o custo por requisição é a checagem do
+header.
+
+Consultas mais lentas que `SLOW_QUERY_SECONDS` sempre vão para o log de
+consultas lentas (aviso no log e buffer lido em `/admin/slow-queries`),
+com ou sem perfil.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from types import CodeType, FrameType
+from uuid import uuid4
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config import settings
+from src.log import request_id_var
+from src.metrics import db_slow_queries_total
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-ID"
+
+# Chamadas ao banco guardadas por perfil (streams e importações fazem milhares)
+MAX_PROFILE_QUERIES = 1000
+
+current_profile: ContextVar["Profile | None"] = ContextVar("current_profile", default=None)
+
+
+def _secret() -> bytes:
+    if settings.profiling_secret:
+        return settings.profiling_secret.encode()
+    return hmac.new(settings.jwt_secret.encode(), b"profiling", hashlib.sha256).digest()
+
+
+def sign_profile_token(user_id: int, expires_at: int) -> str:
+    """Valor de `X-Profile` emitido pelo admin `user_id`, válido até `expires_at` (epoch em segundos)"""
+    payload = f"{user_id}.{expires_at}"
+    signature = hmac.new(_secret(), payload.encode(), hashlib.sha256).hexdigest()
+    return f"{payload}.{signature}"
+
+
+def verify_profile_token(token: str) -> int | None:
+    """user_id do admin que emitiu o token, ou None se inválido, expirado ou de quem não é mais admin"""
+    user_id, _, rest = token.partition(".")
+    expires_at, _, _ = rest.partition(".")
+    if not user_id.isdigit() or not expires_at.isdigit() or int(expires_at) < time.time():
+        return None
+    if int(user_id) not in settings.admin_user_ids:
+        return None
+    if not hmac.compare_digest(sign_profile_token(int(user_id), int(expires_at)), token):
+        return None
+    return int(user_id)
+
+
+class Profile:
+    """Amostras, lag do event loop e consultas de uma requisição"""
+
+    def __init__(self, method: str, path: str, reason: str, interval: float):
+        self.id = uuid4().hex
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.interval = interval
+        self.route: str | None = None
+        self.status: int | None = None
+        self.request_id = request_id_var.get()
+        self.started_at = datetime.now(timezone.utc)
+        self.duration: float | None = None
+        self.stacks: Counter[str] = Counter()
+        self.running_samples = 0
+        self.waiting_samples = 0
+        self.lag_samples = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.queries: list[dict] = []
+        self.queries_dropped = 0
+        self._start = time.perf_counter()
+
+    def add_query(self, operation: str, shape: str, sql: str, duration: float, error: bool) -> None:
+        if self.duration is not None:
+            # Tarefa criada pela requisição que continuou depois da resposta
+            return
+        if len(self.queries) >= MAX_PROFILE_QUERIES:
+            self.queries_dropped += 1
+            return
+        self.queries.append({
+            "operation": operation,
+            "query": shape,
+            "sql": sql,
+            "started_ms": round((time.perf_counter() - duration - self._start) * 1000, 3),
+            "duration_ms": round(duration * 1000, 3),
+            "error": error,
+        })
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "reason": self.reason,
+            "request_id": self.request_id,
+            "started_at": self.started_at,
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "queries": len(self.queries) + self.queries_dropped,
+            "db_ms": round(sum(query["duration_ms"] for query in self.queries), 3),
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            **self.summary(),
+            "samples": {
+                "interval_ms": self.interval * 1000,
+                "running": self.running_samples,
+                "waiting": self.waiting_samples,
+            },
+            "loop_lag": {
+                "samples": self.lag_samples,
+                "max_ms": round(self.lag_max * 1000, 3),
+                "mean_ms": round(self.lag_total / self.lag_samples * 1000, 3) if self.lag_samples else 0.0,
+            },
+            "stacks": [{"stack": stack, "samples": count} for stack, count in self.stacks.most_common()],
+            "db_queries": self.queries,
+            "db_queries_dropped": self.queries_dropped,
+        }
+
+    def folded(self) -> str:
+        """Pilhas no formato folded (`a;b;c N`), aceito por flamegraph.pl e speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """Amostrador das requisições em perfil e buffer dos perfis concluídos.
+
+    A thread de amostragem lê a pilha da thread do event loop com
+    `sys._current_frames()`; uma amostra pertence a um perfil quando o frame
+    do seu middleware está na pilha, ou seja, quando é o handler daquela
+    requisição que está executando. A thread trabalha sobre uma cópia dos
+    perfis ativos e não divide nenhum lock com o event loop: um lock que ela
+    segurasse enquanto espera o GIL travaria o loop.
+    """
+
+    def __init__(self, buffer_size: int, sample_rate: float, interval: float):
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.captured = 0
+        self._profiles: deque[Profile] = deque(maxlen=buffer_size)
+        self._active: dict[Profile, FrameType] = {}
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._loop_thread_id: int | None = None
+        self._lag_timer: asyncio.TimerHandle | None = None
+        self._labels: dict[CodeType, str] = {}
+
+    def reason(self, headers: list[tuple[bytes, bytes]]) -> str | None:
+        """Por que a requisição deve ser perfilada (ou None)"""
+        for name, value in headers:
+            if name == b"x-profile":
+                user_id = verify_profile_token(value.decode("latin-1"))
+                if user_id is not None:
+                    return f"header:{user_id}"
+                logger.warning("X-Profile inválido ou expirado")
+                break
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def start(self, profile: Profile, frame: FrameType) -> None:
+        """Começa a amostrar a requisição cujo middleware executa em `frame`"""
+        self._active[profile] = frame
+        self._loop_thread_id = threading.get_ident()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.__sample_forever, name="profiler", daemon=True)
+            self._thread.start()
+        self._wake.set()
+        if self._lag_timer is None:
+            loop = asyncio.get_running_loop()
+            self._lag_timer = loop.call_later(self.interval, self.__lag_tick, loop, loop.time() + self.interval)
+
+    def finish(self, profile: Profile) -> None:
+        profile.duration = time.perf_counter() - profile._start
+        del self._active[profile]
+        self._profiles.append(profile)
+        self.captured += 1
+
+    def get(self, profile_id: str) -> Profile | None:
+        return next((profile for profile in self._profiles if profile.id == profile_id), None)
+
+    def recent(self, limit: int) -> list[Profile]:
+        """Perfis concluídos, do mais recente ao mais antigo"""
+        return list(reversed(self._profiles))[:limit]
+
+    def __lag_tick(self, loop: asyncio.AbstractEventLoop, expected: float) -> None:
+        lag = max(0.0, loop.time() - expected)
+        for profile in tuple(self._active):
+            profile.lag_samples += 1
+            profile.lag_total += lag
+            profile.lag_max = max(profile.lag_max, lag)
+        if self._active:
+            self._lag_timer = loop.call_later(self.interval, self.__lag_tick, loop, loop.time() + self.interval)
+        else:
+            self._lag_timer = None
+
+    def __sample_forever(self) -> None:
+        while True:
+            self._wake.wait()
+            if not self._active:
+                self._wake.clear()
+                # `start` registra o perfil antes do set: checar de novo evita perder o aviso
+                if not self._active:
+                    continue
+            self.__sample()
+            time.sleep(self.interval)
+
+    def __sample(self) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        for profile, root in tuple(self._active.items()):
+            stack = []
+            current = frame
+            while current is not None and current is not root:
+                stack.append(self.__label(current.f_code))
+                current = current.f_back
+            if profile.duration is not None:
+                # Terminou durante a amostra; o perfil já pode estar sendo lido
+                continue
+            if current is None:
+                profile.waiting_samples += 1
+            else:
+                profile.running_samples += 1
+                profile.stacks[";".join(reversed(stack))] += 1
+
+    def __label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            _, found, package_path = filename.rpartition("site-packages" + os.sep)
+            if found:
+                filename = package_path
+            elif filename.startswith(os.getcwd() + os.sep):
+                filename = os.path.relpath(filename)
+            label = self._labels[code] = f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+        return label
+
+
+class SlowQueryLog:
+    """Consultas acima do limite: aviso no log e buffer circular em memória"""
+
+    def __init__(self, threshold: float, size: int):
+        self.threshold = threshold
+        self.recorded = 0
+        self._entries: deque[dict] = deque(maxlen=size)
+
+    def record(self, operation: str, shape: str, sql: str, duration: float, error: bool) -> None:
+        self.recorded += 1
+        db_slow_queries_total.inc(operation, shape)
+        self._entries.append({
+            "timestamp": datetime.now(timezone.utc),
+            "request_id": request_id_var.get(),
+            "operation": operation,
+            "query": shape,
+            "sql": sql,
+            "duration_ms": round(duration * 1000, 3),
+            "error": error,
+        })
+        logger.warning("Consulta lenta (%.1f ms) %s %s: %s", duration * 1000, operation, shape, sql)
+
+    def recent(self, limit: int) -> list[dict]:
+        return list(reversed(self._entries))[:limit]
+
+
+class ProfilingMiddleware:
+    """Middleware ASGI que captura o perfil das requisições selecionadas"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        reason = profiler.reason(scope["headers"])
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"], reason, profiler.interval)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                MutableHeaders(scope=message)[PROFILE_ID_HEADER] = profile.id
+            await send(message)
+
+        token = current_profile.set(profile)
+        profiler.start(profile, sys._getframe())
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            profile.route = route.path if route is not None else None
+            profiler.finish(profile)
+            current_profile.reset(token)
+
+
+profiler = Profiler(
+    buffer_size=settings.profiling_buffer_size,
+    sample_rate=settings.profiling_sample_rate,
+    interval=settings.profiling_sample_interval,
+)
+slow_queries = SlowQueryLog(threshold=settings.slow_query_seconds, size=settings.slow_query_log_size)
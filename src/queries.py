@@ -0,0 +1,268 @@
+"""Consultas de formato fixo dos serviços, compiladas no startup.
+
+Cada consulta é uma `PreparedQuery` com os valores variáveis em
+`sa.bindparam` e é executada como uma query textual:
+`await database.fetch_one(queries.transaction_by_id, {"id": 1})`.
+O `lifespan` chama `registry.prepare(read_database)`, que compila todas para
+o primário e as réplicas antes da primeira requisição.
+
+Consultas cujo formato muda com a requisição (filtros opcionais, listas de
+`IN`, inserts de várias linhas) continuam montadas e compiladas na hora.
+"""
+from types import ModuleType
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql import ClauseElement
+
+from src.database import PreparedQuery, ReplicaSet
+from src.models.account import accounts
+from src.models.account_summary import account_daily_summary
+from src.models.idempotency import idempotency_keys
+from src.models.reconciliation import reconciliation_runs
+from src.models.transaction import TransactionType, transactions, transactions_archive
+
+
+class QueryRegistry:
+    def __init__(self):
+        self._queries: list[PreparedQuery] = []
+
+    def register(self, statement: ClauseElement, dialect: str | None = None) -> PreparedQuery:
+        query = PreparedQuery(statement, dialect)
+        self._queries.append(query)
+        return query
+
+    def prepare(self, databases: ReplicaSet) -> int:
+        """Compila todas as consultas para o primário e as réplicas"""
+        count = databases.primary.prepare(self._queries)
+        for replica in databases.replicas:
+            replica.prepare(self._queries)
+        return count
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+
+registry = QueryRegistry()
+
+# --- CONTAS ---
+
+account_owner = registry.register(
+    sa.select(accounts.c.user_id).where(accounts.c.id == sa.bindparam("account_id"))
+)
+account_for_user = registry.register(
+    sa.select(accounts.c.id).where(accounts.c.user_id == sa.bindparam("user_id")).limit(1)
+)
+_opening_balance = sa.bindparam("balance", type_=accounts.c.balance.type)
+insert_account = registry.register(
+    accounts.insert()
+    .values(user_id=sa.bindparam("user_id"), balance=_opening_balance, opening_balance=_opening_balance)
+    .returning(*accounts.c)
+)
+# Linha da importação em massa (`execute_many`), sem RETURNING
+insert_account_row = registry.register(
+    accounts.insert().values(user_id=sa.bindparam("user_id"), balance=_opening_balance, opening_balance=_opening_balance)
+)
+accounts_after = registry.register(
+    accounts.select()
+    .where(accounts.c.id > sa.bindparam("after"))
+    .order_by(accounts.c.id)
+    .limit(sa.bindparam("limit"))
+)
+accounts_offset = registry.register(
+    accounts.select().order_by(accounts.c.id).limit(sa.bindparam("limit")).offset(sa.bindparam("offset"))
+)
+
+# --- TRANSAÇÕES ---
+
+_delta = sa.bindparam("delta", type_=accounts.c.balance.type)
+
+# Saldo e limites validados pelo próprio UPDATE (centavos)
+update_balance = registry.register(
+    accounts.update()
+    .where(
+        accounts.c.id == sa.bindparam("account_id"),
+        accounts.c.balance + _delta >= 0,
+        accounts.c.balance + _delta <= sa.bindparam("max_balance"),
+    )
+    .values(balance=accounts.c.balance + _delta)
+    .returning(accounts.c.balance)
+)
+insert_transaction = registry.register(
+    transactions.insert()
+    .values(
+        account_id=sa.bindparam("account_id"),
+        type=sa.bindparam("type", type_=transactions.c.type.type),
+        amount=sa.bindparam("amount"),
+    )
+    .returning(*transactions.c)
+)
+# Saque na origem e depósito no destino, na ordem dos ids gerados
+_transfer_id = sa.bindparam("transfer_id", type_=transactions.c.transfer_id.type)
+_transfer_amount = sa.bindparam("amount", type_=transactions.c.amount.type)
+insert_transfer = registry.register(
+    transactions.insert()
+    .values([
+        {
+            "account_id": sa.bindparam("source_account_id"),
+            "type": TransactionType.WITHDRAWAL,
+            "amount": _transfer_amount,
+            "transfer_id": _transfer_id,
+        },
+        {
+            "account_id": sa.bindparam("destination_account_id"),
+            "type": TransactionType.DEPOSIT,
+            "amount": _transfer_amount,
+            "transfer_id": _transfer_id,
+        },
+    ])
+    .returning(*transactions.c)
+)
+# Último id da conta na tabela quente (ponto de partida do stream)
+last_transaction_id = registry.register(
+    sa.select(sa.func.max(transactions.c.id)).where(transactions.c.account_id == sa.bindparam("account_id"))
+)
+# Versão global das listagens de contas (src/services/account_versions.py):
+# maiores ids e quantas linhas há nas `window` abaixo deles, e a última
+# conciliação (que pode corrigir saldos sem criar transações)
+_max_transaction_id = sa.select(sa.func.max(transactions.c.id)).scalar_subquery()
+_max_account_id = sa.select(sa.func.max(accounts.c.id)).scalar_subquery()
+listing_version = registry.register(
+    sa.select(
+        _max_transaction_id,
+        sa.select(sa.func.count())
+        .select_from(transactions)
+        .where(transactions.c.id > _max_transaction_id - sa.bindparam("window"))
+        .scalar_subquery(),
+        _max_account_id,
+        sa.select(sa.func.count())
+        .select_from(accounts)
+        .where(accounts.c.id > _max_account_id - sa.bindparam("window"))
+        .scalar_subquery(),
+        sa.select(sa.func.max(reconciliation_runs.c.id)).scalar_subquery(),
+    )
+)
+transaction_by_id = registry.register(
+    transactions.select().where(transactions.c.id == sa.bindparam("id"))
+)
+archived_transaction_by_id = registry.register(
+    transactions_archive.select().where(transactions_archive.c.id == sa.bindparam("id"))
+)
+# Marca d'água do arquivo: subconsultas separadas, cada max() resolvido pelo índice
+archive_bounds = registry.register(
+    sa.select(
+        sa.select(sa.func.max(transactions_archive.c.id)).scalar_subquery(),
+        sa.select(sa.func.max(transactions_archive.c.timestamp)).scalar_subquery(),
+    )
+)
+
+
+def upsert_daily_summary(dialect: ModuleType, values: dict | list[dict]) -> ClauseElement:
+    """Acumula contagens e totais no resumo do dia; o saldo de fechamento é substituído"""
+    table = account_daily_summary
+    command = dialect.insert(table).values(values)
+    return command.on_conflict_do_update(
+        index_elements=[table.c.account_id, table.c.day],
+        set_={
+            "deposit_count": table.c.deposit_count + command.excluded.deposit_count,
+            "deposit_total": table.c.deposit_total + command.excluded.deposit_total,
+            "withdrawal_count": table.c.withdrawal_count + command.excluded.withdrawal_count,
+            "withdrawal_total": table.c.withdrawal_total + command.excluded.withdrawal_total,
+            "closing_balance": command.excluded.closing_balance,
+        },
+    )
+
+
+# Uma linha, o caso de `TransactionService.create`; por módulo de dialeto
+_summary_row = {column.name: sa.bindparam(column.name, type_=column.type) for column in account_daily_summary.c}
+upsert_daily_summary_row = {
+    postgresql: registry.register(upsert_daily_summary(postgresql, _summary_row), dialect="postgresql"),
+    sqlite: registry.register(upsert_daily_summary(sqlite, _summary_row), dialect="sqlite"),
+}
+
+# --- IDEMPOTÊNCIA ---
+
+insert_idempotency_key = registry.register(
+    idempotency_keys.insert().values(
+        user_id=sa.bindparam("user_id"),
+        key=sa.bindparam("key"),
+        fingerprint=sa.bindparam("fingerprint"),
+        status_code=sa.bindparam("status_code"),
+        response_body=sa.bindparam("response_body"),
+    )
+)
+idempotency_key_lookup = registry.register(
+    idempotency_keys.select().where(
+        idempotency_keys.c.user_id == sa.bindparam("user_id"),
+        idempotency_keys.c.key == sa.bindparam("key"),
+    )
+)
+
+# --- CONCILIAÇÃO ---
+
+def _net(table: sa.Table, *conditions) -> sa.ColumnElement:
+    """Depósitos - saques da conta da linha externa de `accounts`"""
+    signed = sa.case((table.c.type == TransactionType.DEPOSIT, table.c.amount), else_=-table.c.amount)
+    return sa.func.coalesce(
+        sa.select(sa.func.sum(signed)).where(table.c.account_id == accounts.c.id, *conditions).scalar_subquery(),
+        0,
+    )
+
+
+# Saldo que a conta deveria ter. Na tabela quente só conta o que está acima
+# da marca d'água do arquivo: linhas já copiadas e ainda não removidas contam
+# uma vez. Tudo em uma instrução, então saldo e transações vêm do mesmo snapshot
+_archive_watermark = sa.func.coalesce(sa.select(sa.func.max(transactions_archive.c.id)).scalar_subquery(), 0)
+expected_balance = (
+    accounts.c.opening_balance
+    + _net(transactions, transactions.c.id > _archive_watermark)
+    + _net(transactions_archive)
+)
+reconciliation_bounds = registry.register(
+    sa.select(
+        sa.select(sa.func.min(accounts.c.id)).scalar_subquery(),
+        sa.select(sa.func.max(accounts.c.id)).scalar_subquery(),
+        sa.select(sa.func.count()).select_from(accounts).scalar_subquery(),
+        sa.select(sa.func.max(transactions.c.id)).scalar_subquery(),
+    )
+)
+# Contas divergentes em uma faixa de ids
+reconcile_range = registry.register(
+    sa.select(accounts.c.id, accounts.c.balance, expected_balance.label("expected"))
+    .where(accounts.c.id > sa.bindparam("low"), accounts.c.id <= sa.bindparam("high"))
+    .where(accounts.c.balance != expected_balance)
+)
+# Contas com transações (em qualquer das tabelas) ou criadas depois do checkpoint
+changed_accounts = registry.register(
+    sa.union(
+        sa.select(transactions.c.account_id).where(transactions.c.id > sa.bindparam("since")),
+        sa.select(transactions_archive.c.account_id).where(transactions_archive.c.id > sa.bindparam("since")),
+        sa.select(accounts.c.id).where(accounts.c.id > sa.bindparam("account_since")),
+    )
+)
+lock_account = registry.register(
+    sa.select(accounts.c.id).where(accounts.c.id == sa.bindparam("account_id")).with_for_update()
+)
+fix_balance = registry.register(
+    accounts.update()
+    .where(accounts.c.id == sa.bindparam("account_id"), accounts.c.balance != expected_balance)
+    .values(balance=expected_balance)
+    .returning(accounts.c.balance)
+)
+last_reconciliation = registry.register(
+    reconciliation_runs.select().order_by(reconciliation_runs.c.id.desc()).limit(1)
+)
+insert_reconciliation_run = registry.register(
+    reconciliation_runs.insert().values({
+        column.name: sa.bindparam(column.name, type_=column.type) for column in reconciliation_runs.c if column.name != "id"
+    })
+)
+
+
+def reconcile_accounts(account_ids: list[int]) -> ClauseElement:
+    """Contas divergentes entre `account_ids` (execução incremental)"""
+    return (
+        sa.select(accounts.c.id, accounts.c.balance, expected_balance.label("expected"))
+        .where(accounts.c.id.in_(account_ids))
+        .where(accounts.c.balance != expected_balance)
+    )
@@ -0,0 +1,326 @@
+"""Limite de requisições por janela deslizante, compartilhado entre workers.
+
+Cada chave (`escopo:cliente`) guarda o contador da janela atual e o da
+anterior; a contagem efetiva é a anterior ponderada pelo quanto dela ainda
+cabe na janela deslizante, somada à atual. São três inteiros por chave e uma
+única operação atômica por requisição.
+
+Backends, escolhidos por `RATE_LIMIT_URL`:
+
+* `memory://` (padrão): contadores no próprio processo, um limite por worker.
+* `sqlite:///caminho/arquivo.db`: arquivo local compartilhado por todos os
+  workers da máquina (WAL, um `UPSERT ... RETURNING` por requisição).
+* `redis://...`: compartilhado entre máquinas; requer o pacote `redis`.
+
+As janelas usam o relógio de parede (`time.time`), comum a todos os
+processos. Requisições recusadas também contam, então um cliente insistente
+continua bloqueado até reduzir o ritmo. A exceção é `FailedAttemptsRateLimit`
+(login), que só consulta o contador na entrada e conta apenas as tentativas
+que terminam em erro.
+"""
+import asyncio
+import logging
+import math
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Annotated, AsyncIterator, Protocol
+
+from fastapi import Depends, Request
+
+from src import metrics
+from src.config import settings
+from src.exceptions import RateLimitExceededError
+from src.security import get_current_user
+
+logger = logging.getLogger(__name__)
+
+rate_limit_rejections_total = metrics.registry.register(metrics.Counter(
+    "rate_limit_rejections_total", "Requisições recusadas pelo limite de taxa.", ("scope",)
+))
+
+
+class RateLimitBackend(Protocol):
+    async def hit(self, key: str, slot: int, ttl: float) -> tuple[int, int]:
+        """Conta uma requisição na janela `slot`; devolve (atual, anterior)"""
+        ...
+
+    async def peek(self, key: str, slot: int) -> tuple[int, int]:
+        """Contadores (atual, anterior) vistos da janela `slot`, sem contar nada"""
+        ...
+
+    async def close(self) -> None: ...
+
+
+def _view(stored_slot: int, current: int, previous: int, slot: int) -> tuple[int, int]:
+    """Contadores (atual, anterior) de uma chave gravada em `stored_slot`, vistos de `slot`"""
+    if stored_slot == slot:
+        return current, previous
+    if stored_slot == slot - 1:
+        return 0, current
+    return 0, 0
+
+
+def _shift(stored_slot: int, current: int, previous: int, slot: int) -> tuple[int, int]:
+    """Contadores (atual, anterior) depois de somar uma requisição em `slot`"""
+    if stored_slot == slot:
+        return current + 1, previous
+    if stored_slot == slot - 1:
+        return 1, current
+    return 1, 0
+
+
+class MemoryRateLimitBackend:
+    """Contadores em processo, com despejo LRU das chaves menos usadas"""
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[int, int, int]] = OrderedDict()
+
+    async def hit(self, key: str, slot: int, ttl: float) -> tuple[int, int]:
+        stored = self._entries.get(key)
+        current, previous = _shift(*stored, slot) if stored else (1, 0)
+        self._entries[key] = (slot, current, previous)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return current, previous
+
+    async def peek(self, key: str, slot: int) -> tuple[int, int]:
+        stored = self._entries.get(key)
+        return _view(*stored, slot) if stored else (0, 0)
+
+    async def close(self) -> None:
+        self._entries.clear()
+
+
+class SQLiteRateLimitBackend:
+    """Contadores em um arquivo SQLite compartilhado pelos workers da máquina.
+
+    O `UPSERT` calcula a troca de janela e o incremento no próprio banco, então
+    workers concorrentes nunca perdem contagens. As chamadas rodam em uma
+    thread dedicada para não bloquear o event loop enquanto outro processo
+    segura o lock de escrita.
+    """
+
+    UPSERT = """
+        INSERT INTO rate_limits (key, slot, current, previous, expires_at) VALUES (?, ?, 1, 0, ?)
+        ON CONFLICT (key) DO UPDATE SET
+            previous = CASE
+                WHEN excluded.slot = slot THEN previous
+                WHEN excluded.slot = slot + 1 THEN current
+                ELSE 0
+            END,
+            current = CASE WHEN excluded.slot = slot THEN current + 1 ELSE 1 END,
+            slot = excluded.slot,
+            expires_at = excluded.expires_at
+        RETURNING current, previous
+    """
+    # Remove chaves expiradas a cada N requisições
+    PURGE_EVERY = 10_000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rate-limit")
+        self._connection: sqlite3.Connection | None = None
+        self._hits = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "key TEXT PRIMARY KEY, slot INTEGER NOT NULL, current INTEGER NOT NULL, "
+            "previous INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        return connection
+
+    def _hit(self, key: str, slot: int, ttl: float) -> tuple[int, int]:
+        if self._connection is None:
+            self._connection = self._connect()
+        now = time.time()
+        current, previous = self._connection.execute(self.UPSERT, (key, slot, now + ttl)).fetchone()
+        self._hits += 1
+        if self._hits % self.PURGE_EVERY == 0:
+            self._connection.execute("DELETE FROM rate_limits WHERE expires_at < ?", (now,))
+        return current, previous
+
+    async def hit(self, key: str, slot: int, ttl: float) -> tuple[int, int]:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._hit, key, slot, ttl)
+
+    def _peek(self, key: str, slot: int) -> tuple[int, int]:
+        if self._connection is None:
+            self._connection = self._connect()
+        stored = self._connection.execute(
+            "SELECT slot, current, previous FROM rate_limits WHERE key = ?", (key,)
+        ).fetchone()
+        return _view(*stored, slot) if stored else (0, 0)
+
+    async def peek(self, key: str, slot: int) -> tuple[int, int]:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._peek, key, slot)
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def close(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close)
+
+
+class RedisRateLimitBackend:
+    """Contadores compartilhados via Redis, atualizados por um script Lua atômico"""
+
+    SCRIPT = """
+        local stored = redis.call('HMGET', KEYS[1], 'slot', 'current', 'previous')
+        local slot = tonumber(ARGV[1])
+        local stored_slot = tonumber(stored[1])
+        local current, previous = 1, 0
+        if stored_slot == slot then
+            current, previous = tonumber(stored[2]) + 1, tonumber(stored[3])
+        elseif stored_slot == slot - 1 then
+            previous = tonumber(stored[2])
+        end
+        redis.call('HSET', KEYS[1], 'slot', slot, 'current', current, 'previous', previous)
+        redis.call('PEXPIRE', KEYS[1], ARGV[2])
+        return {current, previous}
+    """
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("RATE_LIMIT_URL redis:// requer o pacote 'redis' instalado") from exc
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    async def hit(self, key: str, slot: int, ttl: float) -> tuple[int, int]:
+        current, previous = await self._script(keys=[f"rate_limit:{key}"], args=[slot, int(ttl * 1000)])
+        return int(current), int(previous)
+
+    async def peek(self, key: str, slot: int) -> tuple[int, int]:
+        stored_slot, current, previous = await self._client.hmget(
+            f"rate_limit:{key}", "slot", "current", "previous"
+        )
+        if stored_slot is None:
+            return 0, 0
+        return _view(int(stored_slot), int(current), int(previous), slot)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def build_backend(url: str) -> RateLimitBackend:
+    """Cria o backend indicado pelo esquema da URL"""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisRateLimitBackend(url)
+    if url.startswith("sqlite:///"):
+        return SQLiteRateLimitBackend(url[len("sqlite:///"):])
+    if url.startswith("memory://"):
+        return MemoryRateLimitBackend()
+    raise ValueError(f"Backend de limite de taxa não suportado: {url}")
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    count: float
+    retry_after: int
+
+
+class RateLimiter:
+    """Janela deslizante aproximada sobre os contadores do backend"""
+
+    def __init__(self, backend: RateLimitBackend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+
+    async def hit(self, key: str, limit: int, period: int) -> RateLimitResult:
+        slot, offset = divmod(time.time(), period)
+        current, previous = await self.backend.hit(key, int(slot), ttl=2 * period)
+        return self.__result(current, previous, offset, limit, period)
+
+    async def peek(self, key: str, limit: int, period: int) -> RateLimitResult:
+        """Como `hit`, mas sem contar: `allowed` indica se ainda cabe mais uma"""
+        slot, offset = divmod(time.time(), period)
+        current, previous = await self.backend.peek(key, int(slot))
+        # Cabe mais uma se, somada a ela, a contagem não passar do limite
+        return self.__result(current + 1, previous, offset, limit, period)
+
+    @staticmethod
+    def __result(current: int, previous: int, offset: float, limit: int, period: int) -> RateLimitResult:
+        count = previous * (1 - offset / period) + current
+        if count <= limit:
+            return RateLimitResult(True, count, 0)
+        # Espera até o peso da janela anterior cair o suficiente (ou a atual virar)
+        if previous and current <= limit:
+            wait = (1 - (limit - current) / previous) * period - offset
+        else:
+            wait = period - offset
+        return RateLimitResult(False, count, max(1, math.ceil(wait)))
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+limiter = RateLimiter(build_backend(settings.rate_limit_url))
+
+
+# --- DEPENDENCIAS ---
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimit:
+    """Dependência que aplica `limit` requisições por `period` segundos, por IP"""
+
+    def __init__(self, scope: str, limit: int, period: int):
+        self.scope = scope
+        self.limit = limit
+        self.period = period
+
+    async def check(self, identity: str, count: bool = True) -> None:
+        if not limiter.enabled:
+            return
+        key = f"{self.scope}:{identity}"
+        if count:
+            result = await limiter.hit(key, self.limit, self.period)
+        else:
+            result = await limiter.peek(key, self.limit, self.period)
+        if not result.allowed:
+            rate_limit_rejections_total.inc(self.scope)
+            logger.warning("Limite de taxa excedido - scope=%s, identity=%s", self.scope, identity)
+            raise RateLimitExceededError(result.retry_after)
+
+    async def __call__(self, request: Request) -> None:
+        await self.check(client_ip(request))
+
+
+class UserRateLimit(RateLimit):
+    """Como `RateLimit`, mas contado por usuário autenticado"""
+
+    async def __call__(self, current_user: Annotated[dict[str, int], Depends(get_current_user)]) -> None:
+        await self.check(f"user:{current_user['user_id']}")
+
+
+class FailedAttemptsRateLimit(RateLimit):
+    """Como `RateLimit`, mas só as tentativas que terminam em erro contam.
+
+    Na entrada apenas consulta o contador (e recusa quem já passou do limite);
+    a tentativa é contada se o endpoint ou a validação do corpo levantarem
+    uma exceção. Requisições recusadas pelo próprio limite não contam.
+    """
+
+    async def __call__(self, request: Request) -> AsyncIterator[None]:
+        identity = client_ip(request)
+        await self.check(identity, count=False)
+        try:
+            yield
+        except Exception:
+            if limiter.enabled:
+                await limiter.hit(f"{self.scope}:{identity}", self.limit, self.period)
+            raise
@@ -1,6 +1,8 @@
-from pydantic import BaseModel, PositiveFloat
+from pydantic import BaseModel
+
+from src.money import Cents
 
 
 class AccountIn(BaseModel):
     user_id: int
-    balance: PositiveFloat
\ No newline at end of file
+    balance: Cents
\ No newline at end of file
@@ -1,16 +1,37 @@
 from enum import Enum
 
-from pydantic import BaseModel, PositiveFloat
+from pydantic import BaseModel, Field
+
+from src.config import settings
+from src.money import Cents
 
 class TransactionType(Enum):
     DEPOSIT = "deposit"
     WITHDRAWAL = "withdrawal"
 
 
+class BatchMode(Enum):
+    ALL_OR_NOTHING = "all_or_nothing"
+    BEST_EFFORT = "best_effort"
+
+
+class ExportFormat(Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
 class TransactionIn(BaseModel):
     account_id: int
     type: TransactionType
-    amount: PositiveFloat
+    amount: Cents
+
+    class Config:
+        use_enum_values = True
+
+
+class TransactionBatchIn(BaseModel):
+    items: list[TransactionIn] = Field(min_length=1, max_length=settings.max_batch_size)
+    mode: BatchMode = BatchMode.ALL_OR_NOTHING
 
     class Config:
-        use_enum_values = True
\ No newline at end of file
+        use_enum_values = True
@@ -0,0 +1,15 @@
+from pydantic import BaseModel, model_validator
+
+from src.money import Cents
+
+
+class TransferIn(BaseModel):
+    source_account_id: int
+    destination_account_id: int
+    amount: Cents
+
+    @model_validator(mode="after")
+    def check_accounts(self) -> "TransferIn":
+        if self.source_account_id == self.destination_account_id:
+            raise ValueError("Conta de origem e de destino devem ser diferentes")
+        return self
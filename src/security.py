@@ -1,4 +1,7 @@
+import hashlib
 import logging
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
 from typing import Annotated
 from uuid import uuid4
@@ -14,6 +17,8 @@ logger = logging.getLogger(__name__)
 
 SECRET = settings.jwt_secret
 ALGORITHM = settings.jwt_algorithm
+# Tolerância de relógio do `exp`, em segundos: a mesma no `jwt.decode` e no cache
+LEEWAY = 10
 
 # --- SCHEMAS ---
 
@@ -29,6 +34,59 @@ class AccessToken(BaseModel):
 class JWTToken(BaseModel):
     access_token: AccessToken
 
+# --- CACHE DE TOKENS ---
+
+class TokenCache:
+    """Cache LRU de tokens já verificados, indexado pelo digest do token.
+
+    Cada entrada vale até o `exp` do próprio token mais `LEEWAY`, a mesma
+    tolerância de `jwt.decode`: o cache aceita um token exatamente enquanto
+    a verificação completa o aceitaria; depois disso ele volta a passar por
+    `jwt.decode`.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, JWTToken] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> JWTToken | None:
+        key = self._key(token)
+        payload = self._entries.get(key)
+        if payload is None:
+            self.misses += 1
+            return None
+        if payload.access_token.exp + LEEWAY <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def put(self, token: str, payload: JWTToken) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[self._key(token)] = payload
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache(maxsize=settings.jwt_cache_size)
+
 # --- FUNÇÕES CORE ---
 
 def sign_jwt(user_id: int, token_type: str = "access") -> dict:
@@ -50,7 +108,7 @@ def sign_jwt(user_id: int, token_type: str = "access") -> dict:
         "type": token_type,
     }
     token = jwt.encode(payload, SECRET, algorithm=ALGORITHM)
-    logger.info(f"Token {token_type} gerado para user_id={user_id}")
+    logger.info("Token %s gerado para user_id=%s", token_type, user_id)
     return {"access_token": token}
 
 def sign_refresh_jwt(user_id: int) -> dict:
@@ -58,23 +116,28 @@ def sign_refresh_jwt(user_id: int) -> dict:
     return sign_jwt(user_id, token_type="refresh")
 
 async def decode_jwt(token: str) -> JWTToken | None:
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
     try:
         decoded_payload = jwt.decode(
             token, 
             SECRET, 
             audience="desafio-bank", 
             algorithms=[ALGORITHM],
-            leeway=10
+            leeway=LEEWAY
         )
-        return JWTToken(access_token=AccessToken(**decoded_payload))
+        payload = JWTToken(access_token=AccessToken(**decoded_payload))
+        token_cache.put(token, payload)
+        return payload
     except jwt.ExpiredSignatureError:
         logger.warning("Token expirado")
         return None
     except jwt.InvalidTokenError as e:
-        logger.warning(f"Token inválido: {str(e)}")
+        logger.warning("Token inválido: %s", e)
         return None
     except Exception as e:
-        logger.error(f"Erro ao decodificar token: {str(e)}")
+        logger.error("Erro ao decodificar token: %s", e)
         return None
         
 # --- AUTH MIDDLEWARE ---
@@ -117,4 +180,9 @@ async def get_current_user(
 def login_required(current_user: Annotated[dict[str, int], Depends(get_current_user)]):
     if not current_user:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
-    return current_user
\ No newline at end of file
+    return current_user
+
+def admin_required(current_user: Annotated[dict[str, int], Depends(get_current_user)]):
+    if current_user["user_id"] not in settings.admin_user_ids:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    return current_user
@@ -1,17 +1,29 @@
 import logging
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+from typing import Any
+
+import sqlalchemy as sa
 from databases.interfaces import Record
+from pydantic import ValidationError
 
-from src.database import database
+from src import queries
+from src.config import settings
+from src.database import database, read_database
 from src.models.account import accounts
 from src.schemas.account import AccountIn
 from src.exceptions import DuplicateAccountError
+from src.pagination import decode_cursor
+from src.services.account_cache import account_cache
+from src.services.account_versions import account_versions
+from src.log import SAMPLED
 
 logger = logging.getLogger(__name__)
 
 
 class AccountService:
-    async def read_all(self, limit: int, skip: int = 0) -> list[Record]:
-        """Busca todas as contas com paginação"""
+    async def read_all(self, limit: int, skip: int = 0, cursor: str | None = None) -> list[Record]:
+        """Busca todas as contas com paginação por cursor ou offset"""
         if limit > 100:
             limit = 100
         if limit < 1:
@@ -19,25 +31,138 @@ class AccountService:
         if skip < 0:
             skip = 0
             
-        query = accounts.select().limit(limit).offset(skip)
-        result = await database.fetch_all(query)
-        logger.info(f"Listadas {len(result)} contas (limit={limit}, skip={skip})")
+        if cursor:
+            values = {"after": decode_cursor(cursor, "id")["id"], "limit": limit}
+            result = await read_database.fetch_all(queries.accounts_after, values)
+        else:
+            result = await read_database.fetch_all(queries.accounts_offset, {"limit": limit, "offset": skip})
+        logger.info("Listadas %s contas (limit=%s, skip=%s)", len(result), limit, skip, extra=SAMPLED)
         return result
 
     async def create(self, account: AccountIn) -> Record:
         """Cria uma nova conta com validação de duplicata"""
         # Validar se já existe conta para este user_id
-        query = accounts.select().where(accounts.c.user_id == account.user_id)
-        existing = await database.fetch_one(query)
+        existing = await account_cache.get_account_for_user(account.user_id)
         
         if existing:
-            logger.warning(f"Tentativa de criar conta duplicada para user_id={account.user_id}")
+            logger.warning("Tentativa de criar conta duplicada para user_id=%s", account.user_id)
             raise DuplicateAccountError(f"Conta já existe para o usuário {account.user_id}")
         
-        command = accounts.insert().values(user_id=account.user_id, balance=account.balance)
-        account_id = await database.execute(command)
+        result = await database.fetch_one(
+            queries.insert_account, {"user_id": account.user_id, "balance": account.balance}
+        )
+        await account_cache.remember(result.id, result.user_id)
+        account_versions.invalidate_listing()
         
-        logger.info(f"Conta criada: id={account_id}, user_id={account.user_id}, balance={account.balance}")
+        logger.info("Conta criada: id=%s, user_id=%s, balance_cents=%s", result.id, account.user_id, account.balance)
+        return result
+
+    async def create_bulk(self, items: AsyncIterator[Any]) -> dict:
+        """Cria contas em massa a partir de itens ainda não validados (JSON ou CSV).
+
+        Processa em blocos de `BULK_CHUNK_SIZE`, cada um na sua própria
+        transação: uma consulta de duplicatas, a carga (COPY no Postgres,
+        `executemany` do driver nos demais) e uma consulta dos ids criados.
+        user_ids repetidos no próprio lote ficam só com a primeira linha.
+        Cada resultado traz a linha do CSV (`line`) e, se a validação falhar,
+        o user_id recebido como texto (`raw_user_id`). A leitura para depois
+        de `MAX_BULK_ACCOUNTS` linhas: um único resultado marca o corte e o
+        restante do upload não é lido (`truncated`).
+        """
+        results: list[dict] = []
+        seen: set[int] = set()
+        chunk: list[tuple[dict, AccountIn]] = []
+        truncated = False
+        async for item in items:
+            index = len(results)
+            result = {
+                "index": index,
+                "line": getattr(item, "line", None),
+                "user_id": None,
+                "raw_user_id": None,
+                "success": False,
+                "id": None,
+                "error": None,
+            }
+            results.append(result)
+            if index >= settings.max_bulk_accounts:
+                result["error"] = (
+                    f"Máximo de {settings.max_bulk_accounts} contas por importação; linhas seguintes ignoradas"
+                )
+                truncated = True
+                break
+            try:
+                account = AccountIn.model_validate(item)
+            except ValidationError as exc:
+                error = exc.errors()[0]
+                result["error"] = f"{'.'.join(map(str, error['loc'])) or 'item'}: {error['msg']}"
+                # O valor recebido, para localizar a linha recusada
+                if isinstance(item, dict) and item.get("user_id") is not None:
+                    result["raw_user_id"] = str(item["user_id"])
+                continue
+
+            result["user_id"] = account.user_id
+            if account.user_id in seen:
+                result["error"] = f"user_id repetido na importação: {account.user_id}"
+                continue
+            seen.add(account.user_id)
+            chunk.append((result, account))
+            if len(chunk) >= settings.bulk_chunk_size:
+                await self.__insert_chunk(chunk)
+                account_versions.invalidate_listing()
+                chunk = []
+        if chunk:
+            await self.__insert_chunk(chunk)
+            account_versions.invalidate_listing()
+
+        accepted = sum(1 for result in results if result["success"])
+        if truncated:
+            logger.warning("Importação de contas cortada em %s linhas", settings.max_bulk_accounts)
+        logger.info("Importação de contas: %s criadas, %s rejeitadas", accepted, len(results) - accepted)
+        return {
+            "accepted": accepted,
+            "rejected": len(results) - accepted,
+            "truncated": truncated,
+            "results": results,
+        }
+
+    @database.transaction()
+    async def __insert_chunk(self, chunk: list[tuple[dict, AccountIn]]) -> None:
+        """Grava um bloco da importação, marcando duplicatas e ids criados nos resultados"""
+        query = sa.select(accounts.c.user_id).where(accounts.c.user_id.in_([account.user_id for _, account in chunk]))
+        existing = {row.user_id for row in await database.fetch_all(query)}
+        new = []
+        for result, account in chunk:
+            if account.user_id in existing:
+                result["error"] = f"Conta já existe para o usuário {account.user_id}"
+            else:
+                new.append((result, account))
+        if not new:
+            return
+
+        if database.url.dialect == "postgresql":
+            await self.__copy_accounts([account for _, account in new])
+        else:
+            await database.execute_many(
+                queries.insert_account_row,
+                [{"user_id": account.user_id, "balance": account.balance} for _, account in new],
+            )
+        # Os user_ids do bloco não tinham conta: cada um tem exatamente a que foi criada agora
+        query = sa.select(accounts.c.id, accounts.c.user_id).where(
+            accounts.c.user_id.in_([account.user_id for _, account in new])
+        )
+        ids = {row.user_id: row.id for row in await database.fetch_all(query)}
+        for result, account in new:
+            result["id"] = ids[account.user_id]
+            result["success"] = True
 
-        query = accounts.select().where(accounts.c.id == account_id)
-        return await database.fetch_one(query)
\ No newline at end of file
+    async def __copy_accounts(self, new: list[AccountIn]) -> None:
+        """COPY das contas no Postgres (`created_at` explícito: o default da coluna é do SQLAlchemy)"""
+        created_at = datetime.now(timezone.utc)
+        async with database.connection() as connection:
+            async with connection._query_lock:
+                await connection.raw_connection.copy_records_to_table(
+                    accounts.name,
+                    records=[(account.user_id, account.balance, account.balance, created_at) for account in new],
+                    columns=["user_id", "balance", "opening_balance", "created_at"],
+                )
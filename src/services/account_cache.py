@@ -0,0 +1,64 @@
+import logging
+
+from src import queries
+from src.cache import CacheBackend, build_backend
+from src.config import settings
+from src.database import database
+
+logger = logging.getLogger(__name__)
+
+
+class AccountCache:
+    """Cache read-through de existência e dono (`user_id`) das contas.
+
+    Guarda apenas dados que não mudam depois da criação da conta (a API não
+    altera nem remove contas, então não há invalidação); o saldo nunca é
+    cacheado e continua sendo lido e validado no próprio UPDATE.
+    Para `user_id -> conta` só há cache positivo, então a verificação de
+    duplicata volta ao banco enquanto o usuário não tiver conta.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def get_owner(self, account_id: int) -> int | None:
+        """user_id dono da conta, ou None se a conta não existe"""
+        cached = await self.backend.get(f"account:{account_id}")
+        if cached is not None:
+            self.hits += 1
+            return int(cached)
+
+        self.misses += 1
+        user_id = await database.fetch_val(queries.account_owner, {"account_id": account_id})
+        if user_id is not None:
+            await self.backend.set(f"account:{account_id}", str(user_id), self.ttl)
+        return user_id
+
+    async def get_account_for_user(self, user_id: int) -> int | None:
+        """id da conta do usuário, ou None se ele ainda não tem conta"""
+        cached = await self.backend.get(f"account_user:{user_id}")
+        if cached is not None:
+            self.hits += 1
+            return int(cached)
+
+        self.misses += 1
+        account_id = await database.fetch_val(queries.account_for_user, {"user_id": user_id})
+        if account_id is not None:
+            await self.remember(account_id, user_id)
+        return account_id
+
+    async def remember(self, account_id: int, user_id: int) -> None:
+        await self.backend.set(f"account:{account_id}", str(user_id), self.ttl)
+        await self.backend.set(f"account_user:{user_id}", str(account_id), self.ttl)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+account_cache = AccountCache(
+    build_backend(settings.cache_url, maxsize=settings.account_cache_size),
+    ttl=settings.account_cache_ttl,
+)
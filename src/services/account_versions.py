@@ -0,0 +1,81 @@
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+
+from databases.interfaces import Record
+
+from src import queries
+from src.config import settings
+from src.database import database
+
+logger = logging.getLogger(__name__)
+
+
+class AccountVersions:
+    """Versões das contas em memória, de onde saem os ETags das listagens.
+
+    A versão de uma conta é o id da sua transação mais recente. Ela só
+    cresce e segue a ordem de commit: toda transação é inserida com a linha
+    da conta travada pelo UPDATE do saldo. As listagens de contas usam uma
+    versão global (maiores ids e quantas linhas há logo abaixo deles, que
+    muda também quando uma transação com id menor faz commit depois).
+
+    As escritas deste processo atualizam o mapa no commit; as dos outros
+    workers são vistas quando a entrada expira (`ETAG_VERSION_TTL`) e é
+    relida do primário com uma consulta de índice, nunca a da listagem.
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._accounts: OrderedDict[int, tuple[float, int | None]] = OrderedDict()
+        self._listing: tuple[float, tuple] | None = None
+
+    async def account(self, account_id: int) -> int | None:
+        """Versão da conta (None se ela não tem transações na tabela quente)"""
+        entry = self._accounts.get(account_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            self._accounts.move_to_end(account_id)
+            return entry[1]
+
+        self.misses += 1
+        version = await database.fetch_val(queries.last_transaction_id, {"account_id": account_id})
+        self.__store(account_id, version)
+        return version
+
+    async def listing(self) -> tuple:
+        """Versão de todas as contas: muda com qualquer transação ou conta nova"""
+        if self._listing is not None and self._listing[0] > time.monotonic():
+            self.hits += 1
+            return self._listing[1]
+
+        self.misses += 1
+        row = await database.fetch_one(queries.listing_version, {"window": settings.etag_version_window})
+        version = (row[0], row[1], row[2], row[3], row[4])
+        self._listing = (time.monotonic() + self.ttl, version)
+        return version
+
+    def bump(self, rows: Iterable[Record]) -> None:
+        """Registra transações que acabaram de fazer commit neste processo"""
+        for row in rows:
+            entry = self._accounts.get(row.account_id)
+            if entry is None or entry[1] is None or entry[1] < row.id:
+                self.__store(row.account_id, row.id)
+        self._listing = None
+
+    def invalidate_listing(self) -> None:
+        """Contas novas mudam as listagens, mas não as versões das existentes"""
+        self._listing = None
+
+    def __store(self, account_id: int, version: int | None) -> None:
+        self._accounts[account_id] = (time.monotonic() + self.ttl, version)
+        self._accounts.move_to_end(account_id)
+        while len(self._accounts) > self.maxsize:
+            self._accounts.popitem(last=False)
+
+
+account_versions = AccountVersions(ttl=settings.etag_version_ttl, maxsize=settings.account_cache_size)
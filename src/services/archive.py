@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import sqlalchemy as sa
+from databases.interfaces import Record
+
+from src import queries
+from src.config import settings
+from src.database import database, read_database
+from src.models.transaction import transactions, transactions_archive
+
+logger = logging.getLogger(__name__)
+
+# Condições de uma consulta, montadas para a tabela quente ou para o arquivo
+Filters = Callable[[sa.Table], list]
+
+
+def _as_utc(value: datetime | None) -> datetime | None:
+    """SQLite devolve timestamps sem fuso; eles são gravados em UTC"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+@dataclass
+class ArchiveResult:
+    copied: int
+    deleted: int
+    watermark: int
+
+
+class ArchiveService:
+    """Particionamento de `transactions` em dados quentes e arquivo.
+
+    O arquivo guarda um prefixo dos ids: toda transação com id até a marca
+    d'água (o maior id arquivado) está em `transactions_archive` e as demais
+    em `transactions`. As leituras dividem cada consulta nessa marca, então
+    páginas além dela (as transações recentes) nunca tocam o arquivo.
+
+    A marca fica em cache por `ARCHIVE_WATERMARK_TTL` segundos. Para que uma
+    marca desatualizada nunca esconda linhas, o arquivamento copia primeiro e
+    só apaga da tabela quente depois de um intervalo maior que esse TTL:
+    até lá as linhas acima da marca antiga continuam em `transactions`.
+    """
+
+    def __init__(self):
+        self._watermark = 0
+        self._archived_until: datetime | None = None
+        self._expires_at = 0.0
+        # Total de linhas arquivadas, válido enquanto a marca não mudar
+        self._archived_count: tuple[int, int] | None = None
+
+    async def watermark(self) -> int:
+        """Maior id arquivado (0 sem arquivo), em cache por alguns segundos"""
+        now = time.monotonic()
+        if now >= self._expires_at:
+            row = await read_database.fetch_one(queries.archive_bounds)
+            self._watermark = row[0] or 0
+            self._archived_until = _as_utc(row[1])
+            self._expires_at = now + settings.archive_watermark_ttl
+        return self._watermark
+
+    def expire(self) -> None:
+        self._expires_at = 0.0
+
+    # --- LEITURAS PARTICIONADAS ---
+
+    async def read_page(
+        self, filters: Filters, limit: int, skip: int = 0, after: int | None = None, primary: bool = False
+    ) -> list[Record]:
+        """Página em ordem de id: `after` é o último id visto (cursor), senão usa `skip`.
+
+        `primary` lê do primário em vez das réplicas, para quem não pode
+        perder uma transação recém-criada (a retomada do stream).
+        """
+        source = database if primary else read_database
+        watermark = await self.watermark()
+        offset = skip if after is None else 0
+        after = after or 0
+        rows: list[Record] = []
+
+        if after < watermark:
+            archived = 0
+            if offset:
+                # O offset atravessa as duas tabelas: conta as linhas arquivadas que ele cobre
+                archived = await self.__count(filters(transactions_archive), watermark)
+            if offset < archived or not offset:
+                query = (
+                    transactions_archive.select()
+                    .where(*filters(transactions_archive), transactions_archive.c.id > after)
+                    .where(transactions_archive.c.id <= watermark)
+                    .order_by(transactions_archive.c.id)
+                    .limit(limit)
+                    .offset(offset)
+                )
+                rows = await source.fetch_all(query)
+                if len(rows) == limit:
+                    return rows
+                offset = 0
+            else:
+                offset -= archived
+
+        query = (
+            transactions.select()
+            .where(*filters(transactions), transactions.c.id > max(after, watermark))
+            .order_by(transactions.c.id)
+            .limit(limit - len(rows))
+            .offset(offset)
+        )
+        return rows + await source.fetch_all(query)
+
+    async def __count(self, conditions: list, watermark: int) -> int:
+        cached = not conditions
+        if cached and self._archived_count and self._archived_count[0] == watermark:
+            return self._archived_count[1]
+        count = await read_database.fetch_val(
+            sa.select(sa.func.count())
+            .select_from(transactions_archive)
+            .where(*conditions, transactions_archive.c.id <= watermark)
+        )
+        if cached:
+            self._archived_count = (watermark, count)
+        return count
+
+    async def read_one(self, transaction_id: int) -> Record | None:
+        query = queries.archived_transaction_by_id if transaction_id <= await self.watermark() else queries.transaction_by_id
+        return await read_database.fetch_one(query, {"id": transaction_id})
+
+    async def iterate(self, filters: Filters, start: datetime | None = None) -> AsyncIterator[Record]:
+        """Todas as linhas em ordem de id: primeiro o arquivo, depois a tabela quente.
+
+        Com `start` posterior à transação arquivada mais recente, o arquivo nem
+        é consultado.
+        """
+        watermark = await self.watermark()
+        skip_archive = start is not None and (
+            self._archived_until is None or self._archived_until < _as_utc(start)
+        )
+        if watermark and not skip_archive:
+            archived = (
+                transactions_archive.select()
+                .where(*filters(transactions_archive), transactions_archive.c.id <= watermark)
+                .order_by(transactions_archive.c.id)
+            )
+            async for row in read_database.iterate(archived):
+                yield row
+        hot = (
+            transactions.select()
+            .where(*filters(transactions), transactions.c.id > watermark)
+            .order_by(transactions.c.id)
+        )
+        async for row in read_database.iterate(hot):
+            yield row
+
+    # --- ARQUIVAMENTO ---
+
+    async def archive(
+        self, horizon: timedelta, batch_size: int, grace: float, dry_run: bool = False
+    ) -> ArchiveResult:
+        """Move para o arquivo as transações anteriores a `agora - horizon`.
+
+        Copia em lotes de `batch_size` ids consecutivos (uma transação curta
+        por lote), espera `grace` segundos e então apaga da tabela quente, também
+        em lotes. Pode ser interrompido e executado de novo: recomeça da marca
+        d'água e apaga o que já tinha sido copiado.
+        """
+        cutoff = datetime.now(timezone.utc) - horizon
+        copied = 0
+        watermark = await database.fetch_val(sa.select(sa.func.max(transactions_archive.c.id))) or 0
+        # A transação mais recente nunca é arquivada: no SQLite o id dela seria reutilizado
+        newest = await database.fetch_val(sa.select(sa.func.max(transactions.c.id))) or 0
+
+        while True:
+            upto = await self.__batch_end(watermark, newest, cutoff, batch_size)
+            if upto is None:
+                break
+            if dry_run:
+                count = await database.fetch_val(
+                    sa.select(sa.func.count()).where(transactions.c.id > watermark, transactions.c.id <= upto)
+                )
+            else:
+                count = await self.__copy(watermark, upto)
+            copied += count
+            watermark = upto
+            logger.info("Arquivadas %s transações (até id=%s)", copied, watermark)
+
+        if dry_run:
+            return ArchiveResult(copied, 0, watermark)
+
+        if copied:
+            logger.info("Aguardando %ss antes de remover da tabela quente", grace)
+            await asyncio.sleep(grace)
+        deleted = await self.__delete_archived(watermark, batch_size)
+        self.expire()
+        return ArchiveResult(copied, deleted, watermark)
+
+    async def __batch_end(self, after: int, newest: int, cutoff: datetime, batch_size: int) -> int | None:
+        """Último id do próximo lote: o prefixo, em ordem de id, anterior ao corte"""
+        query = (
+            sa.select(transactions.c.id, transactions.c.timestamp)
+            .where(transactions.c.id > after, transactions.c.id < newest)
+            .order_by(transactions.c.id)
+            .limit(batch_size)
+        )
+        upto = None
+        for row in await database.fetch_all(query):
+            timestamp = _as_utc(row.timestamp)
+            if timestamp is None or timestamp >= cutoff:
+                break
+            upto = row.id
+        return upto
+
+    @database.transaction()
+    async def __copy(self, after: int, upto: int) -> int:
+        columns = [column.name for column in transactions.columns]
+        source = sa.select(*transactions.columns).where(transactions.c.id > after, transactions.c.id <= upto)
+        await database.execute(transactions_archive.insert().from_select(columns, source))
+        return await database.fetch_val(
+            sa.select(sa.func.count()).where(transactions_archive.c.id > after, transactions_archive.c.id <= upto)
+        )
+
+    async def __delete_archived(self, watermark: int, batch_size: int) -> int:
+        """Apaga da tabela quente, em faixas de ids, as linhas já copiadas"""
+        low = await database.fetch_val(sa.select(sa.func.min(transactions.c.id))) or 0
+        deleted = 0
+        while low and low <= watermark:
+            high = min(low + batch_size - 1, watermark)
+            count = await database.fetch_val(
+                sa.select(sa.func.count()).where(transactions.c.id >= low, transactions.c.id <= high)
+            )
+            if count:
+                await database.execute(
+                    transactions.delete().where(transactions.c.id >= low, transactions.c.id <= high)
+                )
+                deleted += count
+            low = high + 1
+        logger.info("Removidas %s transações da tabela quente", deleted)
+        return deleted
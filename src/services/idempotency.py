@@ -0,0 +1,131 @@
+import asyncio
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from pydantic import BaseModel
+
+from src import queries
+from src.config import settings
+from src.database import database
+from src.exceptions import IdempotencyConflictError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IdempotentRequest:
+    user_id: int
+    key: str
+    fingerprint: str
+
+    @classmethod
+    def build(cls, user_id: int, key: str, route: str, payload: BaseModel) -> "IdempotentRequest":
+        """Fingerprint da rota (ex.: "POST /transfers") e do payload.
+
+        As rotas dividem o espaço de chaves do usuário: a mesma chave usada
+        em outra rota é um conflito, nunca a repetição da outra resposta.
+        """
+        body = f"{route}\n{payload.model_dump_json()}"
+        fingerprint = hashlib.sha256(body.encode()).hexdigest()
+        return cls(user_id=user_id, key=key, fingerprint=fingerprint)
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str
+    status_code: int
+    body: dict
+    replayed: bool = False
+
+
+class IdempotencyService:
+    """Garante que uma requisição com Idempotency-Key seja executada uma única vez.
+
+    A resposta é gravada na mesma transação do banco que a escrita; um LRU em
+    memória responde às repetições sem consultar o banco e requisições
+    simultâneas com a mesma chave aguardam a primeira em vez de executar.
+    """
+
+    def __init__(self, maxsize: int = settings.idempotency_cache_size):
+        self.maxsize = maxsize
+        self._cache: OrderedDict[tuple[int, str], StoredResponse] = OrderedDict()
+        self._inflight: dict[tuple[int, str], asyncio.Future] = {}
+
+    async def run(
+        self, request: IdempotentRequest, operation: Callable[[], Awaitable[StoredResponse]]
+    ) -> StoredResponse:
+        """Executa `operation` uma única vez por chave, ou devolve a resposta já gravada"""
+        cache_key = (request.user_id, request.key)
+
+        stored = self._cache.get(cache_key)
+        if stored is not None:
+            self._cache.move_to_end(cache_key)
+            return self.__replay(request, stored)
+
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            logger.info("Aguardando requisição em andamento com a mesma Idempotency-Key: user_id=%s", request.user_id)
+            return self.__replay(request, await asyncio.shield(inflight))
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        try:
+            stored = await self.__lookup(request)
+            if stored is None:
+                try:
+                    stored = await operation()
+                except Exception:
+                    # Outro worker pode ter gravado a mesma chave primeiro
+                    stored = await self.__lookup(request)
+                    if stored is None:
+                        raise
+            self.__remember(cache_key, stored)
+            future.set_result(stored)
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # evita o aviso de exceção não consumida sem outros aguardando
+            raise
+        finally:
+            del self._inflight[cache_key]
+
+        return self.__replay(request, stored) if stored.replayed else stored
+
+    async def save(self, request: IdempotentRequest, status_code: int, body: dict) -> StoredResponse:
+        """Grava a resposta da chave; deve rodar dentro da transação da escrita"""
+        await database.execute(queries.insert_idempotency_key, {
+            "user_id": request.user_id,
+            "key": request.key,
+            "fingerprint": request.fingerprint,
+            "status_code": status_code,
+            "response_body": json.dumps(body),
+        })
+        return StoredResponse(fingerprint=request.fingerprint, status_code=status_code, body=body)
+
+    async def __lookup(self, request: IdempotentRequest) -> StoredResponse | None:
+        row = await database.fetch_one(
+            queries.idempotency_key_lookup, {"user_id": request.user_id, "key": request.key}
+        )
+        if row is None:
+            return None
+        return StoredResponse(
+            fingerprint=row.fingerprint,
+            status_code=row.status_code,
+            body=json.loads(row.response_body),
+            replayed=True,
+        )
+
+    def __remember(self, cache_key: tuple[int, str], stored: StoredResponse) -> None:
+        self._cache[cache_key] = stored
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def __replay(self, request: IdempotentRequest, stored: StoredResponse) -> StoredResponse:
+        if stored.fingerprint != request.fingerprint:
+            logger.warning("Idempotency-Key reutilizada com outro payload: user_id=%s", request.user_id)
+            raise IdempotencyConflictError("Idempotency-Key já utilizada com outro payload ou em outra rota")
+        logger.info("Resposta repetida para Idempotency-Key: user_id=%s", request.user_id)
+        return StoredResponse(stored.fingerprint, stored.status_code, stored.body, replayed=True)
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from src import queries
+from src.database import database, read_database
+
+logger = logging.getLogger(__name__)
+
+# Ids por consulta na execução incremental (lista de IN)
+CHANGED_CHUNK = 5000
+
+
+@dataclass
+class Mismatch:
+    account_id: int
+    balance: int
+    expected: int
+    fixed: bool = False
+
+
+@dataclass
+class ReconciliationResult:
+    mode: str
+    since: int | None
+    accounts_checked: int
+    transaction_checkpoint: int
+    account_checkpoint: int
+    mismatches: list[Mismatch] = field(default_factory=list)
+
+    @property
+    def fixed(self) -> int:
+        return sum(mismatch.fixed for mismatch in self.mismatches)
+
+
+class ReconciliationService:
+    """Confere `accounts.balance` contra as transações de cada conta.
+
+    O saldo esperado é `opening_balance` + depósitos - saques, somando a
+    tabela quente e o arquivo. Cada consulta cobre uma faixa de ids (ou uma
+    lista, na execução incremental) e devolve só as contas divergentes; saldo
+    e transações são lidos na mesma instrução, então uma escrita concorrente
+    nunca aparece como divergência. As faixas são distribuídas entre
+    `workers` tarefas, cada uma com a sua conexão, e o trabalho pesado
+    (agregar as transações) fica no banco.
+
+    Uma execução concluída grava o maior id de transação e de conta do seu
+    início em `reconciliation_runs`. A seguinte, incremental, só confere as
+    contas com transações depois desse id (menos `overlap` ids: transações
+    com id menor que ainda não tinham feito commit) ou criadas depois dele.
+    """
+
+    async def reconcile(
+        self, workers: int, range_size: int, full: bool = False, fix: bool = False, overlap: int = 0
+    ) -> ReconciliationResult:
+        started_at = datetime.now(timezone.utc)
+        bounds = await read_database.fetch_one(queries.reconciliation_bounds)
+        first_id, last_id, count, last_transaction_id = bounds[0] or 0, bounds[1] or 0, bounds[2], bounds[3] or 0
+        previous = None if full else await database.fetch_one(queries.last_reconciliation)
+
+        if previous is None:
+            result = ReconciliationResult("full", None, count, last_transaction_id, last_id)
+            work = self.__ranges(first_id - 1, last_id, range_size)
+            check = self.__check_range
+        else:
+            since = max(0, previous.transaction_checkpoint - overlap)
+            rows = await read_database.fetch_all(
+                queries.changed_accounts, {"since": since, "account_since": previous.account_checkpoint}
+            )
+            changed = sorted(row[0] for row in rows)
+            result = ReconciliationResult("incremental", since, len(changed), last_transaction_id, last_id)
+            work = (changed[start:start + CHANGED_CHUNK] for start in range(0, len(changed), CHANGED_CHUNK))
+            check = self.__check_accounts
+        logger.info(
+            "Conciliação %s: %s contas, %s tarefas (desde a transação %s)",
+            result.mode, result.accounts_checked, workers, result.since,
+        )
+
+        async def worker() -> None:
+            # Todas as tarefas consomem o mesmo iterador
+            for item in work:
+                for row in await check(item):
+                    result.mismatches.append(Mismatch(row[0], row[1], row[2]))
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        result.mismatches.sort(key=lambda mismatch: mismatch.account_id)
+        if result.mismatches:
+            logger.warning("Conciliação: %s contas com saldo divergente", len(result.mismatches))
+
+        if fix:
+            for mismatch in result.mismatches:
+                mismatch.fixed = await self.__fix(mismatch.account_id)
+            logger.info("Conciliação: %s saldos corrigidos", result.fixed)
+
+        await database.execute(queries.insert_reconciliation_run, {
+            "mode": result.mode,
+            "started_at": started_at,
+            "finished_at": datetime.now(timezone.utc),
+            "transaction_checkpoint": result.transaction_checkpoint,
+            "account_checkpoint": result.account_checkpoint,
+            "accounts_checked": result.accounts_checked,
+            "mismatches": len(result.mismatches),
+            "fixed": result.fixed,
+        })
+        return result
+
+    @staticmethod
+    def __ranges(low: int, high: int, size: int) -> Iterator[tuple[int, int]]:
+        """Faixas (início exclusivo, fim inclusivo) de `size` ids"""
+        for start in range(low, high, size):
+            yield start, min(start + size, high)
+
+    async def __check_range(self, bounds: tuple[int, int]) -> list:
+        low, high = bounds
+        return await read_database.fetch_all(queries.reconcile_range, {"low": low, "high": high})
+
+    async def __check_accounts(self, account_ids: list[int]) -> list:
+        return await read_database.fetch_all(queries.reconcile_accounts(account_ids))
+
+    @database.transaction()
+    async def __fix(self, account_id: int) -> bool:
+        """Recalcula o saldo no primário com a linha da conta travada.
+
+        No Postgres o `SELECT ... FOR UPDATE` espera as escritas em andamento
+        na conta (elas travam a mesma linha no UPDATE do saldo) e o UPDATE,
+        em outra instrução, enxerga o que elas gravaram. No SQLite o próprio
+        UPDATE é atômico. Devolve False se o saldo já não divergia.
+        """
+        if database.url.dialect == "postgresql":
+            await database.fetch_val(queries.lock_account, {"account_id": account_id})
+        balance = await database.fetch_val(queries.fix_balance, {"account_id": account_id})
+        if balance is None:
+            return False
+        logger.warning("Saldo corrigido pela conciliação: account_id=%s, balance_cents=%s", account_id, balance)
+        return True
@@ -0,0 +1,74 @@
+import logging
+from datetime import date
+
+from databases.interfaces import Record
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src import queries
+from src.database import database, read_database
+from src.exceptions import AccountNotFoundError
+from src.models.account_summary import account_daily_summary
+from src.models.transaction import TransactionType
+from src.log import SAMPLED
+from src.services.account_cache import account_cache
+
+logger = logging.getLogger(__name__)
+
+
+class SummaryService:
+    async def read_range(
+        self, account_id: int, start: date | None = None, end: date | None = None
+    ) -> list[Record]:
+        """Busca os resumos diários de uma conta no período (datas inclusivas).
+
+        Sem resumos no período, confere se a conta existe (AccountNotFoundError).
+        """
+        query = (
+            account_daily_summary.select()
+            .where(account_daily_summary.c.account_id == account_id)
+            .order_by(account_daily_summary.c.day)
+        )
+        if start is not None:
+            query = query.where(account_daily_summary.c.day >= start)
+        if end is not None:
+            query = query.where(account_daily_summary.c.day <= end)
+
+        result = await read_database.fetch_all(query)
+        if not result and await account_cache.get_owner(account_id) is None:
+            logger.warning("Resumo de conta inexistente: account_id=%s", account_id)
+            raise AccountNotFoundError
+        logger.info("Listados %s resumos diários para account_id=%s", len(result), account_id, extra=SAMPLED)
+        return result
+
+    async def record(self, rows: list[Record], balances: dict[int, int]) -> None:
+        """Acumula transações recém-criadas nos resumos diários.
+
+        Deve ser chamado dentro da mesma transação do banco que inseriu as
+        linhas; `balances` traz o saldo final de cada conta após o lote (centavos).
+        """
+        totals: dict[tuple[int, date], dict] = {}
+        for row in rows:
+            key = (row.account_id, row.timestamp.date())
+            entry = totals.setdefault(key, {
+                "account_id": row.account_id,
+                "day": key[1],
+                "deposit_count": 0,
+                "deposit_total": 0,
+                "withdrawal_count": 0,
+                "withdrawal_total": 0,
+                "closing_balance": balances[row.account_id],
+            })
+            prefix = "deposit" if row.type == TransactionType.DEPOSIT else "withdrawal"
+            entry[f"{prefix}_count"] += 1
+            entry[f"{prefix}_total"] += row.amount
+
+        if not totals:
+            return
+
+        dialect = postgresql if database.url.dialect == "postgresql" else sqlite
+        if len(totals) == 1:
+            # Caso de `create`, uma transação: upsert pré-compilado
+            entry, = totals.values()
+            await database.execute(queries.upsert_daily_summary_row[dialect], entry)
+        else:
+            await database.execute(queries.upsert_daily_summary(dialect, list(totals.values())))
@@ -1,116 +1,489 @@
 import logging
+import time
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from datetime import datetime
+
+import sqlalchemy as sa
 from databases.interfaces import Record
 
-from src.database import database
+from src import queries
+from src.database import database, read_database
+from src.events import transaction_events
 from src.exceptions import AccountNotFoundError, BusinessError, TransactionNotFoundError
 from src.models.account import accounts
 from src.models.transaction import TransactionType, transactions
-from src.schemas.transaction import TransactionIn
+from src.pagination import decode_cursor
+from src.schemas.transaction import BatchMode, TransactionBatchIn, TransactionIn
+from src.schemas.transfer import TransferIn
+from src.services.account_cache import account_cache
+from src.services.account_versions import account_versions
+from src.services.archive import ArchiveService
+from src.services.summary import SummaryService
 from src.config import settings
+from src.log import SAMPLED
 
 logger = logging.getLogger(__name__)
 
+LACK_OF_BALANCE = "Operation not carried out due to lack of balance"
+
+# Transações por leitura ao retomar um stream
+STREAM_PAGE_SIZE = 100
+
+
+class _BatchRejected(Exception):
+    """Interrompe a transação de um lote all-or-nothing"""
+    pass
+
 
 class TransactionService:
+    summaries = SummaryService()
+    archive = ArchiveService()
+
     async def read_all(
-        self, account_id: int, limit: int, skip: int = 0
+        self, account_id: int, limit: int, skip: int = 0, cursor: str | None = None
     ) -> list[Record]:
-        """Busca transações de uma conta com paginação"""
+        """Busca transações de uma conta com paginação por cursor ou offset"""
         if limit > 100:
             limit = 100
         if limit < 1:
             limit = 1
         if skip < 0:
             skip = 0
-            
-        query = (
-            transactions.select()
-            .where(transactions.c.account_id == account_id)
-            .limit(limit)
-            .offset(skip)
+
+        after = decode_cursor(cursor, "id")["id"] if cursor else None
+        result = await self.archive.read_page(
+            lambda table: [table.c.account_id == account_id], limit, skip=skip, after=after
         )
-        result = await database.fetch_all(query)
-        logger.info(f"Listadas {len(result)} transações para account_id={account_id}")
+        logger.info("Listadas %s transações para account_id=%s", len(result), account_id, extra=SAMPLED)
         return result
 
-    async def read_all_transactions(self, limit: int, skip: int = 0) -> list[Record]:
-        """Busca todas as transações do sistema"""
+    async def read_all_transactions(
+        self, limit: int, skip: int = 0, cursor: str | None = None
+    ) -> list[Record]:
+        """Busca todas as transações do sistema com paginação por cursor ou offset"""
         if limit > 100:
             limit = 100
         if limit < 1:
             limit = 1
         if skip < 0:
             skip = 0
-            
-        query = transactions.select().limit(limit).offset(skip)
-        result = await database.fetch_all(query)
-        logger.info(f"Listadas {len(result)} transações totais")
+
+        after = decode_cursor(cursor, "id")["id"] if cursor else None
+        result = await self.archive.read_page(lambda table: [], limit, skip=skip, after=after)
+        logger.info("Listadas %s transações totais", len(result), extra=SAMPLED)
         return result
 
+    def iterate(
+        self,
+        account_id: int | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> AsyncIterator[Record]:
+        """Percorre transações em ordem de id sem carregar o resultado em memória"""
+
+        def filters(table: sa.Table) -> list:
+            conditions = []
+            if account_id is not None:
+                conditions.append(table.c.account_id == account_id)
+            if start is not None:
+                conditions.append(table.c.timestamp >= start)
+            if end is not None:
+                conditions.append(table.c.timestamp < end)
+            return conditions
+
+        return self.archive.iterate(filters, start=start)
+
+    async def open_export(
+        self,
+        account_id: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> AsyncIterator[Record]:
+        """Valida a conta antes de a resposta do export começar (depois o status já foi enviado)"""
+        if await account_cache.get_owner(account_id) is None:
+            logger.warning("Export de conta inexistente: account_id=%s", account_id)
+            raise AccountNotFoundError
+        return self.iterate(account_id=account_id, start=start, end=end)
+
+    async def open_stream(self, account_id: int, after: int | None = None) -> AsyncIterator[Record | None]:
+        """Valida a conta e a capacidade do worker antes de a resposta do stream começar"""
+        transaction_events.check_capacity()
+        if await account_cache.get_owner(account_id) is None:
+            logger.warning("Stream de conta inexistente: account_id=%s", account_id)
+            raise AccountNotFoundError
+        logger.info("Stream aberto: account_id=%s, after=%s", account_id, after)
+        return self.follow(account_id, after)
+
+    async def follow(self, account_id: int, after: int | None = None) -> AsyncIterator[Record | None]:
+        """Transações da conta com id maior que `after`, e depois as novas conforme são criadas.
+
+        Sem `after` começa pelas próximas transações. Gera None a cada
+        STREAM_HEARTBEAT_SECONDS sem novidades, para a conexão mandar um
+        keepalive. As releituras (retomada, fila transbordada, ressincronização
+        entre workers) vão ao primário: uma réplica atrasada faria o cursor
+        pular transações.
+        """
+        subscription = transaction_events.subscribe(account_id)
+        try:
+            if after is None:
+                # Depois de assinar: o que for criado a partir daqui chega pela fila
+                after = await database.fetch_val(queries.last_transaction_id, {"account_id": account_id})
+                after = after or await self.archive.watermark()
+                reread = False
+            else:
+                reread = True
+            # Ids da última página relida: a mesma transação pode chegar também pela fila
+            replayed: set[int] = set()
+            resync_at = time.monotonic() + settings.stream_resync_seconds
+            heartbeat_at = time.monotonic() + settings.stream_heartbeat_seconds
+            while True:
+                sent = after
+                if reread or subscription.lagged:
+                    subscription.lagged = False
+                    reread = False
+                    while True:
+                        page = await self.archive.read_page(
+                            lambda table: [table.c.account_id == account_id],
+                            STREAM_PAGE_SIZE,
+                            after=after,
+                            primary=True,
+                        )
+                        if page:
+                            replayed = {row.id for row in page}
+                        for row in page:
+                            after = row.id
+                            yield row
+                        if len(page) < STREAM_PAGE_SIZE:
+                            break
+
+                while subscription.pending:
+                    row = subscription.pending.popleft()
+                    if row.id in replayed:
+                        continue
+                    after = max(after, row.id)
+                    yield row
+
+                if after != sent:
+                    heartbeat_at = time.monotonic() + settings.stream_heartbeat_seconds
+                while not reread:
+                    deadline = heartbeat_at
+                    if settings.stream_resync_seconds:
+                        deadline = min(deadline, resync_at)
+                    if await subscription.wait(max(deadline - time.monotonic(), 0)):
+                        break
+                    now = time.monotonic()
+                    if now >= heartbeat_at:
+                        yield None
+                        heartbeat_at = now + settings.stream_heartbeat_seconds
+                    if settings.stream_resync_seconds and now >= resync_at:
+                        reread = True
+                        resync_at = now + settings.stream_resync_seconds
+        finally:
+            transaction_events.unsubscribe(subscription)
+
     async def read_by_id(self, transaction_id: int) -> Record:
         """Busca uma transação específica por ID"""
-        query = transactions.select().where(transactions.c.id == transaction_id)
-        result = await database.fetch_one(query)
-        
+        result = await self.archive.read_one(transaction_id)
+        if not result and read_database.replicas:
+            # A réplica pode ainda não ter recebido uma transação recém-criada
+            result = await database.fetch_one(queries.transaction_by_id, {"id": transaction_id})
+
         if not result:
-            logger.warning(f"Transação não encontrada: id={transaction_id}")
+            logger.warning("Transação não encontrada: id=%s", transaction_id)
             raise TransactionNotFoundError
             
-        logger.info(f"Transação recuperada: id={transaction_id}")
+        logger.info("Transação recuperada: id=%s", transaction_id, extra=SAMPLED)
         return result
 
-    @database.transaction()
-    async def create(self, transaction: TransactionIn) -> Record:
-        """Cria uma transação com validação de saldo"""
-        # Validar se a conta existe
-        query = accounts.select().where(accounts.c.id == transaction.account_id)
-        account = await database.fetch_one(query)
-        if not account:
-            logger.error(f"Tentativa de transação em conta inexistente: account_id={transaction.account_id}")
-            raise AccountNotFoundError
+    async def create(
+        self,
+        transaction: TransactionIn,
+        before_commit: Callable[[Record], Awaitable[object]] | None = None,
+    ) -> Record:
+        """Cria uma transação com validação de saldo.
+
+        `before_commit` recebe a transação criada e roda na mesma transação do
+        banco (ex.: gravar a resposta de uma Idempotency-Key). A transação é
+        publicada nos streams da conta e muda a versão dela (ETag) depois do
+        commit.
+        """
+        result = await self.__create(transaction, before_commit)
+        self.__committed([result])
+        return result
 
+    @database.transaction()
+    async def __create(
+        self,
+        transaction: TransactionIn,
+        before_commit: Callable[[Record], Awaitable[object]] | None,
+    ) -> Record:
         # Validar montante mínimo
-        if transaction.amount < settings.min_transaction_amount:
-            logger.warning(f"Transação com valor menor que o mínimo: {transaction.amount}")
+        if transaction.amount < settings.min_transaction_cents:
+            logger.warning("Transação com valor menor que o mínimo: amount_cents=%s", transaction.amount)
             raise BusinessError(f"Valor mínimo de transação: {settings.min_transaction_amount}")
 
-        # Calcular novo saldo
         if transaction.type == TransactionType.WITHDRAWAL:
-            balance = float(account.balance) - transaction.amount
-            if balance < 0:
-                logger.warning(f"Saldo insuficiente para saque: account_id={transaction.account_id}, saldo={account.balance}, valor={transaction.amount}")
-                raise BusinessError("Operation not carried out due to lack of balance")
+            delta = -transaction.amount
         else:
-            balance = float(account.balance) + transaction.amount
+            delta = transaction.amount
+
+        # Atualizar saldo (a validação de limites é feita pelo próprio UPDATE)
+        balance = await self.__update_account_balance(transaction.account_id, delta)
+        if balance is None:
+            await self.__raise_rejected(transaction)
+
+        # Registrar transação e acumular no resumo diário
+        result = await self.__register_transaction(transaction)
+        await self.summaries.record([result], {transaction.account_id: balance})
+        if before_commit is not None:
+            await before_commit(result)
+
+        logger.info("Transação criada: id=%s, account_id=%s, type=%s, amount_cents=%s", result.id, transaction.account_id, transaction.type, transaction.amount)
+        return result
 
-        # Validar limite de saldo
-        if balance > settings.max_account_balance:
-            logger.warning(f"Saldo ultrapassaria o limite: {balance}")
-            raise BusinessError(f"Saldo máximo permitido: {settings.max_account_balance}")
+    async def transfer(
+        self,
+        transfer: TransferIn,
+        before_commit: Callable[[dict], Awaitable[object]] | None = None,
+    ) -> dict:
+        """Debita a origem e credita o destino em uma única transação do banco.
 
-        # Registrar transação
-        transaction_id = await self.__register_transaction(transaction)
-        # Atualizar saldo
-        await self.__update_account_balance(transaction.account_id, balance)
+        Os saldos são atualizados em ordem crescente de account_id, como em
+        `__apply_batch`: transferências simultâneas em sentidos opostos
+        travam as duas linhas na mesma ordem e não entram em deadlock. As
+        duas transações são gravadas com o mesmo `transfer_id`.
+        """
+        result = await self.__transfer(transfer, before_commit)
+        self.__committed([result["withdrawal"], result["deposit"]])
+        return result
+
+    @database.transaction()
+    async def __transfer(
+        self,
+        transfer: TransferIn,
+        before_commit: Callable[[dict], Awaitable[object]] | None,
+    ) -> dict:
+        if transfer.amount < settings.min_transaction_cents:
+            logger.warning("Transferência com valor menor que o mínimo: amount_cents=%s", transfer.amount)
+            raise BusinessError(f"Valor mínimo de transação: {settings.min_transaction_amount}")
+
+        # Cada perna como uma transação já validada (centavos), para as mensagens de erro
+        legs = {
+            transfer.source_account_id: TransactionIn.model_construct(
+                account_id=transfer.source_account_id, type=TransactionType.WITHDRAWAL.value, amount=transfer.amount
+            ),
+            transfer.destination_account_id: TransactionIn.model_construct(
+                account_id=transfer.destination_account_id, type=TransactionType.DEPOSIT.value, amount=transfer.amount
+            ),
+        }
+        balances: dict[int, int] = {}
+        for account_id in sorted(legs):
+            leg = legs[account_id]
+            delta = -leg.amount if leg.type == TransactionType.WITHDRAWAL else leg.amount
+            balance = await self.__update_account_balance(account_id, delta)
+            if balance is None:
+                # A exceção desfaz também a perna que já foi aplicada
+                await self.__raise_rejected(leg)
+            balances[account_id] = balance
+
+        transfer_id = uuid.uuid4()
+        withdrawal, deposit = sorted(
+            await database.fetch_all(queries.insert_transfer, {
+                "source_account_id": transfer.source_account_id,
+                "destination_account_id": transfer.destination_account_id,
+                "amount": transfer.amount,
+                "transfer_id": transfer_id,
+            }),
+            key=lambda row: row.id,
+        )
+        await self.summaries.record([withdrawal, deposit], balances)
+        result = {"transfer_id": transfer_id, "amount": transfer.amount, "withdrawal": withdrawal, "deposit": deposit}
+        if before_commit is not None:
+            await before_commit(result)
+
+        logger.info(
+            "Transferência criada: transfer_id=%s, source_account_id=%s, destination_account_id=%s, amount_cents=%s",
+            transfer_id, transfer.source_account_id, transfer.destination_account_id, transfer.amount,
+        )
+        return result
+
+    async def create_batch(self, batch: TransactionBatchIn) -> dict:
+        """Cria um lote de transações aplicando um único UPDATE por conta"""
+        items = batch.items
+        atomic = BatchMode(batch.mode) == BatchMode.ALL_OR_NOTHING
+        errors: dict[int, str] = {}
+
+        # Agrupar itens por conta, preservando a ordem de chegada
+        by_account: dict[int, list[int]] = {}
+        for index, item in enumerate(items):
+            if item.amount < settings.min_transaction_cents:
+                errors[index] = f"Valor mínimo de transação: {settings.min_transaction_amount}"
+            else:
+                by_account.setdefault(item.account_id, []).append(index)
+
+        query = accounts.select().where(accounts.c.id.in_(by_account))
+        balances = {row.id: row.balance for row in await database.fetch_all(query)}
+
+        # Validar cada item contra o saldo corrente da sua conta (centavos)
+        deltas: dict[int, int] = {}
+        for account_id, indexes in by_account.items():
+            if account_id not in balances:
+                errors.update((index, "Account not found.") for index in indexes)
+                continue
+            delta = self.__validate_items(items, indexes, balances[account_id], errors)
+            if delta is not None:
+                deltas[account_id] = delta
+
+        if atomic and errors:
+            logger.warning("Lote rejeitado: %s de %s itens inválidos", len(errors), len(items))
+            return self.__batch_result(batch, {}, errors, "Lote não aplicado")
+
+        try:
+            created = await self.__apply_batch(items, deltas, errors, atomic)
+        except _BatchRejected:
+            logger.warning("Lote rejeitado: saldo alterado durante a aplicação")
+            return self.__batch_result(batch, {}, errors, "Lote não aplicado")
 
-        logger.info(f"Transação criada: id={transaction_id}, account_id={transaction.account_id}, type={transaction.type}, amount={transaction.amount}")
+        self.__committed(list(created.values()))
+        logger.info("Lote processado: %s de %s transações criadas", len(created), len(items))
+        return self.__batch_result(batch, created, errors, "Lote não aplicado")
 
-        query = transactions.select().where(transactions.c.id == transaction_id)
-        return await database.fetch_one(query)
-    
+    @database.transaction()
+    async def __apply_batch(
+        self, items: list[TransactionIn], deltas: dict[int, int], errors: dict[int, str], atomic: bool
+    ) -> dict[int, Record]:
+        """Aplica os saldos líquidos e insere as transações aceitas"""
+        balances: dict[int, int] = {}
+        # Ordem fixa de contas para que lotes concorrentes não entrem em deadlock
+        for account_id, delta in sorted(deltas.items()):
+            balance = await self.__update_account_balance(account_id, delta)
+            if balance is None:
+                # O saldo mudou desde a validação
+                if atomic:
+                    raise _BatchRejected
+                balance = await self.__revalidate_account(items, account_id, errors)
+            if balance is not None:
+                balances[account_id] = balance
+
+        accepted = [index for index in range(len(items)) if index not in errors]
+        if not accepted:
+            return {}
 
-    async def __update_account_balance(self, account_id: int, balance: float) -> None:
-        """Atualiza o saldo da conta"""
         command = (
-            accounts.update().where(accounts.c.id == account_id).values(balance=balance)
+            transactions.insert()
+            .values([
+                {
+                    "account_id": items[index].account_id,
+                    "type": items[index].type,
+                    "amount": items[index].amount,
+                }
+                for index in accepted
+            ])
+            .returning(*transactions.c)
+        )
+        rows = sorted(await database.fetch_all(command), key=lambda row: row.id)
+        await self.summaries.record(rows, balances)
+        return dict(zip(accepted, rows))
+
+    async def __revalidate_account(
+        self, items: list[TransactionIn], account_id: int, errors: dict[int, str]
+    ) -> int | None:
+        """Revalida os itens de uma conta contra o saldo relido (lote best_effort).
+
+        Roda na transação de `__apply_batch`: trava a linha da conta (no SQLite
+        o UPDATE que falhou já tomou o lock de escrita), relê o saldo e refaz a
+        validação item a item, registrando o motivo real de cada recusa.
+        Retorna o novo saldo, ou None se nenhum item da conta foi aplicado.
+        """
+        indexes = [i for i, item in enumerate(items) if item.account_id == account_id and i not in errors]
+        query = sa.select(accounts.c.balance).where(accounts.c.id == account_id).with_for_update()
+        balance = await database.fetch_val(query)
+        if balance is None:
+            errors.update((index, "Account not found.") for index in indexes)
+            return None
+        delta = self.__validate_items(items, indexes, balance, errors)
+        if delta is None:
+            return None
+        logger.warning("Lote revalidado: account_id=%s, saldo alterado durante a aplicação", account_id)
+        balance = await self.__update_account_balance(account_id, delta)
+        if balance is None:
+            # Só acontece se a linha mudou de novo apesar do lock
+            errors.update((index, LACK_OF_BALANCE) for index in indexes if index not in errors)
+        return balance
+
+    @staticmethod
+    def __validate_items(
+        items: list[TransactionIn], indexes: list[int], balance: int, errors: dict[int, str]
+    ) -> int | None:
+        """Valida em ordem os itens de uma conta a partir de `balance` (centavos).
+
+        Registra em `errors` o motivo de cada item recusado e retorna a
+        variação líquida dos aceitos, ou None se nenhum foi aceito.
+        """
+        start = balance
+        accepted = False
+        for index in indexes:
+            item = items[index]
+            delta = -item.amount if item.type == TransactionType.WITHDRAWAL else item.amount
+            if balance + delta < 0:
+                errors[index] = LACK_OF_BALANCE
+            elif balance + delta > settings.max_account_balance_cents:
+                errors[index] = f"Saldo máximo permitido: {settings.max_account_balance}"
+            else:
+                balance += delta
+                accepted = True
+        return balance - start if accepted else None
+
+    def __batch_result(
+        self, batch: TransactionBatchIn, created: dict[int, Record], errors: dict[int, str], fallback: str
+    ) -> dict:
+        """Monta a resposta com o resultado de cada item do lote"""
+        results = [
+            {"index": index, "success": True, "transaction": created[index]}
+            if index in created
+            else {"index": index, "success": False, "error": errors.get(index, fallback)}
+            for index in range(len(batch.items))
+        ]
+        return {
+            "mode": batch.mode,
+            "accepted": len(created),
+            "rejected": len(results) - len(created),
+            "results": results,
+        }
+
+    def __committed(self, rows: list[Record]) -> None:
+        """Atualiza as versões das contas e avisa os streams; só depois do commit"""
+        account_versions.bump(rows)
+        transaction_events.publish(rows)
+
+    async def __raise_rejected(self, transaction: TransactionIn) -> None:
+        """Identifica por que o UPDATE condicional não alterou a conta"""
+        if await account_cache.get_owner(transaction.account_id) is None:
+            logger.error("Tentativa de transação em conta inexistente: account_id=%s", transaction.account_id)
+            raise AccountNotFoundError
+
+        if transaction.type == TransactionType.WITHDRAWAL:
+            logger.warning("Saldo insuficiente para saque: account_id=%s, amount_cents=%s", transaction.account_id, transaction.amount)
+            raise BusinessError(LACK_OF_BALANCE)
+
+        logger.warning("Saldo ultrapassaria o limite: account_id=%s, amount_cents=%s", transaction.account_id, transaction.amount)
+        raise BusinessError(f"Saldo máximo permitido: {settings.max_account_balance}")
+
+    async def __update_account_balance(self, account_id: int, delta: int) -> int | None:
+        """Aplica a variação (em centavos) ao saldo em um único UPDATE condicional.
+
+        Retorna o novo saldo, ou None se a conta não existe ou se o saldo
+        resultante ficaria negativo ou acima do limite.
+        """
+        return await database.fetch_val(
+            queries.update_balance,
+            {"account_id": account_id, "delta": delta, "max_balance": settings.max_account_balance_cents},
         )
-        await database.execute(command)
 
-    async def __register_transaction(self, transaction: TransactionIn) -> int:
+    async def __register_transaction(self, transaction: TransactionIn) -> Record:
         """Registra uma nova transação no banco"""
-        command = transactions.insert().values(
-            account_id=transaction.account_id,
-            type=transaction.type,
-            amount=transaction.amount,
+        return await database.fetch_one(
+            queries.insert_transaction,
+            {"account_id": transaction.account_id, "type": transaction.type, "amount": transaction.amount},
         )
-        return await database.execute(command)
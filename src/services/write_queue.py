@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from enum import Enum
+
+from databases.interfaces import Record
+
+from src.cache import CacheBackend, build_backend
+from src.config import settings
+from src.exceptions import RateLimitExceededError, TicketNotFoundError, WriteQueueClosedError
+from src.schemas.transaction import BatchMode, TransactionBatchIn, TransactionIn
+from src.serializers import ticket_to_dict
+from src.services.transaction import TransactionService
+
+logger = logging.getLogger(__name__)
+
+
+class TicketStatus(Enum):
+    QUEUED = "queued"
+    COMMITTED = "committed"
+    REJECTED = "rejected"
+
+
+@dataclass
+class Ticket:
+    user_id: int
+    transaction: TransactionIn
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: TicketStatus = TicketStatus.QUEUED
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    result: Record | None = None
+    error: str | None = None
+
+
+class WriteQueue:
+    """Fila de escrita com group commit para `POST /transactions/` assíncrono.
+
+    As requisições com `Prefer: respond-async` entram em uma fila limitada e
+    recebem um ticket. Um único consumidor retira tudo o que estiver na fila
+    (até `WRITE_BATCH_SIZE`) e grava como um lote best effort de
+    `TransactionService.create_batch`: mesmas validações de `create`, um
+    commit por lote e a ordem de chegada preservada dentro de cada conta.
+    Enquanto um lote faz commit os próximos pedidos se acumulam, então o
+    lote cresce com a carga sem esperar por um timer.
+
+    Os tickets ficam no backend de cache (`CACHE_URL`) por
+    `WRITE_TICKET_TTL` segundos, já no JSON da resposta: com `redis://`
+    qualquer worker responde a consulta; com `memory://` (padrão, LRU de
+    `WRITE_TICKET_CACHE_SIZE`) só o worker que emitiu o ticket.
+    """
+
+    service = TransactionService()
+
+    def __init__(self, maxsize: int, batch_size: int, tickets: CacheBackend, ticket_ttl: float):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.tickets = tickets
+        self.ticket_ttl = ticket_ttl
+        self.batches = 0
+        self.committed = 0
+        self.rejected = 0
+        self._queue: asyncio.Queue[Ticket | None] | None = None
+        self._worker: asyncio.Task | None = None
+
+    @property
+    def accepting(self) -> bool:
+        return self._worker is not None and self._queue is not None
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        """Inicia o consumidor (no startup da aplicação)"""
+        if self.maxsize <= 0 or self._worker is not None:
+            return
+        self._queue = asyncio.Queue(self.maxsize)
+        self._worker = asyncio.create_task(self.__run(self._queue))
+        logger.info("Fila de escrita iniciada: %s posições, lotes de até %s", self.maxsize, self.batch_size)
+
+    async def close(self, timeout: float) -> None:
+        """Para de aceitar pedidos e grava os que já estão na fila.
+
+        Se a fila não drenar em `timeout` segundos, os pedidos que ainda não
+        entraram em um lote são rejeitados e o lote em andamento termina o
+        commit normalmente (nunca é cancelado no meio).
+        """
+        if self._worker is None:
+            return
+        queue, worker = self._queue, self._worker
+        self._queue, self._worker = None, None
+        pending = queue.qsize()
+        if pending:
+            logger.info("Drenando fila de escrita: %s transações", pending)
+        await queue.put(None)
+        done, _ = await asyncio.wait({worker}, timeout=timeout)
+        if done:
+            return
+        abandoned = []
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                item.status = TicketStatus.REJECTED
+                item.error = "Fila de escrita encerrada antes da gravação"
+                abandoned.append(item)
+        queue.put_nowait(None)
+        logger.error("Fila de escrita não drenou em %s s: %s transações rejeitadas", timeout, len(abandoned))
+        self.rejected += len(abandoned)
+        await self.__save(abandoned)
+        await worker
+
+    async def submit(self, user_id: int, transaction: TransactionIn) -> Ticket:
+        """Enfileira a transação; 429 se a fila está cheia, 503 se ela foi encerrada"""
+        queue = self._queue
+        if queue.full():
+            logger.warning("Fila de escrita cheia: %s transações aguardando", queue.qsize())
+            raise RateLimitExceededError(retry_after=1)
+        ticket = Ticket(user_id=user_id, transaction=transaction)
+        # Gravado antes de entrar na fila: o consumidor só atualiza um ticket já salvo
+        await self.__save([ticket])
+        if self._queue is not queue:
+            # `close` rodou durante a gravação: o sentinela pode já estar na fila
+            logger.warning("Fila de escrita encerrada durante o envio do ticket %s", ticket.id)
+            ticket.status = TicketStatus.REJECTED
+            ticket.error = "Fila de escrita encerrada antes da gravação"
+            await self.__save([ticket])
+            raise WriteQueueClosedError(retry_after=1)
+        try:
+            queue.put_nowait(ticket)
+        except asyncio.QueueFull:
+            logger.warning("Fila de escrita cheia: %s transações aguardando", queue.qsize())
+            ticket.status = TicketStatus.REJECTED
+            ticket.error = "Fila de escrita cheia"
+            await self.__save([ticket])
+            raise RateLimitExceededError(retry_after=1)
+        return ticket
+
+    async def get(self, ticket_id: str, user_id: int) -> dict:
+        """JSON de `TicketOut` do ticket, se ele pertence ao usuário"""
+        stored = await self.tickets.get(f"write_ticket:{ticket_id}")
+        if stored is None:
+            raise TicketNotFoundError
+        entry = json.loads(stored)
+        if entry["user_id"] != user_id:
+            raise TicketNotFoundError
+        return entry["ticket"]
+
+    async def __save(self, tickets: list[Ticket]) -> None:
+        await asyncio.gather(*(
+            self.tickets.set(
+                f"write_ticket:{ticket.id}",
+                json.dumps({"user_id": ticket.user_id, "ticket": ticket_to_dict(ticket)}),
+                self.ticket_ttl,
+            )
+            for ticket in tickets
+        ))
+
+    async def __run(self, queue: asyncio.Queue[Ticket | None]) -> None:
+        stopping = False
+        while not stopping:
+            item = await queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < self.batch_size and not queue.empty():
+                item = queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                await self.__apply(batch)
+            except Exception:
+                # Falha ao salvar os tickets: o consumidor segue com os próximos lotes
+                logger.exception("Falha ao resolver lote da fila de escrita: %s tickets", len(batch))
+
+    async def __apply(self, batch: list[Ticket]) -> None:
+        """Grava um lote em uma transação do banco e resolve os tickets"""
+        try:
+            result = await self.service.create_batch(TransactionBatchIn.model_construct(
+                items=[ticket.transaction for ticket in batch], mode=BatchMode.BEST_EFFORT.value
+            ))
+        except Exception:
+            logger.exception("Falha ao gravar lote da fila de escrita: %s transações rejeitadas", len(batch))
+            for ticket in batch:
+                ticket.status = TicketStatus.REJECTED
+                ticket.error = "Falha ao gravar a transação"
+            self.rejected += len(batch)
+            await self.__save(batch)
+            return
+
+        self.batches += 1
+        for ticket, item in zip(batch, result["results"]):
+            if item["success"]:
+                ticket.status = TicketStatus.COMMITTED
+                ticket.result = item["transaction"]
+            else:
+                ticket.status = TicketStatus.REJECTED
+                ticket.error = item["error"]
+        self.committed += result["accepted"]
+        self.rejected += result["rejected"]
+        await self.__save(batch)
+
+
+write_queue = WriteQueue(
+    settings.write_queue_size,
+    settings.write_batch_size,
+    build_backend(settings.cache_url, maxsize=settings.write_ticket_cache_size),
+    ticket_ttl=settings.write_ticket_ttl,
+)
@@ -1,18 +1,49 @@
-from pydantic import AwareDatetime, BaseModel, NaiveDatetime, PositiveFloat
+from datetime import date
+from uuid import UUID
+
+from pydantic import AwareDatetime, BaseModel, NaiveDatetime
+
+from src.money import Money, PositiveMoney
 
 
 class AccountOut(BaseModel):
     id: int
     user_id: int
-    balance: float
+    balance: Money
     created_at: AwareDatetime | NaiveDatetime
 
 
+class AccountBulkItemOut(BaseModel):
+    index: int
+    line: int | None = None
+    user_id: int | None = None
+    raw_user_id: str | None = None
+    success: bool
+    id: int | None = None
+    error: str | None = None
+
+
+class AccountBulkOut(BaseModel):
+    accepted: int
+    rejected: int
+    truncated: bool = False
+    results: list[AccountBulkItemOut]
+
+
 class TransactionOut(BaseModel):
     id: int
     account_id: int
     type: str
-    amount: PositiveFloat
+    amount: PositiveMoney
     timestamp: AwareDatetime | NaiveDatetime
+    transfer_id: UUID | None = None
 
-    
\ No newline at end of file
+
+class AccountDailySummaryOut(BaseModel):
+    account_id: int
+    day: date
+    deposit_count: int
+    deposit_total: Money
+    withdrawal_count: int
+    withdrawal_total: Money
+    closing_balance: Money
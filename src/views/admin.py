@@ -0,0 +1,65 @@
+from pydantic import AwareDatetime, BaseModel
+
+
+class ProfileTokenOut(BaseModel):
+    header: str
+    value: str
+    expires_at: AwareDatetime
+
+
+class ProfileSummaryOut(BaseModel):
+    id: str
+    method: str
+    path: str
+    route: str | None = None
+    status: int | None = None
+    reason: str
+    request_id: str | None = None
+    started_at: AwareDatetime
+    duration_ms: float
+    queries: int
+    db_ms: float
+
+
+class ProfileSamplesOut(BaseModel):
+    interval_ms: float
+    running: int
+    waiting: int
+
+
+class LoopLagOut(BaseModel):
+    samples: int
+    max_ms: float
+    mean_ms: float
+
+
+class StackOut(BaseModel):
+    stack: str
+    samples: int
+
+
+class QueryTimingOut(BaseModel):
+    operation: str
+    query: str
+    sql: str
+    started_ms: float
+    duration_ms: float
+    error: bool
+
+
+class ProfileOut(ProfileSummaryOut):
+    samples: ProfileSamplesOut
+    loop_lag: LoopLagOut
+    stacks: list[StackOut]
+    db_queries: list[QueryTimingOut]
+    db_queries_dropped: int
+
+
+class SlowQueryOut(BaseModel):
+    timestamp: AwareDatetime
+    request_id: str | None = None
+    operation: str
+    query: str
+    sql: str
+    duration_ms: float
+    error: bool
@@ -1,11 +1,43 @@
-from pydantic import AwareDatetime, BaseModel, NaiveDatetime, PositiveFloat
+from uuid import UUID
+
+from pydantic import AwareDatetime, BaseModel, NaiveDatetime
+
+from src.money import PositiveMoney
 
 
 class TransactionOut(BaseModel):
     id: int
     account_id: int
     type: str
-    amount: PositiveFloat
+    amount: PositiveMoney
     timestamp: AwareDatetime | NaiveDatetime
+    transfer_id: UUID | None = None
+
+
+class TransactionBatchItemOut(BaseModel):
+    index: int
+    success: bool
+    transaction: TransactionOut | None = None
+    error: str | None = None
+
+
+class TransactionBatchOut(BaseModel):
+    mode: str
+    accepted: int
+    rejected: int
+    results: list[TransactionBatchItemOut]
+
+
+class TransferOut(BaseModel):
+    transfer_id: UUID
+    amount: PositiveMoney
+    withdrawal: TransactionOut
+    deposit: TransactionOut
 
 
+class TicketOut(BaseModel):
+    id: str
+    status: str
+    created_at: AwareDatetime
+    transaction: TransactionOut | None = None
+    error: str | None = None